@@ -35,6 +35,14 @@ class Settings(BaseSettings):
     upload_dir: Path = Path("uploads")
     max_upload_size_mb: int = 50
 
+    # PDF processing worker pool
+    pdf_workers: int = 2
+    pdf_queue_size: int = 8
+    pdf_job_timeout_seconds: int = 300
+
+    # Live dashboard events: "memory" (single worker) or "local" (multi-worker, same host)
+    event_broker: str = "memory"
+
     # CORS
     cors_origins: str = "http://localhost:3000,http://localhost:5173"
 
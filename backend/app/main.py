@@ -7,6 +7,8 @@ from fastapi.middleware.cors import CORSMiddleware
 
 from app.config import settings
 from app.database import db
+from app.services.pdf_pool import shutdown_pdf_pool
+from app.services.ingestion_pipeline import get_ingestion_pipeline
 
 # Import routers
 from app.routers import topics, questions, surveys, forms, textbooks, teachers
@@ -38,6 +40,19 @@ app.include_router(textbooks.router)
 app.include_router(teachers.router)
 
 
+@app.on_event("startup")
+async def start_ingestion_worker():
+    """Start the textbook ingestion worker (resumes unfinished jobs)"""
+    get_ingestion_pipeline().start()
+
+
+@app.on_event("shutdown")
+async def stop_pdf_workers():
+    """Stop the ingestion worker, then PDF worker processes"""
+    await get_ingestion_pipeline().stop()
+    shutdown_pdf_pool()
+
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
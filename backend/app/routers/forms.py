@@ -3,7 +3,7 @@ Native Forms Router
 Endpoints for creating, publishing, and managing shareable diagnostic forms
 """
 
-from fastapi import APIRouter, HTTPException, Request
+from fastapi import APIRouter, HTTPException, Query, Request
 from typing import List, Optional, Dict
 from pydantic import BaseModel, EmailStr, Field, ValidationError, field_validator
 from uuid import UUID, uuid4
@@ -11,10 +11,18 @@ from datetime import datetime
 import html
 
 from app.models.question import Question
+from app.models.topic import Topic
 from app.database import db
 from app.utils.slug_generator import generate_slug
+from app.utils.pagination import encode_cursor, decode_cursor, escape_like
 from app.services.email_service import get_email_service
 from app.services.khan_academy_service import get_khan_academy_service
+from app.services.item_analysis import get_item_analysis_service
+from app.services.mastery_service import get_mastery_service
+from app.services.score_distribution import get_score_distribution_service
+from app.services.event_bus import get_event_bus, teacher_channel
+from app.services.results_export import export_response, get_results_exporter, parquet_supported
+from app.services.topic_store import upsert_topics
 from app.config import settings
 
 router = APIRouter(prefix="/api/forms", tags=["forms"])
@@ -210,35 +218,28 @@ async def publish_form(request: PublishFormRequest):
         form_uuid = form_record["id"]
 
         # Store each unique topic and create questions in proper tables
-        topic_map = {}  # topic name -> topic uuid
-
-        for question in request.questions:
-            topic_name = question.topic
-
-            # Get or create topic
-            if topic_name not in topic_map:
-                topic_result = db.client.table("topics")\
-                    .select("id")\
-                    .eq("course_id", course_id)\
-                    .eq("name", topic_name)\
-                    .execute()
+        topic_names = list(dict.fromkeys(q.topic for q in request.questions))
 
-                if topic_result.data:
-                    topic_uuid = topic_result.data[0]["id"]
-                else:
-                    # Create new topic
-                    new_topic = db.client.table("topics").insert({
-                        "course_id": course_id,
-                        "topic_id": f"topic_{slug}_{len(topic_map)}",
-                        "name": topic_name,
-                        "weight": 1.0 / len(set(q.topic for q in request.questions))
-                    }).execute()
-                    topic_uuid = new_topic.data[0]["id"] if new_topic.data else None
+        existing_topics = db.client.table("topics")\
+            .select("id, name")\
+            .eq("course_id", course_id)\
+            .in_("name", topic_names)\
+            .execute()
+        topic_map = {}  # topic name -> topic uuid
+        for t in existing_topics.data:
+            topic_map.setdefault(t["name"], t["id"])
 
-                    if not topic_uuid:
-                        raise HTTPException(status_code=500, detail=f"Failed to create topic: {topic_name}")
+        # Create the missing topics in one batch
+        new_topics = [
+            Topic(id=f"topic_{slug}_{index}", name=name, weight=1.0 / len(topic_names))
+            for index, name in enumerate(n for n in topic_names if n not in topic_map)
+        ]
+        for saved in upsert_topics(course_id, new_topics, order_start=None):
+            topic_map[saved["name"]] = saved["id"]
 
-                topic_map[topic_name] = topic_uuid
+        missing = [name for name in topic_names if name not in topic_map]
+        if missing:
+            raise HTTPException(status_code=500, detail=f"Failed to create topic: {missing[0]}")
 
         # Store questions in questions table and link to form
         for idx, question in enumerate(request.questions):
@@ -770,6 +771,7 @@ async def submit_form(slug: str, submission: SubmitFormRequest):
         correct_count = 0
         total_questions = len(submission.answers)
         responses_to_insert = []
+        guess_by_question = {}
 
         for answer in submission.answers:
             # Get question details from questions table
@@ -796,6 +798,9 @@ async def submit_form(slug: str, submission: SubmitFormRequest):
                     detail=f"Invalid answer index {answer.selected_index} for question {answer.question_id}"
                 )
 
+            if options:
+                guess_by_question[question_uuid] = 1 / len(options)
+
             # Check if answer is correct
             is_correct = answer.selected_index == correct_answer_index
             if is_correct:
@@ -818,6 +823,18 @@ async def submit_form(slug: str, submission: SubmitFormRequest):
             print(f"[FORMS] Inserting {len(responses_to_insert)} responses")
             db.client.table("responses").insert(responses_to_insert).execute()
 
+        # Fold answers into the student's maintained topic mastery
+        if student_id and responses_to_insert:
+            try:
+                get_mastery_service().update_from_responses(
+                    student_id=student_id,
+                    responses=responses_to_insert,
+                    guess_by_question=guess_by_question
+                )
+            except Exception as mastery_error:
+                # Don't fail submission if the mastery update fails
+                print(f"[FORMS WARNING] Failed to update topic mastery: {mastery_error}")
+
         # Calculate score
         score = (correct_count / total_questions * 100) if total_questions > 0 else 0
 
@@ -831,38 +848,64 @@ async def submit_form(slug: str, submission: SubmitFormRequest):
             "score_percentage": score
         }).eq("id", session_uuid).execute()
 
+        # Fold the score into the form's distribution sketch
+        try:
+            get_score_distribution_service().record_score(form_uuid, score)
+        except Exception as sketch_error:
+            # Don't fail submission if the sketch update fails
+            print(f"[FORMS WARNING] Failed to update score distribution: {sketch_error}")
+
+        # Get teacher_id from form (for linking and the live dashboard)
+        teacher_id = None
+        try:
+            form_teacher_result = db.client.table("forms")\
+                .select("teacher_id")\
+                .eq("id", form_uuid)\
+                .execute()
+            if form_teacher_result.data:
+                teacher_id = form_teacher_result.data[0].get("teacher_id")
+        except Exception as teacher_error:
+            # Don't fail submission (already stored) if the lookup fails
+            print(f"[FORMS WARNING] Failed to look up form teacher: {teacher_error}")
+
         # Link student to teacher (if teacher exists for this form)
-        if student_id:
+        if student_id and teacher_id:
             try:
-                # Get teacher_id from form
-                form_teacher_result = db.client.table("forms")\
-                    .select("teacher_id")\
-                    .eq("id", form_uuid)\
+                # Check if relationship already exists
+                existing_link = db.client.table("teacher_students")\
+                    .select("id")\
+                    .eq("teacher_id", teacher_id)\
+                    .eq("student_id", student_id)\
                     .execute()
 
-                if form_teacher_result.data and form_teacher_result.data[0].get("teacher_id"):
-                    teacher_id = form_teacher_result.data[0]["teacher_id"]
-
-                    # Check if relationship already exists
-                    existing_link = db.client.table("teacher_students")\
-                        .select("id")\
-                        .eq("teacher_id", teacher_id)\
-                        .eq("student_id", student_id)\
-                        .execute()
-
-                    # Create link if it doesn't exist (prevents duplicates)
-                    if not existing_link.data:
-                        db.client.table("teacher_students").insert({
-                            "teacher_id": teacher_id,
-                            "student_id": student_id
-                        }).execute()
-                        print(f"[FORMS] Linked student {student_id} to teacher {teacher_id}")
+                # Create link if it doesn't exist (prevents duplicates)
+                if not existing_link.data:
+                    db.client.table("teacher_students").insert({
+                        "teacher_id": teacher_id,
+                        "student_id": student_id
+                    }).execute()
+                    print(f"[FORMS] Linked student {student_id} to teacher {teacher_id}")
             except Exception as link_error:
                 # Don't fail submission if linking fails
                 print(f"[FORMS WARNING] Failed to link student to teacher: {link_error}")
 
         print(f"[FORMS] Form submission complete")
 
+        # Push the submission to the teacher's live dashboard
+        if teacher_id:
+            try:
+                _publish_submission_event(
+                    teacher_id=teacher_id,
+                    slug=slug,
+                    session_uuid=session_uuid,
+                    score_percentage=score,
+                    correct_answers=correct_count,
+                    total_questions=total_questions,
+                    responses=responses_to_insert
+                )
+            except Exception as event_error:
+                print(f"[FORMS WARNING] Failed to publish submission event: {event_error}")
+
         # Send email with personalized resources (async, non-blocking)
         try:
             await _send_results_email(
@@ -870,7 +913,9 @@ async def submit_form(slug: str, submission: SubmitFormRequest):
                 student_email=student_email,
                 score_percentage=score,
                 correct_answers=correct_count,
-                total_questions=total_questions
+                total_questions=total_questions,
+                student_id=student_id,
+                topic_ids=list({r["topic_id"] for r in responses_to_insert if r.get("topic_id")})
             )
         except Exception as email_error:
             # Don't fail the submission if email fails
@@ -954,6 +999,170 @@ async def get_form_stats(slug: str):
         raise HTTPException(status_code=500, detail="Failed to fetch form stats")
 
 
+@router.get("/{slug}/export")
+async def export_form_results(
+    slug: str,
+    format: str = Query("csv", pattern="^(csv|parquet)$", description="csv or parquet")
+):
+    """
+    Export a form's results as a student x question matrix
+
+    One row per completed session with the selected option and correctness
+    for every question, plus per-topic percent correct. Rows are streamed
+    page by page, so large exports never sit in memory at once.
+
+    Args:
+        slug: Form slug
+        format: "csv" (chunked text) or "parquet" (zstd-compressed row groups)
+
+    Returns:
+        Streaming file download
+    """
+    try:
+        form_result = db.client.table("forms")\
+            .select("id, title")\
+            .eq("slug", slug)\
+            .limit(1)\
+            .execute()
+
+        if not form_result.data:
+            raise HTTPException(status_code=404, detail="Form not found")
+
+        form_uuid = form_result.data[0]["id"]
+
+        if format == "parquet" and not parquet_supported():
+            raise HTTPException(status_code=501, detail="Parquet export is not available on this server")
+
+        exporter = get_results_exporter()
+        questions = exporter.load_form_questions(form_uuid)
+        columns = exporter.wide_columns(questions)
+        row_pages = exporter.iter_wide_rows(form_uuid, questions)
+
+        return export_response(f"{slug}-results", format, columns, row_pages)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[FORMS] Error exporting results for form {slug}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to export form results")
+
+
+@router.get("/{slug}/items")
+async def get_form_item_analysis(slug: str):
+    """
+    Item-level analytics for a form
+
+    Per question: p-value (difficulty), corrected point-biserial
+    discrimination and option-selection frequencies, plus KR-20
+    reliability for the whole form. Results are cached until the
+    form receives a new submission.
+
+    Args:
+        slug: Form slug
+
+    Returns:
+        Form-level reliability and per-item statistics
+    """
+    try:
+        form_result = db.client.table("forms")\
+            .select("id, form_id, title")\
+            .eq("slug", slug)\
+            .limit(1)\
+            .execute()
+
+        if not form_result.data:
+            raise HTTPException(status_code=404, detail="Form not found")
+
+        form = form_result.data[0]
+        analysis = get_item_analysis_service().analyze_form(form["id"])
+
+        return {
+            "form_id": form["form_id"],
+            "slug": slug,
+            "form_title": form["title"],
+            **analysis
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[FORMS] Error computing item analysis for form {slug}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to compute item analysis")
+
+
+@router.get("/{slug}/score-distribution")
+async def get_form_score_distribution(slug: str):
+    """
+    Score distribution for a form
+
+    Served from the form's maintained quantile sketch rather than
+    scanning its sessions.
+
+    Args:
+        slug: Form slug
+
+    Returns:
+        Count, mean, percentiles (p10/p25/median/p75/p90) and a 10-bin histogram
+    """
+    try:
+        form_result = db.client.table("forms")\
+            .select("id, form_id, title")\
+            .eq("slug", slug)\
+            .limit(1)\
+            .execute()
+
+        if not form_result.data:
+            raise HTTPException(status_code=404, detail="Form not found")
+
+        form = form_result.data[0]
+        distribution = get_score_distribution_service().summarize_forms([form["id"]])
+
+        return {
+            "form_id": form["form_id"],
+            "slug": slug,
+            "form_title": form["title"],
+            **distribution
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[FORMS] Error getting score distribution for form {slug}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get score distribution")
+
+
+@router.get("/courses/{course_id}/score-distribution")
+async def get_course_score_distribution(course_id: UUID):
+    """
+    Score distribution across every form in a course
+
+    Merges the per-form sketches; no session rows are read.
+
+    Args:
+        course_id: Course UUID
+
+    Returns:
+        Count, mean, percentiles and histogram over all of the course's forms
+    """
+    try:
+        forms_result = db.client.table("forms")\
+            .select("id")\
+            .eq("course_id", str(course_id))\
+            .execute()
+
+        form_uuids = [form["id"] for form in (forms_result.data or [])]
+        distribution = get_score_distribution_service().summarize_forms(form_uuids)
+
+        return {
+            "course_id": str(course_id),
+            **distribution
+        }
+
+    except Exception as e:
+        print(f"[FORMS] Error getting score distribution for course {course_id}: {e}")
+        raise HTTPException(status_code=500, detail="Failed to get score distribution")
+
+
 @router.get("/{form_id}/responses")
 async def get_form_responses(form_id: str):
     """
@@ -985,43 +1194,98 @@ async def get_form_responses(form_id: str):
 
 
 @router.get("/students/all")
-async def get_all_students():
+async def get_all_students(
+    limit: int = Query(50, ge=1, le=200, description="Students per page"),
+    cursor: Optional[str] = Query(None, description="Cursor from a previous page"),
+    search: Optional[str] = Query(None, max_length=255, description="Email prefix filter")
+):
     """
-    Get all students who have submitted forms
+    Get students who have submitted forms, one page at a time
+
+    Uses keyset pagination on (created_at, id) so deep pages cost the same
+    as the first one. Submission counts for the page come from a single
+    grouped query instead of one count per student.
+
+    Args:
+        limit: Maximum number of students to return
+        cursor: Opaque cursor returned as next_cursor by the previous page
+        search: Optional email prefix (case-insensitive)
 
     Returns:
-        List of students with their submission counts
+        Page of students with their submission counts and the next cursor
     """
     try:
-        # Get all students with their submission counts
-        students = db.client.table("students")\
+        try:
+            after = decode_cursor(cursor)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        # Newest first, id breaks ties between identical timestamps
+        students_query = db.client.table("students")\
             .select("id, email, name, created_at")\
             .order("created_at", desc=True)\
-            .execute()
+            .order("id", desc=True)\
+            .limit(limit + 1)
 
-        if not students.data:
-            return {"students": []}
+        if search:
+            # Emails are stored lowercased, so a plain LIKE prefix can use the index
+            students_query = students_query.like("email", f"{escape_like(search.strip().lower())}%")
 
-        # Get submission counts for each student
-        result_students = []
-        for student in students.data:
-            # Count completed sessions
-            sessions = db.client.table("form_sessions")\
-                .select("id", count="exact")\
-                .eq("student_id", student["id"])\
-                .not_.is_("completed_at", "null")\
-                .execute()
+        if after:
+            # Parse before use: the values are interpolated into the filter string
+            try:
+                created_at = datetime.fromisoformat(str(after["created_at"])).isoformat()
+                last_id = UUID(str(after["id"]))
+            except (KeyError, ValueError):
+                raise HTTPException(status_code=400, detail="Invalid cursor")
+            students_query = students_query.or_(
+                f'created_at.lt."{created_at}",'
+                f'and(created_at.eq."{created_at}",id.lt.{last_id})'
+            )
+
+        students = students_query.execute()
+        rows = students.data or []
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
 
-            result_students.append({
+        if not rows:
+            return {"students": [], "next_cursor": None, "has_more": False}
+
+        # One grouped count for the whole page
+        counts_result = db.client.rpc("get_student_submission_counts", {
+            "student_uuids": [student["id"] for student in rows]
+        }).execute()
+
+        submission_counts = {
+            row["student_id"]: int(row.get("submissions_count") or 0)
+            for row in (counts_result.data or [])
+        }
+
+        result_students = [
+            {
                 "id": student["id"],
                 "email": student["email"],
                 "name": student["name"],
                 "created_at": student["created_at"],
-                "submissions_count": sessions.count or 0
-            })
+                "submissions_count": submission_counts.get(student["id"], 0)
+            }
+            for student in rows
+        ]
+
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            next_cursor = encode_cursor({"created_at": last["created_at"], "id": last["id"]})
 
-        return {"students": result_students}
+        return {
+            "students": result_students,
+            "next_cursor": next_cursor,
+            "has_more": has_more
+        }
 
+    except HTTPException:
+        raise
     except Exception as e:
         print(f"[FORMS] Error fetching students: {e}")
         import traceback
@@ -1038,7 +1302,9 @@ async def _send_results_email(
     student_email: str,
     score_percentage: float,
     correct_answers: int,
-    total_questions: int
+    total_questions: int,
+    student_id: Optional[str] = None,
+    topic_ids: Optional[List[str]] = None
 ):
     """
     Send results email with personalized Khan Academy resources
@@ -1049,6 +1315,8 @@ async def _send_results_email(
         score_percentage: Overall score percentage
         correct_answers: Number of correct answers
         total_questions: Total questions
+        student_id: Student UUID (enables mastery-based weak topics)
+        topic_ids: Topics covered by this submission
     """
     print(f"[EMAIL] Preparing results email for {student_email}")
 
@@ -1062,8 +1330,8 @@ async def _send_results_email(
     if session_result.data and session_result.data[0].get("student_name"):
         student_name = session_result.data[0]["student_name"]
 
-    # Identify weak topics (topics where student got less than 60% correct)
-    weak_topics = await _identify_weak_topics(session_uuid)
+    # Identify weak topics from the student's maintained mastery
+    weak_topics = await _identify_weak_topics(session_uuid, student_id=student_id, topic_ids=topic_ids)
 
     if not weak_topics:
         print("[EMAIL] No weak topics identified - student performed well!")
@@ -1103,16 +1371,54 @@ async def _send_results_email(
         print(f"[EMAIL ERROR] Failed to send email: {result.get('error', 'Unknown error')}")
 
 
-async def _identify_weak_topics(session_uuid: UUID) -> List[Dict]:
+async def _identify_weak_topics(
+    session_uuid: UUID,
+    student_id: Optional[str] = None,
+    topic_ids: Optional[List[str]] = None
+) -> List[Dict]:
     """
-    Identify topics where student performed poorly (< 60% correct)
+    Identify topics where student performed poorly
+
+    Reads the student's maintained mastery state (which includes history
+    across submissions). Topics without a mastery row, and sessions without
+    a linked student, fall back to this session's raw percent correct (< 60%).
 
     Args:
         session_uuid: Session UUID
+        student_id: Student UUID
+        topic_ids: Restrict to these topics (e.g. the ones on this form)
 
     Returns:
         List of dicts with topic info: {topic_name, correct, total, percentage}
     """
+    session_weak_topics = _session_weak_topics(session_uuid)
+
+    if not student_id:
+        return session_weak_topics
+
+    weak_topics = get_mastery_service().get_weak_topics(
+        student_id,
+        topic_ids,
+        fallback=session_weak_topics
+    )
+
+    print(f"[ANALYSIS] Identified {len(weak_topics)} weak topics from mastery state")
+    for topic in weak_topics:
+        print(f"  • {topic['topic_name']}: {topic['percentage']:.0f}% {topic['source']} ({topic['correct']}/{topic['total']})")
+
+    return weak_topics
+
+
+def _session_weak_topics(session_uuid: UUID) -> List[Dict]:
+    """
+    Topics answered under 60% correct in this session, worst first
+
+    Args:
+        session_uuid: Session UUID
+
+    Returns:
+        List of dicts with topic info: {topic_id, topic_name, correct, total, percentage}
+    """
     # Get all responses for this session with topic information
     responses_result = db.client.table("responses")\
         .select("topic_id, is_correct")\
@@ -1173,3 +1479,40 @@ async def _identify_weak_topics(session_uuid: UUID) -> List[Dict]:
         print(f"  • {topic['topic_name']}: {topic['percentage']:.0f}% ({topic['correct']}/{topic['total']})")
 
     return weak_topics
+
+
+def _publish_submission_event(
+    teacher_id: str,
+    slug: str,
+    session_uuid: str,
+    score_percentage: float,
+    correct_answers: int,
+    total_questions: int,
+    responses: List[Dict]
+) -> None:
+    """
+    Publish a compact submission event with per-topic stat deltas
+
+    Dashboards apply the deltas to their cached stats instead of
+    re-fetching /{slug}/stats.
+    """
+    topic_deltas: Dict[str, Dict[str, int]] = {}
+    for response in responses:
+        topic_id = response.get("topic_id")
+        if not topic_id:
+            continue
+        delta = topic_deltas.setdefault(topic_id, {"correct": 0, "total": 0})
+        delta["total"] += 1
+        if response.get("is_correct"):
+            delta["correct"] += 1
+
+    get_event_bus().publish(teacher_channel(teacher_id), {
+        "type": "submission",
+        "slug": slug,
+        "session_id": str(session_uuid),
+        "score_percentage": round(score_percentage, 1),
+        "correct_answers": correct_answers,
+        "total_questions": total_questions,
+        "completed_at": datetime.now().isoformat(),
+        "topic_deltas": topic_deltas
+    })
@@ -9,6 +9,7 @@ from typing import List
 from app.models.question import Question, GenerateQuestionsRequest, GenerateQuestionsResponse, Difficulty
 from app.models.course import CourseLevel
 from app.services.question_generator import get_question_generator
+from app.services.textbook_context import get_textbook_context_service
 
 router = APIRouter(prefix="/api/questions", tags=["questions"])
 
@@ -31,28 +32,20 @@ async def generate_questions(request: GenerateQuestionsRequest):
     try:
         generator = get_question_generator()
 
-        # Build context for question generation
-        context = None
+        # Retrieve relevant textbook passages for each topic
+        topic_contexts = None
         if request.use_textbook and request.textbook_id:
-            # Get textbook content from database
-            from app.database import db
-
-            resource_result = db.client.table("resources")\
-                .select("file_path, metadata")\
-                .eq("id", request.textbook_id)\
-                .execute()
-
-            if resource_result.data:
-                # In production, we'd extract relevant sections from the PDF
-                # For now, we'll just note that we have the textbook
-                context = f"Use textbook content from: {resource_result.data[0].get('metadata', {}).get('title', 'textbook')}"
+            topic_contexts = await get_textbook_context_service().build_topic_contexts(
+                textbook_id=request.textbook_id,
+                topics=request.topics
+            )
 
         questions = await generator.generate_questions(
             topics=request.topics,
             count_per_topic=request.count_per_topic,
             difficulty=request.difficulty or Difficulty.MEDIUM,
             course_level=CourseLevel.UNDERGRADUATE,
-            context=context  # Pass textbook context if available
+            topic_contexts=topic_contexts  # Textbook excerpts if available
         )
 
         # Limit to total_count if specified
@@ -3,16 +3,39 @@ Teachers Router
 Endpoints for teacher-specific operations like managing students
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import List, Optional
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from fastapi.responses import JSONResponse, StreamingResponse
+from typing import List, Optional, Dict, Tuple
+from collections import OrderedDict
 from pydantic import BaseModel, EmailStr
 from uuid import UUID
 from datetime import datetime
+import asyncio
+import hashlib
+import json
 
 from app.database import db
+from app.services.mastery_service import get_mastery_service
+from app.services.event_bus import get_event_bus, teacher_channel
+from app.services.results_export import (
+    LONG_COLUMNS,
+    export_response,
+    get_results_exporter,
+    parquet_supported,
+)
+from app.services.score_distribution import get_score_distribution_service
 
 router = APIRouter(prefix="/api/teachers", tags=["teachers"])
 
+# Seconds between SSE keep-alive comments
+EVENT_HEARTBEAT_SECONDS = 15
+
+# Teachers whose heatmap stays cached (least recently requested evicted first)
+HEATMAP_CACHE_SIZE = 256
+
+# teacher_id -> (submission revision, heatmap payload, etag)
+_heatmap_cache: OrderedDict[str, Tuple[str, dict, str]] = OrderedDict()
+
 
 # ============================================================
 # REQUEST/RESPONSE MODELS
@@ -157,6 +180,57 @@ async def get_teacher_students(teacher_email: EmailStr):
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.get("/{teacher_email}/students/{student_id}/mastery")
+async def get_student_mastery(teacher_email: EmailStr, student_id: str):
+    """
+    Get a student's maintained topic mastery
+
+    Mastery is updated incrementally on every submission, so this reads
+    stored state rather than recomputing from raw responses.
+
+    Args:
+        teacher_email: Teacher's email address
+        student_id: Student ID
+
+    Returns:
+        Per-topic mastery probabilities, weakest first
+    """
+    try:
+        teacher_result = db.client.table("teachers")\
+            .select("id")\
+            .eq("email", teacher_email.lower())\
+            .execute()
+
+        if not teacher_result.data:
+            raise HTTPException(status_code=404, detail="Teacher not found")
+
+        teacher_id = teacher_result.data[0]["id"]
+
+        link_result = db.client.table("teacher_students")\
+            .select("id")\
+            .eq("teacher_id", teacher_id)\
+            .eq("student_id", student_id)\
+            .limit(1)\
+            .execute()
+
+        if not link_result.data:
+            raise HTTPException(status_code=404, detail="Student not found in this class")
+
+        topics = get_mastery_service().get_student_mastery_view(student_id)
+
+        return {
+            "student_id": student_id,
+            "topics": topics,
+            "weak_topics": [t["topic_name"] for t in topics if t["is_weak"]]
+        }
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[TEACHERS] Error getting student mastery: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
 @router.delete("/{teacher_email}/students/{student_id}")
 async def remove_student_from_teacher(teacher_email: EmailStr, student_id: str):
     """
@@ -417,3 +491,271 @@ async def get_teacher_forms(teacher_email: EmailStr):
     except Exception as e:
         print(f"[TEACHERS] Error getting teacher forms: {e}")
         raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{teacher_email}/export")
+async def export_teacher_results(
+    teacher_email: EmailStr,
+    format: str = Query("csv", pattern="^(csv|parquet)$", description="csv or parquet")
+):
+    """
+    Export every response on a teacher's forms
+
+    Forms have different question sets, so this export is in long format:
+    one row per answered question with form, student, topic and correctness.
+
+    Args:
+        teacher_email: Teacher's email address
+        format: "csv" or "parquet"
+
+    Returns:
+        Streaming file download
+    """
+    try:
+        teacher_result = db.client.table("teachers")\
+            .select("id")\
+            .eq("email", teacher_email.lower())\
+            .execute()
+
+        if not teacher_result.data:
+            raise HTTPException(status_code=404, detail="Teacher not found")
+
+        teacher_id = teacher_result.data[0]["id"]
+
+        if format == "parquet" and not parquet_supported():
+            raise HTTPException(status_code=501, detail="Parquet export is not available on this server")
+
+        forms_result = db.client.table("forms")\
+            .select("id, slug, title")\
+            .eq("teacher_id", teacher_id)\
+            .order("publish_date", desc=True)\
+            .execute()
+
+        exporter = get_results_exporter()
+        row_pages = exporter.iter_long_rows(forms_result.data or [])
+
+        return export_response("teacher-results", format, LONG_COLUMNS, row_pages)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[TEACHERS] Error exporting results: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{teacher_email}/score-distribution")
+async def get_teacher_score_distribution(teacher_email: EmailStr):
+    """
+    Score distribution across every form a teacher owns
+
+    Merges the per-form quantile sketches; no session rows are read.
+
+    Args:
+        teacher_email: Teacher's email address
+
+    Returns:
+        Count, mean, percentiles and histogram over all of the teacher's forms
+    """
+    try:
+        teacher_result = db.client.table("teachers")\
+            .select("id")\
+            .eq("email", teacher_email.lower())\
+            .execute()
+
+        if not teacher_result.data:
+            raise HTTPException(status_code=404, detail="Teacher not found")
+
+        teacher_id = teacher_result.data[0]["id"]
+
+        forms_result = db.client.table("forms")\
+            .select("id")\
+            .eq("teacher_id", teacher_id)\
+            .execute()
+
+        form_uuids = [form["id"] for form in (forms_result.data or [])]
+        return get_score_distribution_service().summarize_forms(form_uuids)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[TEACHERS] Error getting score distribution: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.get("/{teacher_email}/topic-heatmap")
+async def get_teacher_topic_heatmap(teacher_email: EmailStr, request: Request):
+    """
+    Topic correctness across every form a teacher owns
+
+    Topics are matched by normalized name, so the same prerequisite on
+    several diagnostics becomes one row. Aggregation is a single grouped
+    query; the result is cached until one of the teacher's forms gets a
+    new submission and is served with an ETag for conditional requests.
+
+    Args:
+        teacher_email: Teacher's email address
+
+    Returns:
+        Compact matrix: topics (rows) x forms (columns) of percent correct
+    """
+    try:
+        teacher_result = db.client.table("teachers")\
+            .select("id")\
+            .eq("email", teacher_email.lower())\
+            .execute()
+
+        if not teacher_result.data:
+            raise HTTPException(status_code=404, detail="Teacher not found")
+
+        teacher_id = teacher_result.data[0]["id"]
+
+        forms_result = db.client.table("forms")\
+            .select("id, slug, title")\
+            .eq("teacher_id", teacher_id)\
+            .order("publish_date", desc=True)\
+            .execute()
+        forms = forms_result.data or []
+
+        revision = "0:"
+        if forms:
+            revision_result = db.client.table("form_sessions")\
+                .select("completed_at", count="exact")\
+                .in_("form_id", [f["id"] for f in forms])\
+                .not_.is_("completed_at", "null")\
+                .order("completed_at", desc=True)\
+                .limit(1)\
+                .execute()
+            latest = revision_result.data[0]["completed_at"] if revision_result.data else ""
+            revision = f"{revision_result.count or 0}:{latest}:{len(forms)}"
+
+        cached = _heatmap_cache.get(teacher_id)
+        if cached and cached[0] == revision:
+            payload, etag = cached[1], cached[2]
+            _heatmap_cache.move_to_end(teacher_id)
+        else:
+            rows = []
+            if forms:
+                rows = db.client.rpc("get_teacher_topic_heatmap", {
+                    "teacher_uuid": teacher_id
+                }).execute().data or []
+
+            payload = _build_topic_heatmap(forms, rows)
+            etag = '"' + hashlib.sha1(json.dumps(payload, sort_keys=True).encode()).hexdigest() + '"'
+            _heatmap_cache[teacher_id] = (revision, payload, etag)
+            _heatmap_cache.move_to_end(teacher_id)
+            while len(_heatmap_cache) > HEATMAP_CACHE_SIZE:
+                _heatmap_cache.popitem(last=False)
+
+        headers = {"ETag": etag, "Cache-Control": "private, max-age=0, must-revalidate"}
+        if request.headers.get("if-none-match") == etag:
+            return Response(status_code=304, headers=headers)
+
+        return JSONResponse(content=payload, headers=headers)
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        print(f"[TEACHERS] Error building topic heatmap: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+def _build_topic_heatmap(forms: List[dict], rows: List[dict]) -> dict:
+    """
+    Pivot grouped (form, topic) rows into a topics x forms matrix
+
+    Args:
+        forms: Teacher's forms (column order)
+        rows: Output of the get_teacher_topic_heatmap RPC
+
+    Returns:
+        Dict with forms, topics, correct_pct / responses matrices and
+        per-topic overall percent correct (weakest topics first)
+    """
+    column_of = {form["id"]: col for col, form in enumerate(forms)}
+    topic_names: Dict[str, str] = {}
+    cells: Dict[Tuple[str, int], Tuple[int, int]] = {}
+
+    for row in rows:
+        col = column_of.get(row.get("form_id"))
+        key = row.get("topic_key")
+        if col is None or not key:
+            continue
+        topic_names.setdefault(key, row.get("topic_name") or key)
+        cells[(key, col)] = (int(row.get("num_correct") or 0), int(row.get("num_responses") or 0))
+
+    totals = {}
+    for (key, _), (correct, responses) in cells.items():
+        total = totals.setdefault(key, [0, 0])
+        total[0] += correct
+        total[1] += responses
+
+    overall = {key: (c / n * 100 if n else 0.0) for key, (c, n) in totals.items()}
+    topic_keys = sorted(topic_names, key=lambda key: overall[key])
+
+    correct_pct = []
+    response_counts = []
+    for key in topic_keys:
+        pct_row = []
+        count_row = []
+        for col in range(len(forms)):
+            correct, responses = cells.get((key, col), (0, 0))
+            pct_row.append(round(correct / responses * 100, 1) if responses else None)
+            count_row.append(responses)
+        correct_pct.append(pct_row)
+        response_counts.append(count_row)
+
+    return {
+        "forms": [{"slug": f.get("slug"), "title": f.get("title")} for f in forms],
+        "topics": [topic_names[key] for key in topic_keys],
+        "overall_pct": [round(overall[key], 1) for key in topic_keys],
+        "correct_pct": correct_pct,
+        "responses": response_counts,
+    }
+
+
+@router.get("/{teacher_email}/events")
+async def stream_teacher_events(teacher_email: EmailStr, request: Request):
+    """
+    Server-Sent Events stream of live submissions for a teacher's dashboard
+
+    Each completed submission on one of the teacher's forms is pushed as a
+    "submission" event with the score and per-topic stat deltas, so the
+    dashboard no longer needs to poll list/stats endpoints.
+
+    Args:
+        teacher_email: Teacher's email address
+
+    Returns:
+        text/event-stream response
+    """
+    teacher_result = db.client.table("teachers")\
+        .select("id")\
+        .eq("email", teacher_email.lower())\
+        .execute()
+
+    if not teacher_result.data:
+        raise HTTPException(status_code=404, detail="Teacher not found")
+
+    channel = teacher_channel(teacher_result.data[0]["id"])
+    bus = get_event_bus()
+    queue = bus.subscribe(channel)
+
+    async def event_stream():
+        try:
+            yield "retry: 5000\n\n"
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=EVENT_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+
+                yield f"event: {event.get('type', 'message')}\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            bus.unsubscribe(channel, queue)
+
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
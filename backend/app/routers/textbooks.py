@@ -1,27 +1,38 @@
 """Textbook upload and parsing endpoints"""
 
 import os
-from typing import List
+from typing import List, Optional
 from fastapi import APIRouter, UploadFile, File, HTTPException, Depends
 from pydantic import BaseModel, Field
 
-from app.services.textbook_parser import TextbookParser
-from app.services.topic_parser import get_topic_parser
-from app.models.topic import Topic, CourseLevel
+from app.services.ingestion_pipeline import (
+    COMPLETED,
+    FAILED,
+    STAGES,
+    get_ingestion_pipeline,
+    job_progress,
+)
+from app.models.topic import Topic
 from app.config import get_settings
 from app.database import db
+from app.utils.title_matcher import get_mapping_metrics
+from app.utils.upload_utils import UploadTooLargeError, save_upload
 
 router = APIRouter(prefix="/api/textbooks", tags=["textbooks"])
 settings = get_settings()
 
 
-class UploadTextbookResponse(BaseModel):
-    """Response after uploading a textbook"""
+class IngestionStatusResponse(BaseModel):
+    """Progress of a textbook through the ingestion pipeline"""
     textbook_id: str = Field(..., description="Unique textbook identifier")
-    title: str = Field(..., description="Textbook title")
-    total_pages: int = Field(..., description="Number of pages")
-    file_path: str = Field(..., description="Storage path")
-    topics: List[Topic] = Field(..., description="Auto-extracted topics")
+    title: Optional[str] = Field(None, description="Textbook title")
+    status: str = Field(..., description="queued, running, completed or failed")
+    stage: Optional[str] = Field(None, description="Stage in progress (or that failed)")
+    completed_stages: List[str] = Field(default_factory=list, description="Stages finished so far")
+    progress: float = Field(..., description="Fraction of stages completed (0-1)")
+    error: Optional[str] = Field(None, description="Failure reason, if failed")
+    status_url: str = Field(..., description="Where to poll for progress")
+    topics: List[Topic] = Field(default_factory=list, description="Auto-extracted topics (once completed)")
 
 
 class TextbookTopicsResponse(BaseModel):
@@ -30,136 +41,121 @@ class TextbookTopicsResponse(BaseModel):
     topics: List[Topic] = Field(..., description="Extracted topics")
 
 
-@router.post("/upload", response_model=UploadTextbookResponse)
+@router.post("/upload", response_model=IngestionStatusResponse, status_code=202)
 async def upload_textbook(
     file: UploadFile = File(..., description="PDF file to upload"),
     course_level: str = "ug"
 ):
     """
-    Upload a textbook PDF and automatically extract topics
-
-    Steps:
-    1. Validate PDF file
-    2. Save to storage
-    3. Parse textbook structure (chapters, sections)
-    4. Extract topics using Claude AI
-    5. Return textbook metadata and topics
+    Upload a textbook PDF and queue it for ingestion
+
+    The PDF is streamed to storage (size-limited, SHA-256 hashed) and the
+    rest - structure, page text, section index, topic extraction with
+    Claude and the database writes - runs in the background. Returns 202
+    with a status URL to poll; topics are included there once completed.
+
+    Every upload gets its own resource and topics. Re-uploading a PDF that
+    was ingested before reuses its cached structure, page text and index
+    (keyed by content hash), so only the database writes are repeated.
     """
 
     # Validate file type
     if not file.filename or not file.filename.lower().endswith('.pdf'):
         raise HTTPException(status_code=400, detail="File must be a PDF")
 
-    # Validate file size (50MB max)
-    file_content = await file.read()
-    file_size_mb = len(file_content) / (1024 * 1024)
-
-    if file_size_mb > 50:
-        raise HTTPException(status_code=400, detail="File size must be less than 50MB")
-
     # Generate unique textbook ID
     import uuid
     textbook_id = str(uuid.uuid4())
 
-    # Save file to storage
+    # Stream to storage, enforcing the size limit and hashing as we go
     upload_dir = settings.upload_dir or "/tmp/uploads"
-    os.makedirs(upload_dir, exist_ok=True)
-
     file_path = os.path.join(upload_dir, f"{textbook_id}.pdf")
 
-    with open(file_path, "wb") as f:
-        f.write(file_content)
-
-    # Parse textbook structure
-    parser = TextbookParser()
     try:
-        structure = await parser.parse_textbook(file_path)
-    except Exception as e:
-        # Clean up file on parsing error
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        raise HTTPException(status_code=500, detail=f"Failed to parse PDF: {str(e)}")
-
-    # Extract topics using Claude AI
-    topic_parser = get_topic_parser()
+        file_size_bytes, content_sha256 = await save_upload(
+            file,
+            file_path,
+            max_bytes=settings.max_upload_size_mb * 1024 * 1024
+        )
+    except UploadTooLargeError as e:
+        raise HTTPException(status_code=413, detail=str(e))
 
-    # Build syllabus-like text from textbook structure
-    syllabus_text = _build_syllabus_from_structure(structure)
+    file_size_mb = file_size_bytes / (1024 * 1024)
 
     try:
-        topics, _ = await topic_parser.parse_topics(
-            syllabus_text=syllabus_text,
-            course_level=CourseLevel(course_level) if course_level else CourseLevel.UNDERGRADUATE
+        job = get_ingestion_pipeline().submit(
+            textbook_id=textbook_id,
+            file_path=file_path,
+            file_name=file.filename,
+            file_size_mb=file_size_mb,
+            content_sha256=content_sha256,
+            course_level=course_level or "ug"
         )
     except Exception as e:
-        # Clean up file on topic extraction error
+        # Clean up file if the job could not be created
         if os.path.exists(file_path):
             os.remove(file_path)
-        raise HTTPException(status_code=500, detail=f"Failed to extract topics: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to queue textbook: {str(e)}")
+
+    return _job_response(job)
 
-    # Get title from filename (remove .pdf extension)
-    title = file.filename.replace('.pdf', '').replace('_', ' ').title()
 
-    # Store textbook in database
-    # First, we need a course_id - for now, use a default or create one
-    # In a real app, this would come from the authenticated user's course
+@router.get("/mapping-metrics")
+async def get_mapping_metrics_summary():
+    """
+    Topic-to-section mapping counts since startup
+
+    Shows how many topics were assigned by the local title matcher
+    versus sent to the LLM.
+    """
+    return get_mapping_metrics().snapshot()
+
+
+@router.get("/{textbook_id}/ingestion", response_model=IngestionStatusResponse)
+async def get_ingestion_status(textbook_id: str):
+    """
+    Ingestion progress for an uploaded textbook
+
+    Poll after upload until status is "completed" (topics included) or
+    "failed" (see error; retry resumes from the failed stage).
+    """
     try:
-        # Create or get default course
-        course_result = db.client.table("courses").select("id").limit(1).execute()
-
-        if course_result.data:
-            course_id = course_result.data[0]['id']
-        else:
-            # Create default course
-            new_course = db.client.table("courses").insert({
-                "title": "Default Course",
-                "course_level": "ug"
-            }).execute()
-            course_id = new_course.data[0]['id']
-
-        # Insert textbook resource
-        resource_data = {
-            "id": textbook_id,
-            "course_id": course_id,
-            "title": title,
-            "resource_type": "textbook",
-            "file_path": file_path,
-            "file_name": file.filename,
-            "file_size_mb": file_size_mb,
-            "total_pages": structure.get('total_pages', 0),
-            "metadata": {
-                "chapters": structure.get('chapters', []),
-                "title": structure.get('title', title)
-            },
-            "indexed": True
-        }
-
-        db.client.table("resources").insert(resource_data).execute()
-
-        # Store topics in database
-        for topic in topics:
-            topic_data = {
-                "course_id": course_id,
-                "topic_id": topic.id,
-                "name": topic.name,
-                "weight": topic.weight,
-                "order_index": topics.index(topic)
-            }
-            db.client.table("topics").insert(topic_data).execute()
+        job = get_ingestion_pipeline().get_job(textbook_id)
+        if job:
+            return _job_response(job)
+
+        # Textbooks ingested before the pipeline existed have no job row
+        resource_result = db.client.table("resources")\
+            .select("id, course_id, title")\
+            .eq("id", textbook_id)\
+            .limit(1)\
+            .execute()
+
+        if not resource_result.data:
+            raise HTTPException(status_code=404, detail="Textbook not found")
+
+        return _completed_response(resource_result.data[0])
 
+    except HTTPException:
+        raise
     except Exception as e:
-        # Clean up file on database error
-        if os.path.exists(file_path):
-            os.remove(file_path)
-        raise HTTPException(status_code=500, detail=f"Failed to store in database: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Failed to fetch ingestion status: {str(e)}")
 
-    return UploadTextbookResponse(
-        textbook_id=textbook_id,
-        title=title,
-        total_pages=structure.get('total_pages', 0),
-        file_path=file_path,
-        topics=topics
-    )
+
+@router.post("/{textbook_id}/ingestion/retry", response_model=IngestionStatusResponse, status_code=202)
+async def retry_ingestion(textbook_id: str):
+    """Re-queue a failed ingestion; completed stages are not repeated"""
+    pipeline = get_ingestion_pipeline()
+    job = pipeline.get_job(textbook_id)
+
+    if not job:
+        raise HTTPException(status_code=404, detail="Textbook not found")
+    if job["status"] != FAILED:
+        raise HTTPException(status_code=409, detail=f"Ingestion is {job['status']}, not failed")
+    if not pipeline.retry(job):
+        raise HTTPException(status_code=409, detail="Ingestion was already re-queued")
+
+    return _job_response(pipeline.get_job(textbook_id))
 
 
 @router.get("/{textbook_id}/topics", response_model=TextbookTopicsResponse)
@@ -178,24 +174,7 @@ async def get_textbook_topics(textbook_id: str):
             raise HTTPException(status_code=404, detail="Textbook not found")
 
         resource = resource_result.data[0]
-        course_id = resource['course_id']
-
-        # Get topics for this textbook's course
-        topics_result = db.client.table("topics")\
-            .select("*")\
-            .eq("course_id", course_id)\
-            .order("order_index")\
-            .execute()
-
-        # Transform to Topic models
-        topics = []
-        for t in topics_result.data:
-            topics.append(Topic(
-                id=t['topic_id'],
-                name=t['name'],
-                weight=t.get('weight', 1.0),
-                prereqs=[]  # TODO: Fetch from topic_prerequisites table if needed
-            ))
+        topics = _load_textbook_topics(resource)
 
         return TextbookTopicsResponse(
             textbook_id=textbook_id,
@@ -208,48 +187,59 @@ async def get_textbook_topics(textbook_id: str):
         raise HTTPException(status_code=500, detail=f"Failed to fetch topics: {str(e)}")
 
 
-def _build_syllabus_from_structure(structure: dict) -> str:
+def _load_textbook_topics(resource: dict) -> List[Topic]:
     """
-    Convert textbook structure into syllabus-like text for topic extraction
-
-    Args:
-        structure: Parsed textbook structure from TextbookParser
+    Topics stored for a textbook, in order
 
-    Returns:
-        Formatted text that looks like a syllabus
+    Topics from ingestion carry the textbook's id as source_id; textbooks
+    ingested before that fall back to all topics of their course.
     """
-    lines = []
-
-    # Add title
-    if 'title' in structure:
-        lines.append(f"Course: {structure['title']}")
-        lines.append("")
-
-    # Add chapters and sections
-    chapters = structure.get('chapters', [])
-
-    for chapter in chapters:
-        chapter_num = chapter.get('number', '')
-        chapter_title = chapter.get('title', '')
-        page_start = chapter.get('page_start', '')
-        page_end = chapter.get('page_end', '')
+    topics_result = db.client.table("topics")\
+        .select("*")\
+        .eq("course_id", resource['course_id'])\
+        .eq("source_id", resource['id'])\
+        .order("order_index")\
+        .execute()
+
+    if not topics_result.data:
+        topics_result = db.client.table("topics")\
+            .select("*")\
+            .eq("course_id", resource['course_id'])\
+            .order("order_index")\
+            .execute()
 
-        # Format: "Chapter 3: Derivatives (pp. 79-142)"
-        chapter_line = f"Chapter {chapter_num}: {chapter_title}"
-        if page_start and page_end:
-            chapter_line += f" (pp. {page_start}-{page_end})"
+    return [
+        Topic(
+            id=t['topic_id'],
+            name=t['name'],
+            weight=t.get('weight', 1.0),
+            prereqs=[]  # TODO: Fetch from topic_prerequisites table if needed
+        )
+        for t in topics_result.data
+    ]
 
-        lines.append(chapter_line)
 
-        # Add sections under this chapter
-        sections = chapter.get('sections', [])
-        for section in sections:
-            section_num = section.get('number', '')
-            section_title = section.get('title', '')
+def _job_response(job: dict) -> IngestionStatusResponse:
+    """Progress response for a job row (with topics once completed)"""
+    topics = []
+    if job["status"] == COMPLETED:
+        topics = [Topic(**t) for t in job.get("topics") or []]
 
-            if section_num and section_title:
-                lines.append(f"  {section_num} {section_title}")
+    return IngestionStatusResponse(
+        **job_progress(job),
+        status_url=f"{router.prefix}/{job['id']}/ingestion",
+        topics=topics
+    )
 
-        lines.append("")  # Blank line between chapters
 
-    return "\n".join(lines)
+def _completed_response(resource: dict) -> IngestionStatusResponse:
+    """Progress response for an already ingested textbook resource"""
+    return IngestionStatusResponse(
+        textbook_id=resource['id'],
+        title=resource.get('title'),
+        status=COMPLETED,
+        completed_stages=STAGES,
+        progress=1.0,
+        status_url=f"{router.prefix}/{resource['id']}/ingestion",
+        topics=_load_textbook_topics(resource)
+    )
@@ -0,0 +1,158 @@
+"""
+Event Bus Service
+In-process pub/sub for pushing live events (e.g. submissions) to dashboards
+
+Events are fanned out to subscribers in this process. With several
+uvicorn workers, set EVENT_BROKER=local: every worker then binds a Unix
+datagram socket in a shared directory and publishes go to all of them,
+a same-host stand-in for an external broker such as Redis.
+"""
+
+import asyncio
+import json
+import os
+import socket
+from pathlib import Path
+from typing import Dict, Optional, Set
+
+from app.config import settings
+
+# Events buffered per subscriber before the oldest are dropped
+SUBSCRIBER_QUEUE_SIZE = 100
+
+# Largest datagram the local broker will send
+MAX_DATAGRAM_BYTES = 60_000
+
+
+class EventBus:
+    """Channel-based fan-out to asyncio queues"""
+
+    def __init__(self):
+        self._subscribers: Dict[str, Set[asyncio.Queue]] = {}
+        self._broker: Optional["LocalSocketBroker"] = None
+
+    def subscribe(self, channel: str) -> asyncio.Queue:
+        """Register a new subscriber queue on a channel"""
+        self._ensure_broker()
+        queue: asyncio.Queue = asyncio.Queue(maxsize=SUBSCRIBER_QUEUE_SIZE)
+        self._subscribers.setdefault(channel, set()).add(queue)
+        return queue
+
+    def unsubscribe(self, channel: str, queue: asyncio.Queue) -> None:
+        """Remove a subscriber queue"""
+        subscribers = self._subscribers.get(channel)
+        if not subscribers:
+            return
+        subscribers.discard(queue)
+        if not subscribers:
+            del self._subscribers[channel]
+
+    def publish(self, channel: str, event: Dict) -> None:
+        """
+        Publish an event to every subscriber of a channel
+
+        Never blocks: slow subscribers lose their oldest buffered events.
+
+        Args:
+            channel: Channel name (e.g. "teacher:<uuid>")
+            event: JSON-serializable event payload
+        """
+        self._ensure_broker()
+        if self._broker:
+            self._broker.send(channel, event)
+        else:
+            self.deliver(channel, event)
+
+    def deliver(self, channel: str, event: Dict) -> None:
+        """Hand an event to this process's subscribers"""
+        for queue in list(self._subscribers.get(channel, ())):
+            if queue.full():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    pass
+            queue.put_nowait(event)
+
+    def _ensure_broker(self) -> None:
+        """Start the cross-worker broker on first use if configured"""
+        if self._broker is not None or settings.event_broker != "local":
+            return
+        self._broker = LocalSocketBroker(settings.cache_dir / "events", self)
+        self._broker.start()
+
+
+class LocalSocketBroker:
+    """
+    Same-host broker over Unix datagram sockets
+
+    Each worker binds <directory>/<pid>.sock; publishing sends the event to
+    every socket in the directory (including our own), and stale sockets
+    from dead workers are removed on send failure.
+    """
+
+    def __init__(self, directory: Path, bus: EventBus):
+        self.directory = directory
+        self.bus = bus
+        self.path = directory / f"{os.getpid()}.sock"
+        self._sender = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        self._sender.setblocking(False)
+
+    def start(self) -> None:
+        """Bind this worker's socket and start receiving"""
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if self.path.exists():
+            self.path.unlink()
+
+        receiver = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        receiver.bind(str(self.path))
+        receiver.setblocking(False)
+
+        asyncio.get_running_loop().add_reader(receiver.fileno(), self._on_readable, receiver)
+        print(f"[EVENTS] Local broker listening on {self.path}")
+
+    def send(self, channel: str, event: Dict) -> None:
+        """Broadcast an event to every worker on this host"""
+        payload = json.dumps({"channel": channel, "event": event}, default=str).encode()
+        if len(payload) > MAX_DATAGRAM_BYTES:
+            print(f"[EVENTS WARNING] Dropping oversized event on {channel} ({len(payload)} bytes)")
+            return
+
+        for peer in self.directory.glob("*.sock"):
+            try:
+                self._sender.sendto(payload, str(peer))
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker exited without cleaning up
+                peer.unlink(missing_ok=True)
+            except BlockingIOError:
+                print(f"[EVENTS WARNING] Peer {peer.name} is not keeping up, event dropped")
+
+    def _on_readable(self, receiver: socket.socket) -> None:
+        """Drain pending datagrams into the in-process bus"""
+        while True:
+            try:
+                payload = receiver.recv(MAX_DATAGRAM_BYTES)
+            except BlockingIOError:
+                return
+
+            try:
+                message = json.loads(payload)
+                self.bus.deliver(message["channel"], message["event"])
+            except Exception as e:
+                print(f"[EVENTS ERROR] Bad broker message: {e}")
+
+
+def teacher_channel(teacher_id: str) -> str:
+    """Channel name for a teacher's dashboard events"""
+    return f"teacher:{teacher_id}"
+
+
+# Global instance
+_event_bus: Optional[EventBus] = None
+
+
+def get_event_bus() -> EventBus:
+    """Get or create global event bus instance"""
+    global _event_bus
+    if _event_bus is None:
+        _event_bus = EventBus()
+    return _event_bus
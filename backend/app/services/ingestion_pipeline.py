@@ -0,0 +1,365 @@
+"""
+Ingestion Pipeline
+Background, resumable textbook ingestion in stages with persisted progress
+
+Stages, in order:
+    store      - PDF saved and hashed (done by the upload route)
+    structure  - outline, or ToC / header scan (cached by content hash)
+    page_text  - per-page text store
+    index      - BM25 section index
+    topics     - topic extraction with Claude (saved on the job row)
+    database   - resource and topic rows
+
+Every stage's output is persisted, so a job that fails or is interrupted
+by a restart resumes from the first stage it has not completed.
+"""
+
+import asyncio
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from typing import List, Dict, Optional
+
+from app.database import db
+from app.models.topic import Topic, CourseLevel
+from app.services.textbook_parser import get_textbook_parser
+from app.services.topic_parser import get_topic_parser
+from app.services.topic_store import upsert_topics
+from app.utils.textbook_structure import Section, TextbookStructure
+
+# Titles that carry their own number ("Chapter 3: Limits", "3.2 Rates")
+_NUMBERED_TITLE = re.compile(r'^(?:chapter|section|part|unit)\b|^\d+(?:\.\d+)*\b', re.IGNORECASE)
+
+STAGES = ["store", "structure", "page_text", "index", "topics", "database"]
+
+# Job statuses
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+# A running job not updated for this long is assumed orphaned by a restart
+STALE_JOB_SECONDS = 900
+
+
+def build_syllabus_from_structure(structure: TextbookStructure, depth: int = 3) -> str:
+    """
+    Convert textbook structure into syllabus-like text for topic extraction
+
+    Walks the chapter tree: one line per chapter with its page range, and
+    its sections (and subsections, down to depth) indented beneath it.
+
+    Args:
+        structure: Parsed textbook structure from TextbookParser
+        depth: Levels of the tree to include (1 = chapters only)
+
+    Returns:
+        Formatted text that looks like a syllabus
+    """
+    lines = []
+
+    # Add title
+    if structure.title:
+        lines.append(f"Course: {structure.title}")
+        lines.append("")
+
+    def add_sections(sections: List[Section], indent: int) -> None:
+        for section in sections:
+            label = _section_label(section)
+            if label:
+                lines.append(f"{'  ' * indent}{label}")
+            if indent + 1 < depth:
+                add_sections(section.children, indent + 1)
+
+    for chapter in structure.chapters:
+        # Format: "Chapter 3: Derivatives (pp. 79-142)"
+        chapter_line = _section_label(chapter, chapter=True)
+        if chapter.page_end > chapter.page_start:
+            chapter_line += f" (pp. {chapter.page_start}-{chapter.page_end})"
+
+        lines.append(chapter_line)
+
+        # Add sections under this chapter
+        if depth > 1:
+            add_sections(chapter.children, 1)
+
+        lines.append("")  # Blank line between chapters
+
+    return "\n".join(lines)
+
+
+def _section_label(section: Section, chapter: bool = False) -> str:
+    """Section title with its number, unless the title already starts with one"""
+    title = section.title.strip()
+    if not section.section_number or _NUMBERED_TITLE.match(title):
+        return title
+    if chapter:
+        return f"Chapter {section.section_number}: {title}"
+    return f"{section.section_number} {title}"
+
+
+def job_progress(job: Dict) -> Dict:
+    """Public view of a job row"""
+    completed = job.get("completed_stages") or []
+    return {
+        "textbook_id": job["id"],
+        "title": job.get("title"),
+        "status": job["status"],
+        "stage": job.get("stage"),
+        "completed_stages": completed,
+        "progress": round(len(completed) / len(STAGES), 2),
+        "error": job.get("error"),
+    }
+
+
+class IngestionPipeline:
+    """Queue and background worker for textbook ingestion jobs"""
+
+    def __init__(self):
+        self.parser = get_textbook_parser()
+        self._queue: asyncio.Queue = asyncio.Queue()
+        self._worker: Optional[asyncio.Task] = None
+
+    def start(self) -> None:
+        """Start the worker and resume jobs left unfinished by a previous run"""
+        if self._worker is not None and not self._worker.done():
+            return
+        self._worker = asyncio.create_task(self._run_worker())
+
+        try:
+            for job_id in self._unfinished_job_ids():
+                self._queue.put_nowait(job_id)
+        except Exception as e:
+            print(f"[INGESTION WARNING] Could not resume unfinished jobs: {e}")
+
+    async def stop(self) -> None:
+        """Stop the worker (jobs in progress resume on next start)"""
+        if self._worker is None:
+            return
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+        self._worker = None
+
+    def submit(
+        self,
+        textbook_id: str,
+        file_path: str,
+        file_name: str,
+        file_size_mb: float,
+        content_sha256: str,
+        course_level: str = "ug"
+    ) -> Dict:
+        """
+        Create a job for a stored upload and queue it
+
+        Args:
+            textbook_id: ID the resource will be created with
+            file_path: Where the PDF was stored
+            file_name: Original upload filename
+            file_size_mb: Size of the PDF
+            content_sha256: SHA-256 of the PDF
+            course_level: Course level for topic extraction
+
+        Returns:
+            The job row
+        """
+        job = {
+            "id": textbook_id,
+            "title": file_name.replace('.pdf', '').replace('_', ' ').title(),
+            "file_path": file_path,
+            "file_name": file_name,
+            "file_size_mb": file_size_mb,
+            "content_sha256": content_sha256,
+            "course_level": course_level,
+            "status": QUEUED,
+            "stage": STAGES[1],
+            "completed_stages": STAGES[:1],
+        }
+        result = db.client.table("ingestion_jobs").insert(job).execute()
+        self._queue.put_nowait(textbook_id)
+        print(f"[INGESTION] Queued textbook {textbook_id} ({content_sha256[:12]})")
+        return result.data[0] if result.data else job
+
+    def retry(self, job: Dict) -> bool:
+        """Re-queue a failed job; it resumes at the stage that failed"""
+        if job["status"] != FAILED or not self._claim(job["id"], FAILED, QUEUED):
+            return False
+        self._queue.put_nowait(job["id"])
+        return True
+
+    def get_job(self, textbook_id: str) -> Optional[Dict]:
+        """Job row by textbook ID"""
+        result = db.client.table("ingestion_jobs")\
+            .select("*")\
+            .eq("id", textbook_id)\
+            .limit(1)\
+            .execute()
+        return result.data[0] if result.data else None
+
+    async def _run_worker(self) -> None:
+        """Process queued jobs one at a time"""
+        while True:
+            job_id = await self._queue.get()
+            try:
+                await self.run_job(job_id)
+            except Exception as e:
+                print(f"[INGESTION ERROR] Job {job_id} crashed: {e}")
+            finally:
+                self._queue.task_done()
+
+    async def run_job(self, job_id: str) -> None:
+        """
+        Run a queued job's remaining stages
+
+        Claims the job first, so a job queued twice (or by two server
+        processes) only runs once.
+        """
+        if not self._claim(job_id, QUEUED, RUNNING):
+            return
+
+        job = self.get_job(job_id)
+        if not os.path.exists(job["file_path"]):
+            self._update(job_id, {"status": FAILED, "error": f"Uploaded PDF is missing: {job['file_path']}"})
+            return
+
+        completed: List[str] = list(job.get("completed_stages") or [])
+        state: Dict = {}
+        print(f"\n[INGESTION] Running textbook {job_id} (done: {', '.join(completed) or 'none'})")
+
+        for stage in STAGES:
+            if stage in completed:
+                continue
+
+            self._update(job_id, {"stage": stage})
+            try:
+                await getattr(self, f"_stage_{stage}")(job, state)
+            except Exception as e:
+                print(f"[INGESTION ERROR] Textbook {job_id} failed at {stage}: {e}")
+                self._update(job_id, {"status": FAILED, "error": f"{stage}: {e}"})
+                return
+
+            completed.append(stage)
+            self._update(job_id, {"completed_stages": completed, "error": None})
+            print(f"[INGESTION]   ✓ {stage}")
+
+        self._update(job_id, {"status": COMPLETED, "stage": None})
+        print(f"[INGESTION] ✓ Textbook {job_id} ingested")
+
+    async def _structure(self, job: Dict, state: Dict) -> TextbookStructure:
+        """Parsed structure (a cache hit once the structure stage has run)"""
+        if "structure" not in state:
+            state["structure"] = await self.parser.load_structure(
+                job["file_path"],
+                title=job.get("title"),
+                content_hash=job["content_sha256"]
+            )
+        return state["structure"]
+
+    async def _stage_structure(self, job: Dict, state: Dict) -> None:
+        await self._structure(job, state)
+
+    async def _stage_page_text(self, job: Dict, state: Dict) -> None:
+        await self.parser.build_page_store(job["file_path"], job["content_sha256"])
+
+    async def _stage_index(self, job: Dict, state: Dict) -> None:
+        structure = await self._structure(job, state)
+        # Tokenizing section text is CPU-bound; keep it off the event loop
+        await asyncio.to_thread(self.parser.get_section_index, structure)
+
+    async def _stage_topics(self, job: Dict, state: Dict) -> None:
+        structure = await self._structure(job, state)
+        topics, _ = await get_topic_parser().parse_topics(
+            syllabus_text=build_syllabus_from_structure(structure),
+            course_level=CourseLevel(job.get("course_level") or "ug")
+        )
+        job["topics"] = [topic.model_dump() for topic in topics]
+        self._update(job["id"], {"topics": job["topics"]})
+
+    async def _stage_database(self, job: Dict, state: Dict) -> None:
+        structure = await self._structure(job, state)
+        topics = [Topic(**t) for t in job.get("topics") or []]
+
+        # Create or get default course
+        # In a real app, this would come from the authenticated user's course
+        course_result = db.client.table("courses").select("id").limit(1).execute()
+
+        if course_result.data:
+            course_id = course_result.data[0]['id']
+        else:
+            new_course = db.client.table("courses").insert({
+                "title": "Default Course",
+                "course_level": "ug"
+            }).execute()
+            course_id = new_course.data[0]['id']
+
+        # Upsert so a resumed stage does not fail on its own earlier write
+        db.client.table("resources").upsert({
+            "id": job["id"],
+            "course_id": course_id,
+            "title": job["title"],
+            "resource_type": "textbook",
+            "file_path": job["file_path"],
+            "file_name": job["file_name"],
+            "file_size_mb": job.get("file_size_mb"),
+            "content_sha256": job["content_sha256"],
+            "total_pages": structure.total_pages,
+            "metadata": {
+                "chapters": structure.outline(),
+                "title": structure.title or job["title"]
+            },
+            "indexed": True
+        }).execute()
+
+        # Topics and prerequisites in one batch each, scoped to this job so a
+        # resumed stage updates its own rows and never another textbook's
+        upsert_topics(course_id, topics, source_id=job["id"])
+
+    def _claim(self, job_id: str, expected: str, status: str) -> bool:
+        """Move a job between statuses only if no one else already has"""
+        result = db.client.table("ingestion_jobs")\
+            .update({"status": status, "updated_at": _now()})\
+            .eq("id", job_id)\
+            .eq("status", expected)\
+            .execute()
+        return bool(result.data)
+
+    def _update(self, job_id: str, fields: Dict) -> None:
+        db.client.table("ingestion_jobs")\
+            .update({**fields, "updated_at": _now()})\
+            .eq("id", job_id)\
+            .execute()
+
+    def _unfinished_job_ids(self) -> List[str]:
+        """Queued jobs, plus running jobs orphaned by a restart (re-queued)"""
+        cutoff = (datetime.now(timezone.utc) - timedelta(seconds=STALE_JOB_SECONDS)).isoformat()
+        db.client.table("ingestion_jobs")\
+            .update({"status": QUEUED, "updated_at": _now()})\
+            .eq("status", RUNNING)\
+            .lt("updated_at", cutoff)\
+            .execute()
+
+        result = db.client.table("ingestion_jobs")\
+            .select("id")\
+            .eq("status", QUEUED)\
+            .order("created_at")\
+            .execute()
+        return [row["id"] for row in result.data]
+
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# Global instance
+_ingestion_pipeline: Optional[IngestionPipeline] = None
+
+
+def get_ingestion_pipeline() -> IngestionPipeline:
+    """Get or create global ingestion pipeline instance"""
+    global _ingestion_pipeline
+    if _ingestion_pipeline is None:
+        _ingestion_pipeline = IngestionPipeline()
+    return _ingestion_pipeline
@@ -0,0 +1,459 @@
+"""
+IRT Calibration Service
+Fits Rasch / 2PL item parameters over the question bank from stored responses
+
+Run as an offline job:
+    python -m app.services.irt_calibration            # incremental refresh
+    python -m app.services.irt_calibration --full     # recalibrate everything
+"""
+
+import argparse
+from datetime import datetime, timezone
+from typing import List, Dict, Optional, Set, Tuple
+
+import numpy as np
+
+from app.database import db
+
+# Rows fetched per round trip when streaming responses
+RESPONSE_PAGE_SIZE = 1000
+
+# Session ids per IN (...) filter (keeps request URLs short)
+ID_BATCH_SIZE = 200
+
+# Items need this many responses before their parameters are published
+MIN_RESPONSES_PER_ITEM = 20
+
+# Ability quadrature grid for marginal maximum likelihood
+QUADRATURE_POINTS = 41
+QUADRATURE_RANGE = 4.0
+
+# Weak Gaussian priors keep items with all/none correct finite
+C_PRIOR_SD = 4.0
+A_PRIOR_SD = 1.0
+MIN_DISCRIMINATION = 0.05
+MAX_DISCRIMINATION = 5.0
+M_STEP_NEWTON_ITERS = 3
+
+MODELS = ("rasch", "2pl")
+
+
+class ResponseData:
+    """
+    Compact sparse response triplets
+
+    One int32 session index, one int32 item index and one int8 outcome per
+    response (9 bytes each), so hundreds of thousands of responses fit in a
+    few megabytes.
+    """
+
+    def __init__(self):
+        self.session_index: Dict[str, int] = {}
+        self.item_index: Dict[str, int] = {}
+        self._persons: List[np.ndarray] = []
+        self._items: List[np.ndarray] = []
+        self._outcomes: List[np.ndarray] = []
+
+    def add_page(self, rows: List[Dict], skip_question_ids: Optional[set] = None) -> None:
+        """
+        Append a page of response rows
+
+        Args:
+            rows: Response rows with session_id, question_id and is_correct
+            skip_question_ids: Questions whose responses were already loaded
+        """
+        persons, items, outcomes = [], [], []
+        for row in rows:
+            if not row.get("session_id") or not row.get("question_id"):
+                continue
+            if skip_question_ids and row["question_id"] in skip_question_ids:
+                continue
+            persons.append(self.session_index.setdefault(row["session_id"], len(self.session_index)))
+            items.append(self.item_index.setdefault(row["question_id"], len(self.item_index)))
+            outcomes.append(1 if row.get("is_correct") else 0)
+
+        if persons:
+            self._persons.append(np.asarray(persons, dtype=np.int32))
+            self._items.append(np.asarray(items, dtype=np.int32))
+            self._outcomes.append(np.asarray(outcomes, dtype=np.int8))
+
+    def arrays(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Concatenate pages into (persons, items, outcomes)"""
+        if not self._persons:
+            empty = np.zeros(0, dtype=np.int32)
+            return empty, empty.copy(), np.zeros(0, dtype=np.int8)
+
+        self._persons = [np.concatenate(self._persons)]
+        self._items = [np.concatenate(self._items)]
+        self._outcomes = [np.concatenate(self._outcomes)]
+        return self._persons[0], self._items[0], self._outcomes[0]
+
+
+def fit_irt(
+    persons: np.ndarray,
+    items: np.ndarray,
+    outcomes: np.ndarray,
+    num_persons: int,
+    num_items: int,
+    model: str = "2pl",
+    a_init: Optional[np.ndarray] = None,
+    b_init: Optional[np.ndarray] = None,
+    free_items: Optional[np.ndarray] = None,
+    max_iter: int = 200,
+    tol: float = 1e-3
+) -> Dict[str, np.ndarray]:
+    """
+    Marginal maximum likelihood (Bock-Aitkin EM) item calibration
+
+    Abilities are integrated out over a fixed quadrature grid with a
+    standard normal prior, which also pins down the latent scale.
+
+    E-step: per-person posterior weights over the grid, accumulated with
+    one np.bincount per grid node (memory is persons x nodes, never
+    responses x nodes).
+    M-step: expected correct/total counts per item and node, then a few
+    vectorized 2x2 Newton steps on every item's (slope, intercept).
+
+    Args:
+        persons, items, outcomes: Sparse response triplets
+        num_persons, num_items: Sizes of the index spaces
+        model: "rasch" (a fixed at 1) or "2pl"
+        a_init, b_init: Warm-start item parameters
+        free_items: Boolean mask of items to update (others stay fixed)
+        max_iter: Maximum EM iterations
+        tol: Stop when no item parameter moves more than this
+
+    Returns:
+        Dict with EAP theta, a, b, b_se and per-item response counts
+    """
+    if model not in MODELS:
+        raise ValueError(f"Unknown IRT model: {model}")
+
+    y = outcomes.astype(np.float64)
+    nodes = np.linspace(-QUADRATURE_RANGE, QUADRATURE_RANGE, QUADRATURE_POINTS)
+    log_prior = -0.5 * nodes ** 2
+    log_prior -= np.logaddexp.reduce(log_prior)
+
+    a = np.ones(num_items) if a_init is None else np.asarray(a_init, dtype=np.float64).copy()
+    b = np.zeros(num_items) if b_init is None else np.asarray(b_init, dtype=np.float64).copy()
+    free = np.ones(num_items, dtype=bool) if free_items is None else free_items
+    counts = np.bincount(items, minlength=num_items)
+
+    # Intercept form: P = sigmoid(a * theta + c) with c = -a * b
+    c = -a * b
+    covariance = np.zeros((num_items, 2, 2))
+    posterior = np.zeros((num_persons, len(nodes)))
+
+    for _ in range(max_iter):
+        # E-step: log-likelihood of each person's responses at each node
+        for q, node in enumerate(nodes):
+            z = np.clip(a[items] * node + c[items], -30.0, 30.0)
+            log_lik = y * z - np.logaddexp(0.0, z)
+            posterior[:, q] = np.bincount(persons, log_lik, num_persons)
+
+        posterior += log_prior
+        posterior -= np.logaddexp.reduce(posterior, axis=1, keepdims=True)
+        np.exp(posterior, out=posterior)
+
+        # Expected totals (n) and corrects (r) per item and node
+        n = np.empty((num_items, len(nodes)))
+        r = np.empty((num_items, len(nodes)))
+        for q in range(len(nodes)):
+            weights = posterior[persons, q]
+            n[:, q] = np.bincount(items, weights, num_items)
+            r[:, q] = np.bincount(items, weights * y, num_items)
+
+        # M-step: Newton on (a, c) for every item at once
+        a_prev, b_prev = a.copy(), -c / a
+        for _ in range(M_STEP_NEWTON_ITERS):
+            p = 1.0 / (1.0 + np.exp(-np.clip(a[:, None] * nodes + c[:, None], -30.0, 30.0)))
+            residual = r - n * p
+            info = n * p * (1.0 - p)
+
+            g_c = residual.sum(axis=1) - c / C_PRIOR_SD ** 2
+            h_cc = -info.sum(axis=1) - 1.0 / C_PRIOR_SD ** 2
+
+            if model == "2pl":
+                g_a = (residual * nodes).sum(axis=1) - (a - 1.0) / A_PRIOR_SD ** 2
+                h_aa = -(info * nodes ** 2).sum(axis=1) - 1.0 / A_PRIOR_SD ** 2
+                h_ac = -(info * nodes).sum(axis=1)
+                det = h_aa * h_cc - h_ac ** 2
+                step_a = (h_cc * g_a - h_ac * g_c) / det
+                step_c = (h_aa * g_c - h_ac * g_a) / det
+                a = np.where(free, np.clip(a - step_a, MIN_DISCRIMINATION, MAX_DISCRIMINATION), a)
+                covariance[:, 0, 0] = -h_cc / det
+                covariance[:, 1, 1] = -h_aa / det
+                covariance[:, 0, 1] = covariance[:, 1, 0] = h_ac / det
+            else:
+                step_c = g_c / h_cc
+                covariance[:, 1, 1] = -1.0 / h_cc
+
+            c = np.where(free, c - step_c, c)
+
+        b = -c / a
+        if max(np.abs(a - a_prev).max(initial=0.0), np.abs(b - b_prev).max(initial=0.0)) < tol:
+            break
+
+    # Delta method: b = -c / a
+    grad_b = np.stack([c / a ** 2, -1.0 / a], axis=1)
+    b_var = np.einsum("ij,ijk,ik->i", grad_b, covariance, grad_b)
+
+    return {
+        "theta": posterior @ nodes,
+        "a": a,
+        "b": b,
+        "b_se": np.sqrt(np.maximum(b_var, 0.0)),
+        "counts": counts,
+    }
+
+
+class IRTCalibrationService:
+    """Batch job that calibrates question parameters from responses"""
+
+    def calibrate(self, model: str = "2pl", full: bool = False) -> Dict:
+        """
+        Run a calibration pass and store the fitted parameters
+
+        Full mode streams every response. Incremental mode only loads
+        responses that arrived since the last run, the other responses to
+        the questions they touch, and the rest of those sessions' answers;
+        items outside that set keep their stored parameters and act as
+        anchors for the abilities.
+
+        Args:
+            model: "rasch" or "2pl"
+            full: Ignore the watermark and refit the whole bank
+
+        Returns:
+            Summary with counts and the new watermark
+        """
+        started_at = datetime.now(timezone.utc).isoformat()
+        watermark, covered_ids = (None, set()) if full else self._last_watermark(model)
+
+        print(f"\n[IRT] Calibrating {model} ({'full' if full or not watermark else f'since {watermark}'})...")
+
+        data = ResponseData()
+        new_watermark, new_watermark_ids = watermark, set(covered_ids)
+
+        if not watermark:
+            for page in self._iter_responses():
+                data.add_page(page)
+                new_watermark, new_watermark_ids = _advance_watermark(new_watermark, new_watermark_ids, page)
+            affected_question_ids = set(data.item_index)
+        else:
+            # Read from the watermark inclusively: responses committed after the
+            # last run with the same timestamp are new, the ones it saw are not
+            affected_question_ids = set()
+            for page in self._iter_responses(since=watermark):
+                affected_question_ids.update(
+                    r["question_id"] for r in page
+                    if r.get("question_id") and r["id"] not in covered_ids
+                )
+                new_watermark, new_watermark_ids = _advance_watermark(new_watermark, new_watermark_ids, page)
+
+            if not affected_question_ids:
+                print("[IRT] No new responses since last run")
+                return {"model": model, "items_updated": 0, "responses": 0, "watermark": watermark}
+
+            # Every response to the affected questions...
+            session_ids = set()
+            affected_list = sorted(affected_question_ids)
+            for start in range(0, len(affected_list), ID_BATCH_SIZE):
+                for page in self._iter_responses(question_ids=affected_list[start:start + ID_BATCH_SIZE]):
+                    data.add_page(page)
+                    session_ids.update(r["session_id"] for r in page if r.get("session_id"))
+
+            # ...plus the rest of those sessions, to pin down abilities
+            session_list = sorted(session_ids)
+            for start in range(0, len(session_list), ID_BATCH_SIZE):
+                for page in self._iter_responses(session_ids=session_list[start:start + ID_BATCH_SIZE]):
+                    data.add_page(page, skip_question_ids=affected_question_ids)
+
+        persons, items, outcomes = data.arrays()
+        question_ids = list(data.item_index)
+        num_items = len(question_ids)
+
+        if not num_items:
+            print("[IRT] No responses to calibrate")
+            return {"model": model, "items_updated": 0, "responses": 0, "watermark": new_watermark}
+
+        a_init, b_init, calibrated = self._stored_parameters(question_ids, model)
+        # Anchors must already have parameters; anything else is refit too.
+        # Uncalibrated items outside the affected set are only seen through
+        # the affected sessions, so they are fit as nuisance parameters but
+        # not published (a full run calibrates them on all their responses).
+        affected = np.array([qid in affected_question_ids for qid in question_ids])
+        free_items = affected | ~calibrated
+
+        fitted = fit_irt(
+            persons, items, outcomes,
+            num_persons=len(data.session_index),
+            num_items=num_items,
+            model=model,
+            a_init=a_init,
+            b_init=b_init,
+            free_items=free_items
+        )
+
+        calibrated_at = datetime.now(timezone.utc).isoformat()
+        updates = []
+        for col, question_id in enumerate(question_ids):
+            if not affected[col] or fitted["counts"][col] < MIN_RESPONSES_PER_ITEM:
+                continue
+            updates.append({
+                "id": question_id,
+                "irt_model": model,
+                "irt_a": round(float(fitted["a"][col]), 4),
+                "irt_b": round(float(fitted["b"][col]), 4),
+                "irt_b_se": round(float(fitted["b_se"][col]), 4),
+                "irt_n_responses": int(fitted["counts"][col]),
+                "irt_calibrated_at": calibrated_at,
+            })
+
+        for start in range(0, len(updates), RESPONSE_PAGE_SIZE):
+            db.client.rpc("apply_irt_parameters", {"params": updates[start:start + RESPONSE_PAGE_SIZE]}).execute()
+
+        db.client.table("irt_calibration_runs").insert({
+            "model": model,
+            "full_refit": not watermark,
+            "watermark": new_watermark,
+            "watermark_ids": sorted(new_watermark_ids),
+            "responses_used": int(len(outcomes)),
+            "items_updated": len(updates),
+            "started_at": started_at,
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+        }).execute()
+
+        print(f"[IRT] ✓ Fitted {num_items} items over {len(outcomes)} responses, stored {len(updates)}")
+
+        return {
+            "model": model,
+            "items_updated": len(updates),
+            "responses": int(len(outcomes)),
+            "watermark": new_watermark,
+        }
+
+    def _iter_responses(
+        self,
+        since: Optional[str] = None,
+        question_ids: Optional[List[str]] = None,
+        session_ids: Optional[List[str]] = None
+    ):
+        """
+        Stream response rows in keyset pages ordered by id
+
+        Args:
+            since: Only responses created at or after this timestamp
+            question_ids: Only responses to these questions
+            session_ids: Only responses from these sessions
+        """
+        last_id = None
+
+        while True:
+            query = db.client.table("responses")\
+                .select("id, session_id, question_id, is_correct, created_at")\
+                .order("id")\
+                .limit(RESPONSE_PAGE_SIZE)
+
+            if since:
+                query = query.gte("created_at", since)
+            if question_ids:
+                query = query.in_("question_id", question_ids)
+            if session_ids:
+                query = query.in_("session_id", session_ids)
+            if last_id:
+                query = query.gt("id", last_id)
+
+            rows = query.execute().data or []
+            if not rows:
+                return
+
+            yield rows
+
+            if len(rows) < RESPONSE_PAGE_SIZE:
+                return
+            last_id = rows[-1]["id"]
+
+    def _stored_parameters(
+        self,
+        question_ids: List[str],
+        model: str
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Previously fitted parameters (a, b, has-parameters mask) as warm start / anchors"""
+        a = np.ones(len(question_ids))
+        b = np.zeros(len(question_ids))
+        calibrated = np.zeros(len(question_ids), dtype=bool)
+        position = {qid: col for col, qid in enumerate(question_ids)}
+
+        for start in range(0, len(question_ids), ID_BATCH_SIZE):
+            result = db.client.table("questions")\
+                .select("id, irt_model, irt_a, irt_b")\
+                .in_("id", question_ids[start:start + ID_BATCH_SIZE])\
+                .execute()
+
+            for row in result.data or []:
+                if row.get("irt_model") != model or row.get("irt_b") is None:
+                    continue
+                col = position[row["id"]]
+                b[col] = float(row["irt_b"])
+                calibrated[col] = True
+                if row.get("irt_a"):
+                    a[col] = float(row["irt_a"])
+
+        return a, b, calibrated
+
+    def _last_watermark(self, model: str) -> Tuple[Optional[str], Set[str]]:
+        """Newest response timestamp covered by the previous run, and the responses at it"""
+        result = db.client.table("irt_calibration_runs")\
+            .select("watermark, watermark_ids")\
+            .eq("model", model)\
+            .order("finished_at", desc=True)\
+            .limit(1)\
+            .execute()
+
+        if not result.data:
+            return None, set()
+        return result.data[0].get("watermark"), set(result.data[0].get("watermark_ids") or [])
+
+
+def _advance_watermark(
+    watermark: Optional[str],
+    watermark_ids: Set[str],
+    rows: List[Dict]
+) -> Tuple[Optional[str], Set[str]]:
+    """
+    Max created_at seen so far and the ids of the responses at it
+
+    ISO timestamps compare lexicographically.
+    """
+    for row in rows:
+        created_at = row.get("created_at")
+        if not created_at:
+            continue
+        if watermark is None or created_at > watermark:
+            watermark, watermark_ids = created_at, {row["id"]}
+        elif created_at == watermark:
+            watermark_ids.add(row["id"])
+    return watermark, watermark_ids
+
+
+# Global instance
+_irt_calibration_service: Optional[IRTCalibrationService] = None
+
+
+def get_irt_calibration_service() -> IRTCalibrationService:
+    """Get or create global IRT calibration service instance"""
+    global _irt_calibration_service
+    if _irt_calibration_service is None:
+        _irt_calibration_service = IRTCalibrationService()
+    return _irt_calibration_service
+
+
+if __name__ == "__main__":
+    cli = argparse.ArgumentParser(description="Calibrate IRT item parameters from responses")
+    cli.add_argument("--model", choices=MODELS, default="2pl")
+    cli.add_argument("--full", action="store_true", help="Refit every item instead of only new responses")
+    args = cli.parse_args()
+
+    summary = get_irt_calibration_service().calibrate(model=args.model, full=args.full)
+    print(summary)
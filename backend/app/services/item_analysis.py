@@ -0,0 +1,232 @@
+"""
+Item Analysis Service
+Classical test theory statistics for a form's questions, computed with NumPy
+"""
+
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.database import db
+from app.services.results_export import get_results_exporter
+
+# Questions allow at most 6 options (see Question.options)
+MAX_OPTIONS = 6
+
+# Forms kept in the in-process result cache
+CACHE_MAX_FORMS = 256
+
+
+def build_response_matrix(
+    questions: List[Dict],
+    session_pages
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Load responses into dense student x item matrices
+
+    Args:
+        questions: Ordered questions from ResultsExporter.load_form_questions
+        session_pages: Iterable of session-dict lists with "responses" attached
+
+    Returns:
+        (selected, correct) arrays of shape (students, items). selected holds
+        the chosen option index (-1 if unanswered); correct holds 1/0.
+    """
+    column_of = {q["id"]: col for col, q in enumerate(questions)}
+    num_items = len(questions)
+
+    selected_pages = []
+    correct_pages = []
+
+    for sessions in session_pages:
+        selected = np.full((len(sessions), num_items), -1, dtype=np.int8)
+        correct = np.zeros((len(sessions), num_items), dtype=np.int8)
+
+        rows, cols, options, marks = [], [], [], []
+        for row, session in enumerate(sessions):
+            for response in session["responses"]:
+                col = column_of.get(response["question_id"])
+                option = response.get("selected_option_index")
+                if col is None or option is None:
+                    continue
+                rows.append(row)
+                cols.append(col)
+                options.append(option)
+                marks.append(1 if response.get("is_correct") else 0)
+
+        if rows:
+            selected[rows, cols] = options
+            correct[rows, cols] = marks
+
+        selected_pages.append(selected)
+        correct_pages.append(correct)
+
+    if not selected_pages:
+        empty = np.zeros((0, num_items), dtype=np.int8)
+        return empty, empty.copy()
+
+    return np.vstack(selected_pages), np.vstack(correct_pages)
+
+
+def analyze_items(
+    selected: np.ndarray,
+    correct: np.ndarray,
+    max_options: int = MAX_OPTIONS
+) -> Dict:
+    """
+    Compute item statistics in one vectorized pass
+
+    - p-value: share of answering students who got the item right
+    - discrimination: corrected point-biserial, i.e. the correlation between
+      the item score and the total score on the remaining items
+    - option counts/frequencies: how often each option was chosen
+    - KR-20 reliability of the whole form
+
+    Unanswered items count as incorrect toward total scores.
+
+    Args:
+        selected: (students, items) chosen option index, -1 if unanswered
+        correct: (students, items) 1 if correct else 0
+        max_options: Width of the option-count table
+
+    Returns:
+        Dict of per-item arrays plus the scalar kr20
+    """
+    num_students, num_items = correct.shape
+    answered = selected >= 0
+    x = correct.astype(np.float64)
+
+    answered_counts = answered.sum(axis=0)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        p_values = np.where(answered_counts > 0, x.sum(axis=0) / answered_counts, np.nan)
+
+    # Corrected item-total correlation against the rest score
+    totals = x.sum(axis=1)
+    rest = totals[:, None] - x
+    x_centered = x - x.mean(axis=0) if num_students else x
+    rest_centered = rest - rest.mean(axis=0) if num_students else rest
+    covariance = (x_centered * rest_centered).sum(axis=0)
+    spread = np.sqrt((x_centered ** 2).sum(axis=0) * (rest_centered ** 2).sum(axis=0))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        discrimination = np.where(spread > 0, covariance / spread, np.nan)
+
+    # Option selection counts via a single bincount over (item, option) cells
+    valid = answered & (selected < max_options)
+    cells = (np.arange(num_items, dtype=np.int64)[None, :] * max_options + selected)[valid]
+    option_counts = np.bincount(cells, minlength=num_items * max_options).reshape(num_items, max_options)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        option_freqs = np.where(answered_counts[:, None] > 0, option_counts / answered_counts[:, None], 0.0)
+
+    # KR-20 over all items (population variance, matching sum(p*q))
+    kr20 = None
+    if num_items > 1 and num_students > 1:
+        p_all = x.mean(axis=0)
+        total_variance = totals.var()
+        if total_variance > 0:
+            kr20 = float(num_items / (num_items - 1) * (1 - (p_all * (1 - p_all)).sum() / total_variance))
+
+    return {
+        "num_students": int(num_students),
+        "answered_counts": answered_counts,
+        "p_values": p_values,
+        "discrimination": discrimination,
+        "option_counts": option_counts,
+        "option_freqs": option_freqs,
+        "kr20": kr20,
+    }
+
+
+class ItemAnalysisService:
+    """Service for per-form item analytics with a revision-keyed cache"""
+
+    def __init__(self):
+        # form_uuid -> (revision, result)
+        self._cache: Dict[str, Tuple[str, Dict]] = {}
+
+    def get_form_revision(self, form_uuid: str) -> str:
+        """
+        Cheap fingerprint of a form's submissions
+
+        Changes whenever a session completes, so cached analyses are
+        invalidated by new data without rescanning responses.
+        """
+        result = db.client.table("form_sessions")\
+            .select("completed_at", count="exact")\
+            .eq("form_id", form_uuid)\
+            .not_.is_("completed_at", "null")\
+            .order("completed_at", desc=True)\
+            .limit(1)\
+            .execute()
+
+        latest = result.data[0]["completed_at"] if result.data else ""
+        return f"{result.count or 0}:{latest}"
+
+    def analyze_form(self, form_uuid: str) -> Dict:
+        """
+        Item analysis for one form, served from cache when unchanged
+
+        Args:
+            form_uuid: Form UUID
+
+        Returns:
+            Dict with form-level stats and one entry per question
+        """
+        revision = self.get_form_revision(form_uuid)
+
+        cached = self._cache.get(form_uuid)
+        if cached and cached[0] == revision:
+            print(f"[ITEM ANALYSIS CACHE HIT] form={form_uuid} revision={revision}")
+            return cached[1]
+
+        exporter = get_results_exporter()
+        questions = exporter.load_form_questions(form_uuid)
+        selected, correct = build_response_matrix(questions, exporter.iter_session_pages(form_uuid))
+        stats = analyze_items(selected, correct)
+
+        items = []
+        for col, question in enumerate(questions):
+            num_options = question.get("num_options") or MAX_OPTIONS
+            items.append({
+                "question_id": question["question_id"],
+                "topic": question["topic"],
+                "answer_index": question.get("answer_index"),
+                "num_responses": int(stats["answered_counts"][col]),
+                "p_value": _round_or_none(stats["p_values"][col]),
+                "discrimination": _round_or_none(stats["discrimination"][col]),
+                "option_counts": stats["option_counts"][col, :num_options].tolist(),
+                "option_freqs": [round(float(f), 4) for f in stats["option_freqs"][col, :num_options]],
+            })
+
+        result = {
+            "revision": revision,
+            "num_students": stats["num_students"],
+            "num_items": len(questions),
+            "kr20": _round_or_none(stats["kr20"]),
+            "items": items,
+        }
+
+        if len(self._cache) >= CACHE_MAX_FORMS and form_uuid not in self._cache:
+            self._cache.pop(next(iter(self._cache)))
+        self._cache[form_uuid] = (revision, result)
+
+        print(f"[ITEM ANALYSIS] form={form_uuid}: {stats['num_students']} students x {len(questions)} items")
+        return result
+
+
+def _round_or_none(value: Optional[float], digits: int = 4) -> Optional[float]:
+    """Round a float, mapping None/NaN to None for JSON output"""
+    if value is None or np.isnan(value):
+        return None
+    return round(float(value), digits)
+
+
+# Global instance
+_item_analysis_service: Optional[ItemAnalysisService] = None
+
+
+def get_item_analysis_service() -> ItemAnalysisService:
+    """Get or create global item analysis service instance"""
+    global _item_analysis_service
+    if _item_analysis_service is None:
+        _item_analysis_service = ItemAnalysisService()
+    return _item_analysis_service
@@ -3,6 +3,7 @@ LLM Service
 Claude API client with retry logic and caching
 """
 
+import asyncio
 import json
 import hashlib
 from pathlib import Path
@@ -120,7 +121,9 @@ class LLMService:
         messages = [{"role": "user", "content": prompt}]
 
         try:
-            response = self.client.messages.create(
+            # The client is synchronous; run it in a thread so concurrent calls overlap
+            response = await asyncio.to_thread(
+                self.client.messages.create,
                 model=self.model,
                 max_tokens=max_tokens,
                 temperature=temperature,
@@ -0,0 +1,273 @@
+"""
+Topic Mastery Service
+Per-student, per-topic mastery maintained with Bayesian Knowledge Tracing
+"""
+
+from datetime import datetime
+from typing import List, Dict, Optional, Iterable
+
+from app.database import db
+
+# BKT parameters shared by every topic
+P_INIT = 0.3       # Prior probability the student already knows the topic
+P_TRANSIT = 0.1    # Probability of learning the topic after an attempt
+P_SLIP = 0.1       # Probability of a wrong answer despite mastery
+DEFAULT_GUESS = 0.25
+
+# Topics below this mastery probability are reported as weak
+WEAK_MASTERY_THRESHOLD = 0.6
+
+# Conditional writes tried before giving up on topics that keep changing
+MASTERY_WRITE_ATTEMPTS = 3
+
+
+def bkt_update(
+    p_mastery: float,
+    is_correct: bool,
+    p_guess: float = DEFAULT_GUESS,
+    p_slip: float = P_SLIP,
+    p_transit: float = P_TRANSIT
+) -> float:
+    """
+    One Bayesian Knowledge Tracing step
+
+    Args:
+        p_mastery: Current probability the topic is mastered
+        is_correct: Outcome of the new answer
+        p_guess: Probability of guessing right without mastery
+        p_slip: Probability of slipping despite mastery
+        p_transit: Probability of learning from the attempt
+
+    Returns:
+        Updated mastery probability
+    """
+    if is_correct:
+        known = p_mastery * (1 - p_slip)
+        posterior = known / (known + (1 - p_mastery) * p_guess)
+    else:
+        known = p_mastery * p_slip
+        posterior = known / (known + (1 - p_mastery) * (1 - p_guess))
+
+    return posterior + (1 - posterior) * p_transit
+
+
+class MasteryService:
+    """Service for reading and updating student topic mastery"""
+
+    def update_from_responses(
+        self,
+        student_id: str,
+        responses: List[Dict],
+        guess_by_question: Optional[Dict[str, float]] = None
+    ) -> Dict[str, Dict]:
+        """
+        Fold a submission's answers into the student's mastery state
+
+        One read for the touched topics, O(answers) BKT steps, one
+        conditional write. A row is only overwritten if it still has the
+        updated_at that was read; topics another submission updated in the
+        meantime are re-read and re-applied, so concurrent submits for the
+        same student don't drop each other's updates.
+
+        Args:
+            student_id: Student UUID
+            responses: Response records with topic_id, question_id and is_correct
+            guess_by_question: Optional per-question guess probability
+                               (1 / number of options)
+
+        Returns:
+            Dict mapping topic_id -> updated mastery row
+        """
+        topic_ids = list({r["topic_id"] for r in responses if r.get("topic_id")})
+        if not student_id or not topic_ids:
+            return {}
+
+        guess_by_question = guess_by_question or {}
+        written: Dict[str, Dict] = {}
+
+        for _ in range(MASTERY_WRITE_ATTEMPTS):
+            rows = self._fold_responses(student_id, topic_ids, responses, guess_by_question)
+            result = db.client.rpc("apply_topic_mastery", {"updates": rows}).execute()
+            applied = {row["written_topic_id"] for row in (result.data or [])}
+
+            for row in rows:
+                if row["topic_id"] in applied:
+                    del row["expected_updated_at"]
+                    written[row["topic_id"]] = row
+
+            topic_ids = [topic_id for topic_id in topic_ids if topic_id not in applied]
+            if not topic_ids:
+                break
+        else:
+            print(f"[MASTERY WARNING] {len(topic_ids)} topic(s) for student {student_id} kept changing, not updated")
+
+        print(f"[MASTERY] Updated {len(written)} topic(s) for student {student_id}")
+        return written
+
+    def _fold_responses(
+        self,
+        student_id: str,
+        topic_ids: List[str],
+        responses: List[Dict],
+        guess_by_question: Dict[str, float]
+    ) -> List[Dict]:
+        """
+        Read the stored state of some topics and apply their answers
+
+        Returns:
+            Rows for apply_topic_mastery, each with the updated_at it was
+            read at (expected_updated_at, None for a topic with no row yet)
+        """
+        stored = {row["topic_id"]: row for row in self.get_mastery(student_id, topic_ids)}
+        wanted = set(topic_ids)
+        now = datetime.now().isoformat()
+        states: Dict[str, Dict] = {}
+
+        for response in responses:
+            topic_id = response.get("topic_id")
+            if topic_id not in wanted:
+                continue
+
+            state = states.get(topic_id)
+            if state is None:
+                row = stored.get(topic_id)
+                state = states[topic_id] = {
+                    "student_id": student_id,
+                    "topic_id": topic_id,
+                    "p_mastery": float(row["p_mastery"]) if row else P_INIT,
+                    "attempts": int(row["attempts"]) if row else 0,
+                    "correct": int(row["correct"]) if row else 0,
+                    "updated_at": now,
+                    "expected_updated_at": row["updated_at"] if row else None,
+                }
+
+            is_correct = bool(response.get("is_correct"))
+            state["p_mastery"] = bkt_update(
+                state["p_mastery"],
+                is_correct,
+                p_guess=guess_by_question.get(response.get("question_id"), DEFAULT_GUESS)
+            )
+            state["attempts"] += 1
+            state["correct"] += 1 if is_correct else 0
+
+        for state in states.values():
+            state["p_mastery"] = round(state["p_mastery"], 4)
+        return list(states.values())
+
+    def get_mastery(self, student_id: str, topic_ids: Optional[Iterable[str]] = None) -> List[Dict]:
+        """
+        Read stored mastery rows for a student
+
+        Args:
+            student_id: Student UUID
+            topic_ids: Optional subset of topics
+
+        Returns:
+            List of mastery rows
+        """
+        query = db.client.table("student_topic_mastery")\
+            .select("student_id, topic_id, p_mastery, attempts, correct, updated_at")\
+            .eq("student_id", student_id)
+
+        if topic_ids is not None:
+            query = query.in_("topic_id", list(topic_ids))
+
+        return query.execute().data or []
+
+    def get_weak_topics(
+        self,
+        student_id: str,
+        topic_ids: Optional[Iterable[str]] = None,
+        threshold: float = WEAK_MASTERY_THRESHOLD,
+        fallback: Optional[List[Dict]] = None
+    ) -> List[Dict]:
+        """
+        Topics whose maintained mastery is below the threshold, weakest first
+
+        Mastery probabilities and fallback percent-correct scores are not on
+        the same scale, so fallback topics are listed after the mastery ones
+        (each group weakest first) and every entry is labelled with its source.
+
+        Args:
+            student_id: Student UUID
+            topic_ids: Optional subset of topics (e.g. those on one form)
+            threshold: Mastery probability below which a topic is weak
+            fallback: Weak topics judged another way (e.g. one session's
+                      percent correct), used for topics with no mastery row
+
+        Returns:
+            List of dicts: {topic_id, topic_name, source, mastery, correct, total, percentage}
+            with source "mastery" or "session" (mastery is None for fallback topics)
+        """
+        rows = self.get_mastery(student_id, topic_ids)
+        tracked = {row["topic_id"] for row in rows}
+        weak = [row for row in rows if float(row["p_mastery"]) < threshold]
+
+        topic_names = self._topic_names([row["topic_id"] for row in weak])
+
+        result = [
+            {
+                "topic_id": row["topic_id"],
+                "topic_name": topic_names.get(row["topic_id"], "Unknown Topic"),
+                "source": "mastery",
+                "mastery": float(row["p_mastery"]),
+                "correct": int(row["correct"]),
+                "total": int(row["attempts"]),
+                "percentage": float(row["p_mastery"]) * 100,
+            }
+            for row in weak
+        ]
+        result.sort(key=lambda topic: topic["mastery"])
+
+        untracked = [
+            {**topic, "source": "session", "mastery": None}
+            for topic in fallback or []
+            if topic["topic_id"] not in tracked
+        ]
+        untracked.sort(key=lambda topic: topic["percentage"])
+
+        return result + untracked
+
+    def get_student_mastery_view(self, student_id: str) -> List[Dict]:
+        """All of a student's topic mastery rows with topic names, weakest first"""
+        rows = self.get_mastery(student_id)
+        topic_names = self._topic_names([row["topic_id"] for row in rows])
+
+        view = [
+            {
+                "topic_id": row["topic_id"],
+                "topic_name": topic_names.get(row["topic_id"], "Unknown Topic"),
+                "mastery": float(row["p_mastery"]),
+                "attempts": int(row["attempts"]),
+                "correct": int(row["correct"]),
+                "is_weak": float(row["p_mastery"]) < WEAK_MASTERY_THRESHOLD,
+                "updated_at": row.get("updated_at"),
+            }
+            for row in rows
+        ]
+        view.sort(key=lambda topic: topic["mastery"])
+        return view
+
+    def _topic_names(self, topic_ids: List[str]) -> Dict[str, str]:
+        """Look up topic names in one query"""
+        if not topic_ids:
+            return {}
+
+        result = db.client.table("topics")\
+            .select("id, name")\
+            .in_("id", topic_ids)\
+            .execute()
+
+        return {t["id"]: t["name"] for t in (result.data or [])}
+
+
+# Global instance
+_mastery_service: Optional[MasteryService] = None
+
+
+def get_mastery_service() -> MasteryService:
+    """Get or create global mastery service instance"""
+    global _mastery_service
+    if _mastery_service is None:
+        _mastery_service = MasteryService()
+    return _mastery_service
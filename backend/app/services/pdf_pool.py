@@ -0,0 +1,217 @@
+"""
+PDF Worker Pool
+Runs CPU-heavy pdfplumber work in separate processes behind an async facade
+
+Each worker is a long-lived process that runs one job at a time. Jobs
+wait for an idle worker; once workers and the waiting queue are full,
+new jobs are rejected instead of piling up. A job that exceeds its
+timeout has its worker killed and replaced, so a runaway parse cannot
+hold a worker forever.
+"""
+
+import asyncio
+import multiprocessing
+from collections import deque
+from multiprocessing.connection import Connection
+from typing import Any, AsyncIterator, Callable, Optional, Tuple
+
+from app.config import settings
+from app.utils.pdf_utils import TEXT_SHARD_PAGES, extract_page_range_text, get_page_count, page_ranges
+
+# Spawned (not forked) workers: the parent runs an event loop and threads
+_mp_context = multiprocessing.get_context("spawn")
+
+
+class PdfPoolBusyError(RuntimeError):
+    """Raised when every worker is busy and the waiting queue is full"""
+
+
+class PdfJobTimeoutError(TimeoutError):
+    """Raised when a PDF job runs longer than its timeout"""
+
+
+def _worker_main(conn: Connection) -> None:
+    """Worker loop: receive (func, args, kwargs), send back (ok, result)"""
+    while True:
+        try:
+            func, args, kwargs = conn.recv()
+        except EOFError:
+            return
+
+        try:
+            conn.send((True, func(*args, **kwargs)))
+        except Exception as e:
+            try:
+                conn.send((False, e))
+            except Exception:
+                # Exception not picklable
+                conn.send((False, RuntimeError(repr(e))))
+
+
+class _Worker:
+    """One worker process and the parent's end of its pipe"""
+
+    def __init__(self):
+        self.conn, child_conn = _mp_context.Pipe()
+        self.process = _mp_context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=5)
+        self.conn.close()
+
+
+class PdfWorkerPool:
+    """Bounded pool of PDF worker processes"""
+
+    def __init__(self, workers: int, queue_size: int, job_timeout: float):
+        """
+        Args:
+            workers: Number of worker processes
+            queue_size: Jobs allowed to wait for a worker before rejecting
+            job_timeout: Default seconds before a job's worker is killed
+        """
+        self.workers = workers
+        self.queue_size = queue_size
+        self.job_timeout = job_timeout
+        self._idle: Optional[asyncio.Queue] = None
+        self._pending = 0
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, **kwargs) -> Any:
+        """
+        Run a module-level function in a worker process
+
+        Args:
+            func: Picklable (module-level) function
+            *args, **kwargs: Picklable arguments
+            timeout: Seconds before the job is killed (default: pool setting)
+
+        Returns:
+            The function's return value
+
+        Raises:
+            PdfPoolBusyError: If workers and queue are all taken
+            PdfJobTimeoutError: If the job exceeded its timeout
+            Exception: Whatever the function raised in the worker
+        """
+        if self._pending >= self.workers + self.queue_size:
+            raise PdfPoolBusyError("PDF processing is at capacity, try again shortly")
+
+        self._ensure_started()
+        self._pending += 1
+        try:
+            worker = await self._idle.get()
+            try:
+                worker.conn.send((func, args, kwargs))
+                ok, result = await asyncio.wait_for(
+                    asyncio.to_thread(worker.conn.recv),
+                    timeout or self.job_timeout
+                )
+            except asyncio.TimeoutError:
+                print(f"[PDF POOL] {func.__name__} exceeded {timeout or self.job_timeout}s, killing worker {worker.process.pid}")
+                worker.kill()
+                worker = _Worker()
+                raise PdfJobTimeoutError(f"{func.__name__} timed out")
+            except (EOFError, OSError) as e:
+                print(f"[PDF POOL] Worker {worker.process.pid} died: {e}")
+                worker.kill()
+                worker = _Worker()
+                raise RuntimeError(f"PDF worker crashed while running {func.__name__}")
+            except asyncio.CancelledError:
+                # Caller went away mid-job; the worker's late reply must not
+                # be read by the next job
+                worker.kill()
+                worker = _Worker()
+                raise
+            finally:
+                self._idle.put_nowait(worker)
+        finally:
+            self._pending -= 1
+
+        if not ok:
+            raise result
+        return result
+
+    def shutdown(self) -> None:
+        """Stop every idle worker"""
+        if self._idle is None:
+            return
+        while not self._idle.empty():
+            self._idle.get_nowait().kill()
+        self._idle = None
+
+    def _ensure_started(self) -> None:
+        """Start the worker processes on first use"""
+        if self._idle is not None:
+            return
+        self._idle = asyncio.Queue()
+        for _ in range(self.workers):
+            self._idle.put_nowait(_Worker())
+        print(f"[PDF POOL] Started {self.workers} worker(s), queue size {self.queue_size}")
+
+
+# Global instance
+_pdf_pool: Optional[PdfWorkerPool] = None
+
+
+def get_pdf_pool() -> PdfWorkerPool:
+    """Get or create global PDF worker pool"""
+    global _pdf_pool
+    if _pdf_pool is None:
+        _pdf_pool = PdfWorkerPool(
+            workers=settings.pdf_workers,
+            queue_size=settings.pdf_queue_size,
+            job_timeout=settings.pdf_job_timeout_seconds
+        )
+    return _pdf_pool
+
+
+async def iter_pdf_page_texts(
+    pdf_path: str,
+    shard_pages: int = TEXT_SHARD_PAGES
+) -> AsyncIterator[Tuple[int, str]]:
+    """
+    Stream (page_number, text) pairs in page order, extracted in the pool
+
+    Page-range shards run on the pool's workers concurrently (one in
+    flight per worker) and are yielded in order as they complete.
+
+    Args:
+        pdf_path: Path to PDF file
+        shard_pages: Pages per shard
+
+    Yields:
+        (1-based page number, page text or "")
+    """
+    pool = get_pdf_pool()
+    total_pages = await pool.run(get_page_count, pdf_path)
+    shards = deque(page_ranges(total_pages, shard_pages))
+    in_flight = deque()
+
+    try:
+        while shards or in_flight:
+            while shards and len(in_flight) < pool.workers:
+                start, end = shards.popleft()
+                job = asyncio.ensure_future(pool.run(extract_page_range_text, pdf_path, start, end))
+                in_flight.append((start, job))
+
+            start, job = in_flight.popleft()
+            for offset, text in enumerate(await job):
+                yield start + offset + 1, text
+    finally:
+        # Consumer stopped early or a shard failed
+        for _, job in in_flight:
+            job.cancel()
+
+
+async def extract_pdf_text(pdf_path: str) -> str:
+    """Page-parallel equivalent of pdf_utils.extract_text_from_pdf"""
+    return "\n\n".join([text async for _, text in iter_pdf_page_texts(pdf_path) if text])
+
+
+def shutdown_pdf_pool() -> None:
+    """Stop the global pool's workers (application shutdown)"""
+    if _pdf_pool is not None:
+        _pdf_pool.shutdown()
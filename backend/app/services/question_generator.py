@@ -3,7 +3,7 @@ Question Generator Service
 Generates MCQ diagnostic questions using LLM
 """
 
-from typing import List, Optional
+from typing import List, Optional, Dict
 from uuid import UUID
 
 from app.models.question import Question, Difficulty, GenerateQuestionsRequest
@@ -26,6 +26,7 @@ class QuestionGeneratorService:
         difficulty: Optional[Difficulty] = None,
         course_level: Optional[CourseLevel] = None,
         context: Optional[str] = None,
+        topic_contexts: Optional[Dict[str, str]] = None,
     ) -> List[Question]:
         """
         Generate MCQ questions for given topics
@@ -36,6 +37,7 @@ class QuestionGeneratorService:
             difficulty: Target difficulty level
             course_level: Educational level
             context: Additional context (e.g., textbook information)
+            topic_contexts: Optional per-topic source text (e.g., textbook excerpts)
 
         Returns:
             List of generated Question objects
@@ -61,6 +63,7 @@ class QuestionGeneratorService:
                     course_level=course_level.value if course_level else None,
                     difficulty=difficulty.value if difficulty else None,
                     context=context,
+                    source_text=(topic_contexts or {}).get(topic_name),
                 )
 
                 # Call LLM
@@ -0,0 +1,435 @@
+"""
+Results Export Service
+Streams form results as CSV or Parquet without loading them into memory
+"""
+
+import csv
+import io
+from typing import List, Dict, Optional, Iterator, Iterable
+
+from fastapi.responses import StreamingResponse
+
+from app.database import db
+
+# Sessions fetched per round trip. Their ids go into an IN (...) filter on
+# responses, so this also bounds the request URL length.
+EXPORT_PAGE_SIZE = 200
+
+# Responses fetched per round trip; PostgREST caps a response at 1000 rows,
+# so a page of sessions' answers is itself read with a keyset cursor
+RESPONSE_PAGE_SIZE = 1000
+
+# Columns shared by every wide (student x question) export
+SESSION_COLUMNS = [
+    "session_id",
+    "student_email",
+    "student_name",
+    "completed_at",
+    "correct_answers",
+    "total_questions",
+    "score_percentage",
+]
+
+# Columns of the long (one row per response) export
+LONG_COLUMNS = [
+    "form_slug",
+    "form_title",
+    "session_id",
+    "student_email",
+    "student_name",
+    "completed_at",
+    "question_id",
+    "question_order",
+    "topic",
+    "selected_option_index",
+    "is_correct",
+]
+
+
+class ResultsExporter:
+    """Service for exporting form responses in tabular formats"""
+
+    def load_form_questions(self, form_uuid: str) -> List[Dict]:
+        """
+        Load a form's questions in display order with their topic names
+
+        Args:
+            form_uuid: Form UUID
+
+        Returns:
+            List of dicts with id, question_id, order_index, topic,
+            num_options and answer_index
+        """
+        form_questions = db.client.table("form_questions")\
+            .select("question_id, order_index")\
+            .eq("form_id", form_uuid)\
+            .order("order_index")\
+            .execute()
+
+        links = form_questions.data or []
+        if not links:
+            return []
+
+        questions_result = db.client.table("questions")\
+            .select("id, question_id, topic_id, options, answer_index")\
+            .in_("id", [link["question_id"] for link in links])\
+            .execute()
+        questions_by_uuid = {q["id"]: q for q in (questions_result.data or [])}
+
+        topic_ids = list({q["topic_id"] for q in questions_by_uuid.values() if q.get("topic_id")})
+        topic_names = {}
+        if topic_ids:
+            topics_result = db.client.table("topics")\
+                .select("id, name")\
+                .in_("id", topic_ids)\
+                .execute()
+            topic_names = {t["id"]: t["name"] for t in (topics_result.data or [])}
+
+        ordered = []
+        for link in links:
+            question = questions_by_uuid.get(link["question_id"])
+            if not question:
+                continue
+            ordered.append({
+                "id": question["id"],
+                "question_id": question["question_id"],
+                "order_index": link.get("order_index"),
+                "topic": topic_names.get(question.get("topic_id"), "Unknown Topic"),
+                "num_options": len(question.get("options") or []),
+                "answer_index": question.get("answer_index"),
+            })
+
+        return ordered
+
+    def iter_session_pages(
+        self,
+        form_uuid: str,
+        page_size: int = EXPORT_PAGE_SIZE
+    ) -> Iterator[List[Dict]]:
+        """
+        Walk completed sessions of a form with a keyset cursor on id
+
+        Each page is paired with its responses, so at most one page of
+        sessions and answers is held in memory at a time.
+
+        Args:
+            form_uuid: Form UUID
+            page_size: Sessions per page
+
+        Yields:
+            Lists of session dicts, each with a "responses" list attached
+        """
+        last_id = None
+
+        while True:
+            sessions_query = db.client.table("form_sessions")\
+                .select("id, student_email, student_name, completed_at, correct_answers, total_questions, score_percentage")\
+                .eq("form_id", form_uuid)\
+                .not_.is_("completed_at", "null")\
+                .order("id")\
+                .limit(page_size)
+
+            if last_id:
+                sessions_query = sessions_query.gt("id", last_id)
+
+            sessions = sessions_query.execute().data or []
+            if not sessions:
+                return
+
+            by_session: Dict[str, List[Dict]] = {}
+            for response in self._iter_responses([s["id"] for s in sessions]):
+                by_session.setdefault(response["session_id"], []).append(response)
+
+            for session in sessions:
+                session["responses"] = by_session.get(session["id"], [])
+
+            yield sessions
+
+            if len(sessions) < page_size:
+                return
+            last_id = sessions[-1]["id"]
+
+    def _iter_responses(self, session_ids: List[str]) -> Iterator[Dict]:
+        """All responses of the given sessions, paged with a keyset cursor on id"""
+        last_id = None
+
+        while True:
+            query = db.client.table("responses")\
+                .select("id, session_id, question_id, selected_option_index, is_correct")\
+                .in_("session_id", session_ids)\
+                .order("id")\
+                .limit(RESPONSE_PAGE_SIZE)
+
+            if last_id:
+                query = query.gt("id", last_id)
+
+            responses = query.execute().data or []
+            yield from responses
+
+            if len(responses) < RESPONSE_PAGE_SIZE:
+                return
+            last_id = responses[-1]["id"]
+
+    def wide_columns(self, questions: List[Dict]) -> List[str]:
+        """Column names of the student x question matrix for a form"""
+        columns = list(SESSION_COLUMNS)
+        for question in questions:
+            columns.append(f"{question['question_id']}__selected")
+            columns.append(f"{question['question_id']}__correct")
+        for topic in _unique_topics(questions):
+            columns.append(f"topic:{topic}__correct_pct")
+        return columns
+
+    def iter_wide_rows(self, form_uuid: str, questions: List[Dict]) -> Iterator[List[Dict]]:
+        """
+        Yield pages of student x question rows for one form
+
+        Args:
+            form_uuid: Form UUID
+            questions: Output of load_form_questions
+
+        Yields:
+            Lists of row dicts keyed by wide_columns()
+        """
+        topics = _unique_topics(questions)
+        question_by_uuid = {q["id"]: q for q in questions}
+
+        for sessions in self.iter_session_pages(form_uuid):
+            page_rows = []
+            for session in sessions:
+                row = {column: session.get(column) for column in SESSION_COLUMNS}
+                row["session_id"] = session["id"]
+
+                topic_totals = {topic: [0, 0] for topic in topics}
+                for response in session["responses"]:
+                    question = question_by_uuid.get(response["question_id"])
+                    if not question:
+                        continue
+                    qid = question["question_id"]
+                    row[f"{qid}__selected"] = response.get("selected_option_index")
+                    row[f"{qid}__correct"] = response.get("is_correct")
+
+                    totals = topic_totals[question["topic"]]
+                    totals[1] += 1
+                    if response.get("is_correct"):
+                        totals[0] += 1
+
+                for topic, (correct, total) in topic_totals.items():
+                    row[f"topic:{topic}__correct_pct"] = round(correct / total * 100, 1) if total else None
+
+                page_rows.append(row)
+
+            yield page_rows
+
+    def iter_long_rows(self, forms: Iterable[Dict]) -> Iterator[List[Dict]]:
+        """
+        Yield pages of one-row-per-response records across several forms
+
+        Used for teacher-wide exports where each form has its own question set.
+
+        Args:
+            forms: Form dicts with id, slug and title
+
+        Yields:
+            Lists of row dicts keyed by LONG_COLUMNS
+        """
+        for form in forms:
+            questions = self.load_form_questions(form["id"])
+            question_by_uuid = {q["id"]: q for q in questions}
+
+            for sessions in self.iter_session_pages(form["id"]):
+                page_rows = []
+                for session in sessions:
+                    for response in session["responses"]:
+                        question = question_by_uuid.get(response["question_id"], {})
+                        page_rows.append({
+                            "form_slug": form.get("slug"),
+                            "form_title": form.get("title"),
+                            "session_id": session["id"],
+                            "student_email": session.get("student_email"),
+                            "student_name": session.get("student_name"),
+                            "completed_at": session.get("completed_at"),
+                            "question_id": question.get("question_id"),
+                            "question_order": question.get("order_index"),
+                            "topic": question.get("topic"),
+                            "selected_option_index": response.get("selected_option_index"),
+                            "is_correct": response.get("is_correct"),
+                        })
+                yield page_rows
+
+
+def stream_csv(columns: List[str], row_pages: Iterable[List[Dict]]) -> Iterator[str]:
+    """
+    Render pages of rows as CSV, yielding one chunk per page
+
+    Args:
+        columns: Header row / dict keys
+        row_pages: Iterable of row-dict lists
+
+    Yields:
+        CSV text chunks
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=columns, extrasaction="ignore")
+
+    writer.writeheader()
+    yield _drain(buffer)
+
+    for rows in row_pages:
+        writer.writerows(rows)
+        yield _drain(buffer)
+
+
+def stream_parquet(columns: List[str], row_pages: Iterable[List[Dict]]) -> Iterator[bytes]:
+    """
+    Render pages of rows as a Parquet file, one row group per page
+
+    Requires pyarrow. Each row group is compressed (zstd) and flushed to the
+    client as soon as it is written; only the footer is emitted at the end.
+
+    Args:
+        columns: Column names
+        row_pages: Iterable of row-dict lists
+
+    Yields:
+        Parquet byte chunks
+    """
+    pa, pq = _require_pyarrow()
+
+    arrow_types = {"string": pa.string(), "int": pa.int32(), "float": pa.float64(), "bool": pa.bool_()}
+    schema = pa.schema([(column, arrow_types[column_type(column)]) for column in columns])
+
+    sink = _ChunkSink()
+    writer = pq.ParquetWriter(sink, schema, compression="zstd")
+
+    try:
+        for rows in row_pages:
+            if not rows:
+                continue
+
+            table = pa.Table.from_pydict(
+                {column: [row.get(column) for row in rows] for column in columns},
+                schema=schema
+            )
+            writer.write_table(table)
+
+            chunk = sink.drain()
+            if chunk:
+                yield chunk
+    finally:
+        writer.close()
+
+    chunk = sink.drain()
+    if chunk:
+        yield chunk
+
+
+class _ChunkSink(io.RawIOBase):
+    """Write-only file object that hands buffered bytes back to the caller"""
+
+    def __init__(self):
+        self._chunks: List[bytes] = []
+        self._position = 0
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        data = bytes(data)
+        self._chunks.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self) -> int:
+        return self._position
+
+    def drain(self) -> bytes:
+        chunk = b"".join(self._chunks)
+        self._chunks.clear()
+        return chunk
+
+
+def export_response(basename: str, format: str, columns: List[str], row_pages: Iterable[List[Dict]]) -> StreamingResponse:
+    """
+    Wrap paged export rows in a streaming CSV or Parquet download
+
+    Args:
+        basename: Download filename without extension
+        format: "csv" or "parquet"
+        columns: Column names
+        row_pages: Iterable of row-dict lists
+
+    Returns:
+        StreamingResponse with an attachment Content-Disposition
+    """
+    if format == "parquet":
+        body = stream_parquet(columns, row_pages)
+        media_type = "application/vnd.apache.parquet"
+    else:
+        body = stream_csv(columns, row_pages)
+        media_type = "text/csv"
+
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{basename}.{format}"'}
+    )
+
+
+def parquet_supported() -> bool:
+    """Whether the optional pyarrow dependency is installed"""
+    try:
+        _require_pyarrow()
+        return True
+    except ImportError:
+        return False
+
+
+def _require_pyarrow():
+    """Import pyarrow lazily so CSV export works without it"""
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        raise ImportError("pyarrow not installed. Run: pip install pyarrow")
+    return pa, pq
+
+
+def column_type(column: str) -> str:
+    """Logical type of an export column: string, int, float or bool"""
+    if column.endswith("__selected") or column in ("correct_answers", "total_questions",
+                                                   "question_order", "selected_option_index"):
+        return "int"
+    if column.endswith("__correct") or column == "is_correct":
+        return "bool"
+    if column.endswith("__correct_pct") or column == "score_percentage":
+        return "float"
+    return "string"
+
+
+def _drain(buffer: io.StringIO) -> str:
+    """Return and clear the contents of a StringIO"""
+    text = buffer.getvalue()
+    buffer.seek(0)
+    buffer.truncate(0)
+    return text
+
+
+def _unique_topics(questions: List[Dict]) -> List[str]:
+    """Topic names in first-appearance order"""
+    seen = {}
+    for question in questions:
+        seen.setdefault(question["topic"], None)
+    return list(seen)
+
+
+# Global instance
+_results_exporter: Optional[ResultsExporter] = None
+
+
+def get_results_exporter() -> ResultsExporter:
+    """Get or create global results exporter instance"""
+    global _results_exporter
+    if _results_exporter is None:
+        _results_exporter = ResultsExporter()
+    return _results_exporter
@@ -0,0 +1,196 @@
+"""
+Score Distribution Service
+Per-form score histograms and percentiles kept in mergeable t-digest sketches
+"""
+
+from datetime import datetime
+from typing import List, Dict, Optional
+
+from app.database import db
+from app.utils.tdigest import TDigest
+
+# Score histogram: 10 bins of 10 percentage points (100% goes in the last bin)
+HISTOGRAM_BINS = 10
+
+# Retries for optimistic-concurrency conflicts between simultaneous submits
+UPDATE_RETRIES = 3
+
+# Sessions read per round trip during the backfill (PostgREST caps responses at 1000 rows)
+BACKFILL_PAGE_SIZE = 1000
+
+REPORTED_QUANTILES = {"p10": 0.10, "p25": 0.25, "median": 0.50, "p75": 0.75, "p90": 0.90}
+
+
+def _histogram_bin(score: float) -> int:
+    """Bin index for a 0-100 score"""
+    return min(max(int(score // (100 / HISTOGRAM_BINS)), 0), HISTOGRAM_BINS - 1)
+
+
+class ScoreDistributionService:
+    """Service for maintaining and rolling up score sketches"""
+
+    def record_score(self, form_uuid: str, score: float) -> None:
+        """
+        Add one completed submission's score to the form's sketch
+
+        Read-modify-write guarded by a version column, retried on conflict.
+        The first write for a form backfills from form_sessions once (which
+        already includes this submission).
+
+        Args:
+            form_uuid: Form UUID
+            score: Score percentage (0-100)
+        """
+        for _ in range(UPDATE_RETRIES):
+            row = self._load_row(form_uuid)
+
+            if row is None:
+                if self._insert_row(form_uuid, *self._rebuild(form_uuid)):
+                    return
+                continue
+
+            digest = TDigest.from_base64(row.get("digest"))
+            histogram = list(row.get("histogram") or [0] * HISTOGRAM_BINS)
+            digest.add(score)
+            histogram[_histogram_bin(score)] += 1
+
+            version = int(row.get("version") or 0)
+            result = db.client.table("form_score_sketches")\
+                .update({
+                    "digest": digest.to_base64(),
+                    "histogram": histogram,
+                    "count": int(digest.total),
+                    "version": version + 1,
+                    "updated_at": datetime.now().isoformat()
+                })\
+                .eq("form_id", form_uuid)\
+                .eq("version", version)\
+                .execute()
+
+            if result.data:
+                return
+
+        print(f"[SCORES WARNING] Gave up updating score sketch for form {form_uuid} after {UPDATE_RETRIES} conflicts")
+
+    def summarize_forms(self, form_uuids: List[str]) -> Dict:
+        """
+        Merge the sketches of one or more forms into a single distribution
+
+        Args:
+            form_uuids: Forms to roll up (one form, a teacher's forms, a course)
+
+        Returns:
+            Dict with count, mean, percentiles and histogram
+        """
+        if not form_uuids:
+            return self._summary(TDigest(), [0] * HISTOGRAM_BINS, 0)
+
+        result = db.client.table("form_score_sketches")\
+            .select("form_id, digest, histogram")\
+            .in_("form_id", form_uuids)\
+            .execute()
+        rows = {row["form_id"]: row for row in (result.data or [])}
+
+        digests = []
+        histogram = [0] * HISTOGRAM_BINS
+        for form_uuid in form_uuids:
+            row = rows.get(form_uuid)
+            if row is None:
+                # Forms created before sketches existed: backfill once
+                digest, form_histogram = self._rebuild(form_uuid)
+                self._insert_row(form_uuid, digest, form_histogram)
+            else:
+                digest = TDigest.from_base64(row.get("digest"))
+                form_histogram = row.get("histogram") or [0] * HISTOGRAM_BINS
+
+            digests.append(digest)
+            histogram = [a + b for a, b in zip(histogram, form_histogram)]
+
+        return self._summary(TDigest.merge_all(digests), histogram, len(form_uuids))
+
+    def _summary(self, digest: TDigest, histogram: List[int], num_forms: int) -> Dict:
+        """Render a merged digest and histogram as JSON-friendly stats"""
+        width = 100 // HISTOGRAM_BINS
+        mean = digest.mean()
+
+        return {
+            "num_forms": num_forms,
+            "count": int(digest.total),
+            "mean": round(mean, 1) if mean is not None else None,
+            "min": round(digest.min, 1) if digest.total else None,
+            "max": round(digest.max, 1) if digest.total else None,
+            **{
+                name: (round(value, 1) if value is not None else None)
+                for name, value in ((name, digest.quantile(q)) for name, q in REPORTED_QUANTILES.items())
+            },
+            "histogram": [
+                {"range": f"{i * width}-{(i + 1) * width}", "count": int(count)}
+                for i, count in enumerate(histogram)
+            ],
+        }
+
+    def _load_row(self, form_uuid: str) -> Optional[Dict]:
+        """Read a form's sketch row"""
+        result = db.client.table("form_score_sketches")\
+            .select("form_id, digest, histogram, version")\
+            .eq("form_id", form_uuid)\
+            .limit(1)\
+            .execute()
+        return result.data[0] if result.data else None
+
+    def _insert_row(self, form_uuid: str, digest: TDigest, histogram: List[int]) -> bool:
+        """Create a sketch row; False if another request created it first"""
+        try:
+            db.client.table("form_score_sketches").insert({
+                "form_id": form_uuid,
+                "digest": digest.to_base64(),
+                "histogram": histogram,
+                "count": int(digest.total),
+                "version": 1,
+                "updated_at": datetime.now().isoformat()
+            }).execute()
+            return True
+        except Exception as e:
+            print(f"[SCORES] Sketch row for form {form_uuid} already exists: {e}")
+            return False
+
+    def _rebuild(self, form_uuid: str):
+        """One-time backfill of a sketch from completed sessions (keyset-paged on id)"""
+        digest = TDigest()
+        histogram = [0] * HISTOGRAM_BINS
+        last_id = None
+
+        while True:
+            query = db.client.table("form_sessions")\
+                .select("id, score_percentage")\
+                .eq("form_id", form_uuid)\
+                .not_.is_("completed_at", "null")\
+                .order("id")\
+                .limit(BACKFILL_PAGE_SIZE)
+
+            if last_id:
+                query = query.gt("id", last_id)
+
+            rows = query.execute().data or []
+            for row in rows:
+                score = row.get("score_percentage")
+                if score is None:
+                    continue
+                digest.add(float(score))
+                histogram[_histogram_bin(float(score))] += 1
+
+            if len(rows) < BACKFILL_PAGE_SIZE:
+                return digest, histogram
+            last_id = rows[-1]["id"]
+
+
+# Global instance
+_score_distribution_service: Optional[ScoreDistributionService] = None
+
+
+def get_score_distribution_service() -> ScoreDistributionService:
+    """Get or create global score distribution service instance"""
+    global _score_distribution_service
+    if _score_distribution_service is None:
+        _score_distribution_service = ScoreDistributionService()
+    return _score_distribution_service
@@ -4,8 +4,18 @@ Maps course topics to textbook sections using Claude AI for intelligent matching
 """
 
 import asyncio
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 from app.services.llm_service import get_llm_service
+from app.utils.section_index import SectionIndex
+from app.utils.textbook_structure import Section
+from app.utils.title_matcher import TitleMatcher, get_mapping_metrics
+
+# Batched mapping: prompt budget for the pooled section list, and
+# candidates retrieved per topic
+BATCH_TOKEN_BUDGET = 6000
+BATCH_CANDIDATES_PER_TOPIC = 20
+CHARS_PER_TOKEN = 4
+SECTION_LINE_OVERHEAD_TOKENS = 12
 
 
 class SectionMapper:
@@ -17,18 +27,24 @@ class SectionMapper:
     async def map_topics_to_sections(
         self,
         topics: List[Dict],
-        textbook_sections: List[Dict],
+        textbook_sections: List[Section],
         textbook_title: str,
-        prerequisites: List[str] = None
+        prerequisites: List[str] = None,
+        section_index: Optional[SectionIndex] = None,
+        batch: bool = True
     ) -> Dict[str, List[Dict]]:
         """
         Use AI to map each topic to relevant textbook sections
 
         Args:
             topics: List of topic dicts with 'id' and 'name'
-            textbook_sections: List of section dicts with 'title', 'page_start', 'page_end'
+            textbook_sections: The textbook's sections (TextbookStructure.sections)
             textbook_title: Title of the textbook
             prerequisites: Optional list of prerequisite topics for context
+            section_index: The textbook's section index (TextbookParser.get_section_index);
+                           a title-only index is built if omitted
+            batch: Map all ambiguous topics in one prompt (chunked to a token
+                   budget) instead of one prompt per topic
 
         Returns:
             Dict mapping topic_id -> list of relevant sections
@@ -38,77 +54,263 @@ class SectionMapper:
         if prerequisites:
             print(f"[SECTION MAPPER] Using prerequisites for context: {', '.join(prerequisites)}")
 
+        if section_index is None:
+            section_index = SectionIndex.build(textbook_sections)
+
+        # Local gate: obvious title matches don't need the LLM
+        matcher = TitleMatcher(textbook_sections)
+        metrics = get_mapping_metrics()
+
         topic_mappings = {}
+        ambiguous = []
+
+        for topic in topics:
+            decision = matcher.decide(topic['name'])
+            metrics.record(local=decision is not None)
+
+            if decision is None:
+                ambiguous.append(topic)
+                continue
+
+            index, similarity = decision
+            topic_mappings[topic['id']] = [{
+                **textbook_sections[index].to_dict(),
+                'relevance': 'Section title matches topic',
+                'confidence': 'high',
+                'similarity': round(similarity, 3)
+            }]
+            print(f"  ✓ {topic['name']}: matched locally (cosine {similarity:.2f}), skipped AI call")
+
+        print(f"[SECTION MAPPER] {len(topics) - len(ambiguous)}/{len(topics)} topics mapped without AI")
+
+        if batch:
+            topic_mappings.update(await self._map_topics_batched(
+                ambiguous, textbook_sections, textbook_title, prerequisites, section_index
+            ))
+            return topic_mappings
+
+        for i, topic in enumerate(ambiguous):
+            topic_mappings.update(await self._map_topic_individually(
+                topic, textbook_sections, textbook_title, prerequisites, section_index
+            ))
 
-        for i, topic in enumerate(topics):
-            topic_id = topic['id']
-            topic_name = topic['name']
+            # Rate limiting: wait 2 seconds between AI calls to avoid rate limits
+            if i < len(ambiguous) - 1:  # Don't wait after last topic
+                await asyncio.sleep(2)
 
-            print(f"  → Mapping: {topic_name}")
+        return topic_mappings
 
-            # Get AI to select relevant sections
-            relevant_sections = await self._find_relevant_sections(
-                topic_name=topic_name,
-                sections=textbook_sections,
-                textbook_title=textbook_title,
-                prerequisites=prerequisites
-            )
+    async def _map_topic_individually(
+        self,
+        topic: Dict,
+        sections: List[Section],
+        textbook_title: str,
+        prerequisites: Optional[List[str]],
+        section_index: SectionIndex
+    ) -> Dict[str, List[Dict]]:
+        """One prompt for one topic"""
+        print(f"  → Mapping: {topic['name']}")
+
+        # Get AI to select relevant sections
+        relevant_sections = await self._find_relevant_sections(
+            topic_name=topic['name'],
+            sections=sections,
+            textbook_title=textbook_title,
+            prerequisites=prerequisites,
+            section_index=section_index
+        )
+
+        if not relevant_sections:
+            print(f"    ⚠ No relevant sections found")
+            return {}
+
+        print(f"    ✓ Found {len(relevant_sections)} relevant section(s)")
+        return {topic['id']: relevant_sections}
+
+    async def _map_topics_batched(
+        self,
+        topics: List[Dict],
+        sections: List[Section],
+        textbook_title: str,
+        prerequisites: Optional[List[str]],
+        section_index: SectionIndex,
+        token_budget: int = BATCH_TOKEN_BUDGET
+    ) -> Dict[str, List[Dict]]:
+        """
+        Map many topics with as few prompts as possible
 
-            if relevant_sections:
-                topic_mappings[topic_id] = relevant_sections
-                print(f"    ✓ Found {len(relevant_sections)} relevant section(s)")
+        Each topic's BM25 candidates are pooled; topics are packed into
+        chunks whose union of candidate sections fits the token budget,
+        and each chunk is one prompt. A chunk whose reply can't be parsed
+        falls back to per-topic prompts.
+        """
+        candidates = {}
+        for topic in topics:
+            filtered = self._keyword_filter(topic['name'], sections, top_k=BATCH_CANDIDATES_PER_TOPIC, section_index=section_index)
+            if filtered:
+                candidates[topic['id']] = [i for i, _ in filtered]
             else:
-                print(f"    ⚠ No relevant sections found")
+                print(f"  ⚠ {topic['name']}: no keyword matches found")
 
-            # Rate limiting: wait 2 seconds between AI calls to avoid rate limits
-            if i < len(topics) - 1:  # Don't wait after last topic
+        chunks = self._chunk_by_budget([t for t in topics if t['id'] in candidates], candidates, sections, token_budget)
+        if chunks:
+            print(f"[SECTION MAPPER] Mapping {len(candidates)} topic(s) in {len(chunks)} batched prompt(s)")
+
+        mappings = {}
+        for chunk_number, chunk in enumerate(chunks):
+            if chunk_number:
                 await asyncio.sleep(2)
 
-        return topic_mappings
+            section_ids = sorted({i for topic in chunk for i in candidates[topic['id']]})
+            try:
+                mappings.update(await self._map_chunk(chunk, section_ids, sections, textbook_title, prerequisites))
+            except Exception as e:
+                print(f"    ✗ Batched mapping failed ({e}), falling back to one prompt per topic")
+                for topic in chunk:
+                    mappings.update(await self._map_topic_individually(
+                        topic, sections, textbook_title, prerequisites, section_index
+                    ))
+
+        return mappings
+
+    def _chunk_by_budget(
+        self,
+        topics: List[Dict],
+        candidates: Dict[str, List[int]],
+        sections: List[Section],
+        token_budget: int
+    ) -> List[List[Dict]]:
+        """Greedily pack topics so each chunk's candidate union fits the budget"""
+        def section_tokens(index: int) -> int:
+            return len(sections[index].title) // CHARS_PER_TOKEN + SECTION_LINE_OVERHEAD_TOKENS
+
+        chunks: List[List[Dict]] = []
+        current: List[Dict] = []
+        current_sections = set()
+        current_tokens = 0
+
+        for topic in topics:
+            new_sections = [i for i in candidates[topic['id']] if i not in current_sections]
+            added = sum(section_tokens(i) for i in new_sections)
+
+            if current and current_tokens + added > token_budget:
+                chunks.append(current)
+                current, current_sections, current_tokens = [], set(), 0
+                new_sections = candidates[topic['id']]
+                added = sum(section_tokens(i) for i in new_sections)
+
+            current.append(topic)
+            current_sections.update(new_sections)
+            current_tokens += added
+
+        if current:
+            chunks.append(current)
+        return chunks
+
+    async def _map_chunk(
+        self,
+        topics: List[Dict],
+        section_ids: List[int],
+        sections: List[Section],
+        textbook_title: str,
+        prerequisites: Optional[List[str]],
+        max_sections: int = 3
+    ) -> Dict[str, List[Dict]]:
+        """One prompt for several topics over their pooled candidate sections"""
+        section_list = [self._section_info(i, sections[i]) for i in section_ids]
+
+        topic_lines = '\n'.join(f'- {topic["id"]}: {topic["name"]}' for topic in topics)
+
+        context = f'Textbook: "{textbook_title}"'
+        if prerequisites:
+            context += f'\nCourse Prerequisites: {", ".join(prerequisites)}'
 
-    def _keyword_filter(self, topic_name: str, sections: List[Dict], top_k: int = 50) -> List[Dict]:
+        prompt = f"""You are helping map course topics to relevant sections in a textbook.
+
+{context}
+
+Topics (id: name):
+{topic_lines}
+
+Available sections ({len(section_list)} total):
+{self._format_sections_for_prompt(section_list)}
+
+Task: For EACH topic, identify which sections are most relevant for learning it.
+
+Rules:
+1. Select 1-3 most relevant sections per topic
+2. Prioritize sections that directly cover the topic
+3. Choose sections with reasonable page ranges (3-15 pages ideal)
+4. If no sections are clearly relevant to a topic, give it an empty array
+5. ONLY return the JSON object, no explanatory text before or after
+
+Return ONLY this JSON structure (no other text), keyed by topic id:
+{{
+  "mappings": {{
+    "<topic id>": [
+      {{"index": 5, "relevance": "Directly covers fundamentals", "confidence": "high"}}
+    ]
+  }}
+}}
+"""
+
+        result = await self.llm.generate_json(prompt, max_tokens=min(4096, 256 + 160 * len(topics)))
+        raw_mappings = result.get('mappings')
+        if not isinstance(raw_mappings, dict):
+            raise ValueError("response has no 'mappings' object")
+
+        allowed = set(section_ids)
+        mappings = {}
+        for topic in topics:
+            relevant_sections = []
+            for match in (raw_mappings.get(str(topic['id'])) or [])[:max_sections]:
+                idx = match.get('index') if isinstance(match, dict) else None
+                if idx in allowed:
+                    section = sections[idx].to_dict()
+                    section['relevance'] = match.get('relevance', '')
+                    section['confidence'] = match.get('confidence', 'medium')
+                    relevant_sections.append(section)
+
+            if relevant_sections:
+                mappings[topic['id']] = relevant_sections
+                print(f"  ✓ {topic['name']}: {len(relevant_sections)} relevant section(s)")
+            else:
+                print(f"  ⚠ {topic['name']}: no relevant sections found")
+
+        return mappings
+
+    def _keyword_filter(
+        self,
+        topic_name: str,
+        sections: List[Section],
+        top_k: int = 50,
+        section_index: Optional[SectionIndex] = None
+    ) -> List[Tuple[int, Section]]:
         """
-        Pre-filter sections using simple keyword matching to reduce AI token usage
+        Pre-filter sections with BM25 retrieval to reduce AI token usage
 
         Args:
             topic_name: Topic to search for
             sections: All sections
             top_k: Return top K matches
+            section_index: Index over the same sections (built if omitted)
 
         Returns:
-            Filtered list of potentially relevant sections
+            List of (original index, section) for the best matches
         """
-        # Extract keywords from topic name
-        topic_keywords = set(topic_name.lower().split())
-
-        scored_sections = []
-        for i, section in enumerate(sections):
-            title_lower = section['title'].lower()
-            section_num = section.get('section_number', '').lower()
+        if section_index is None:
+            section_index = SectionIndex.build(sections)
 
-            # Simple keyword matching
-            score = 0
-            for keyword in topic_keywords:
-                if keyword in title_lower:
-                    score += 2  # Title match is strong
-                if keyword in section_num:
-                    score += 1
-
-            if score > 0:
-                scored_sections.append((score, i, section))
-
-        # Sort by score and return top K
-        scored_sections.sort(reverse=True, key=lambda x: x[0])
-
-        return [(i, section) for score, i, section in scored_sections[:top_k]]
+        return [(i, sections[i]) for i, _, _ in section_index.search(topic_name, top_k)]
 
     async def _find_relevant_sections(
         self,
         topic_name: str,
-        sections: List[Dict],
+        sections: List[Section],
         textbook_title: str,
         max_sections: int = 3,
-        prerequisites: List[str] = None
+        prerequisites: List[str] = None,
+        section_index: Optional[SectionIndex] = None
     ) -> List[Dict]:
         """
         Use AI to identify which sections are most relevant to a topic
@@ -119,12 +321,13 @@ class SectionMapper:
             textbook_title: Title of textbook for context
             max_sections: Maximum number of sections to return
             prerequisites: Optional list of prerequisite topics for context
+            section_index: Index over the same sections
 
         Returns:
             List of relevant section dicts with page ranges
         """
         # First pass: keyword filtering to reduce token usage
-        filtered = self._keyword_filter(topic_name, sections, top_k=50)
+        filtered = self._keyword_filter(topic_name, sections, top_k=50, section_index=section_index)
 
         if not filtered:
             print(f"    ⚠ No keyword matches found")
@@ -132,18 +335,8 @@ class SectionMapper:
 
         print(f"    → Pre-filtered to {len(filtered)} candidate sections")
 
-        # Format filtered sections for AI
-        section_list = []
-        for i, section in filtered:
-            section_info = {
-                'index': i,  # Original index in full section list
-                'title': section['title'],
-                'page_start': section['page_start'],
-                'page_end': section.get('page_end', section['page_start'])
-            }
-            if section.get('section_number'):
-                section_info['section_number'] = section['section_number']
-            section_list.append(section_info)
+        # Format filtered sections for AI (index is the position in the full section list)
+        section_list = [self._section_info(i, section) for i, section in filtered]
 
         # Build context string
         context = f'Textbook: "{textbook_title}"\nTopic: "{topic_name}"'
@@ -184,7 +377,7 @@ Return ONLY this JSON structure (no other text):
             for match in result.get('relevant_sections', [])[:max_sections]:
                 idx = match['index']
                 if idx < len(sections):
-                    section = sections[idx].copy()
+                    section = sections[idx].to_dict()
                     section['relevance'] = match.get('relevance', '')
                     section['confidence'] = match.get('confidence', 'medium')
                     relevant_sections.append(section)
@@ -195,6 +388,18 @@ Return ONLY this JSON structure (no other text):
             print(f"    ✗ Error in AI mapping: {e}")
             return []
 
+    def _section_info(self, index: int, section: Section) -> Dict:
+        """Prompt fields of one section"""
+        section_info = {
+            'index': index,
+            'title': section.title,
+            'page_start': section.page_start,
+            'page_end': section.page_end
+        }
+        if section.section_number:
+            section_info['section_number'] = section.section_number
+        return section_info
+
     def _format_sections_for_prompt(self, sections: List[Dict]) -> str:
         """Format sections as a numbered list for the AI prompt"""
         lines = []
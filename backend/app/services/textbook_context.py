@@ -0,0 +1,182 @@
+"""
+Textbook Context Service
+Retrieves the most relevant textbook passages for a topic within a token budget
+"""
+
+import math
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Optional
+
+from app.database import db
+from app.services.textbook_parser import get_textbook_parser
+from app.utils.line_classifier import extract_keywords
+from app.utils.section_index import tokenize
+from app.utils.textbook_structure import TextbookStructure
+
+# Prompt budget for textbook excerpts, per topic
+CONTEXT_TOKEN_BUDGET = 1500
+CHARS_PER_TOKEN = 4
+
+# Sections retrieved per topic, and pages read per section
+MAX_SECTIONS_PER_TOPIC = 3
+MAX_PAGES_PER_SECTION = 20
+
+# Target passage size when splitting page text
+PASSAGE_CHARS = 600
+
+
+def split_passages(text: str, target_chars: int = PASSAGE_CHARS) -> List[str]:
+    """Group consecutive lines into passages of roughly target_chars"""
+    passages = []
+    current: List[str] = []
+    size = 0
+
+    for line in text.splitlines():
+        line = line.strip()
+        if not line:
+            continue
+        current.append(line)
+        size += len(line) + 1
+        if size >= target_chars:
+            passages.append(" ".join(current))
+            current, size = [], 0
+
+    if current:
+        passages.append(" ".join(current))
+    return passages
+
+
+def rank_passages(query: str, passages: List[str], k1: float = 1.2) -> List[int]:
+    """
+    Rank passages against a query with saturated TF x IDF
+
+    Args:
+        query: Topic name or question
+        passages: Candidate passages
+        k1: Term-frequency saturation
+
+    Returns:
+        Passage indexes, best first (passages with no query term are dropped)
+    """
+    terms = set(tokenize(query))
+    if not terms or not passages:
+        return []
+
+    term_counts = [Counter(w for w in tokenize(p) if w in terms) for p in passages]
+    doc_freq = Counter(term for counts in term_counts for term in counts)
+    n = len(passages)
+    idf = {term: math.log(1 + (n - df + 0.5) / (df + 0.5)) for term, df in doc_freq.items()}
+
+    scores = []
+    for index, counts in enumerate(term_counts):
+        score = sum(idf[t] * c * (k1 + 1) / (c + k1) for t, c in counts.items())
+        if score > 0:
+            scores.append((score, index))
+
+    scores.sort(key=lambda item: (-item[0], item[1]))
+    return [index for _, index in scores]
+
+
+class TextbookContextService:
+    """Builds per-topic textbook excerpts for question generation"""
+
+    def __init__(self):
+        self.parser = get_textbook_parser()
+
+    async def build_topic_contexts(
+        self,
+        textbook_id: str,
+        topics: List[str],
+        token_budget: int = CONTEXT_TOKEN_BUDGET
+    ) -> Dict[str, str]:
+        """
+        Retrieve textbook excerpts for each topic
+
+        For each topic: keyword-match the textbook's sections, read those
+        sections' pages from the page text store, rank the passages
+        locally and keep the best ones that fit the budget (in book order).
+
+        Args:
+            textbook_id: Resource ID of the textbook
+            topics: Topic names
+            token_budget: Approximate token cap per topic
+
+        Returns:
+            Dict mapping topic name -> excerpt text (topics with no match omitted)
+        """
+        textbook = await self._load_textbook(textbook_id)
+        if not textbook:
+            return {}
+
+        contexts = {}
+        for topic in topics:
+            excerpt = self.build_excerpt(textbook, topic, token_budget)
+            if excerpt:
+                contexts[topic] = excerpt
+                print(f"[TEXTBOOK CONTEXT] {topic}: {len(excerpt)} chars of excerpts")
+            else:
+                print(f"[TEXTBOOK CONTEXT] {topic}: no matching sections")
+
+        return contexts
+
+    def build_excerpt(self, textbook: TextbookStructure, topic: str, token_budget: int = CONTEXT_TOKEN_BUDGET) -> str:
+        """Best passages for one topic, trimmed to the token budget"""
+        sections = self.parser.get_section_by_keywords(
+            textbook,
+            extract_keywords(topic),
+            top_k=MAX_SECTIONS_PER_TOPIC
+        )
+
+        passages: List[str] = []
+        for section in sections:
+            page_start = section['page_start']
+            page_end = min(section.get('page_end') or page_start, page_start + MAX_PAGES_PER_SECTION - 1)
+            passages.extend(split_passages(self.parser.get_page_text(textbook, page_start, page_end)))
+
+        char_budget = token_budget * CHARS_PER_TOKEN
+        chosen = []
+        used = 0
+        for index in rank_passages(topic, passages):
+            if used + len(passages[index]) > char_budget:
+                continue
+            chosen.append(index)
+            used += len(passages[index])
+
+        return "\n\n".join(passages[i] for i in sorted(chosen))
+
+    async def _load_textbook(self, textbook_id: str) -> Optional[TextbookStructure]:
+        """Structure (and page store) for an uploaded textbook"""
+        resource_result = db.client.table("resources")\
+            .select("file_path, title, content_sha256")\
+            .eq("id", textbook_id)\
+            .limit(1)\
+            .execute()
+
+        if not resource_result.data:
+            return None
+
+        resource = resource_result.data[0]
+        file_path = resource.get("file_path")
+        if not file_path or not Path(file_path).exists():
+            print(f"[TEXTBOOK CONTEXT] PDF for textbook {textbook_id} is missing")
+            return None
+
+        # Cache hit for ingested books; parses and builds the store otherwise
+        return await self.parser.register_textbook(
+            file_path,
+            title=resource.get("title"),
+            content_hash=resource.get("content_sha256")
+        )
+
+
+# Global instance
+_textbook_context_service: Optional[TextbookContextService] = None
+
+
+def get_textbook_context_service() -> TextbookContextService:
+    """Get or create global textbook context service instance"""
+    global _textbook_context_service
+    if _textbook_context_service is None:
+        _textbook_context_service = TextbookContextService()
+    return _textbook_context_service
@@ -1,41 +1,63 @@
 """
 Textbook Parser Service
-Register textbooks and extract structure (ToC, chapters, sections) with caching
+Register textbooks and extract structure (ToC, chapters, sections) with caching,
+plus a per-page text store keyed by content hash
 """
 
 from typing import List, Dict, Optional
 from uuid import uuid4
 from pathlib import Path
 import json
-import hashlib
 from datetime import datetime
 
 from app.models.resource import Resource, ResourceType
-from app.utils.pdf_utils import parse_textbook_structure, get_pdf_metadata, extract_text_from_pdf
+from app.utils.pdf_utils import parse_textbook_structure, get_pdf_metadata
+from app.services.pdf_pool import get_pdf_pool, extract_pdf_text, iter_pdf_page_texts
+from app.utils.page_store import PageStoreWriter, PageTextStore
+from app.utils.section_index import SectionIndex, section_fingerprint
+from app.utils.textbook_structure import Section, TextbookStructure
+from app.utils.upload_utils import hash_file
 from app.database import db
 
 # Cache directory for textbook structures
 CACHE_DIR = Path(__file__).parent.parent.parent / ".cache" / "textbooks"
 CACHE_DIR.mkdir(parents=True, exist_ok=True)
 
+# Pages of body text indexed per section
+MAX_INDEXED_PAGES = 30
+
+
+def _section_page_text(store: PageTextStore, section: Section) -> str:
+    """A section's body text from the page store (first MAX_INDEXED_PAGES pages)"""
+    page_end = min(section.page_end, section.page_start + MAX_INDEXED_PAGES - 1)
+    return store.text(section.page_start, page_end)
+
 
 class TextbookParser:
     """Service for parsing and registering textbooks"""
 
-    def _get_cache_key(self, pdf_path: str) -> str:
-        """Generate cache key from PDF path and file modification time"""
+    def __init__(self):
+        # Memory-mapped page text stores by content hash
+        self._page_stores: Dict[str, PageTextStore] = {}
+        # Section search indexes by content hash
+        self._section_indexes: Dict[str, SectionIndex] = {}
+
+    def _get_cache_key(self, pdf_path: str, content_hash: Optional[str] = None) -> Optional[str]:
+        """
+        Cache key is the PDF's SHA-256, so the same book hits the cache
+        whatever it is named or wherever it is stored
+        """
+        if content_hash:
+            return content_hash
+
         path_obj = Path(pdf_path)
         if not path_obj.exists():
             return None
 
-        # Use file path + modification time for cache key
-        mtime = path_obj.stat().st_mtime
-        key_str = f"{pdf_path}_{mtime}"
-        return hashlib.md5(key_str.encode()).hexdigest()[:16]
+        return hash_file(path_obj)
 
-    def _read_cache(self, pdf_path: str) -> Optional[Dict]:
+    def _read_cache(self, cache_key: Optional[str]) -> Optional[TextbookStructure]:
         """Read cached textbook structure"""
-        cache_key = self._get_cache_key(pdf_path)
         if not cache_key:
             return None
 
@@ -47,14 +69,13 @@ class TextbookParser:
             with open(cache_file, 'r') as f:
                 data = json.load(f)
             print(f"[TEXTBOOK CACHE HIT] Using cached structure for textbook")
-            return data
+            return TextbookStructure.from_dict(data)
         except Exception as e:
             print(f"[TEXTBOOK CACHE ERROR] Failed to read: {e}")
             return None
 
-    def _write_cache(self, pdf_path: str, textbook_data: Dict):
+    def _write_cache(self, cache_key: Optional[str], structure: TextbookStructure):
         """Write textbook structure to cache"""
-        cache_key = self._get_cache_key(pdf_path)
         if not cache_key:
             return
 
@@ -63,15 +84,15 @@ class TextbookParser:
         try:
             # Add cache metadata
             cache_data = {
-                **textbook_data,
+                **structure.to_dict(),
                 'cached_at': datetime.now().isoformat(),
-                'cache_version': '1.0'
+                'cache_version': '2.0'
             }
 
             with open(cache_file, 'w') as f:
                 json.dump(cache_data, f, indent=2)
 
-            print(f"[TEXTBOOK CACHE WRITE] Cached structure with {len(textbook_data['sections'])} sections")
+            print(f"[TEXTBOOK CACHE WRITE] Cached structure with {len(structure.sections)} sections")
         except Exception as e:
             print(f"[TEXTBOOK CACHE ERROR] Failed to write: {e}")
 
@@ -79,8 +100,9 @@ class TextbookParser:
         self,
         pdf_path: str,
         title: Optional[str] = None,
-        subject: Optional[str] = None
-    ) -> Dict:
+        subject: Optional[str] = None,
+        content_hash: Optional[str] = None
+    ) -> TextbookStructure:
         """
         Register a new textbook in the library with caching
 
@@ -88,61 +110,226 @@ class TextbookParser:
             pdf_path: Path to textbook PDF
             title: Optional title (defaults to filename)
             subject: Optional subject (e.g., "Calculus")
+            content_hash: SHA-256 of the PDF if already known (e.g. from upload)
 
         Returns:
-            Dict with textbook info and parsed structure
+            Textbook info and parsed structure
         """
         print(f"\n[TEXTBOOK PARSER] Registering textbook: {pdf_path}")
 
         # Check cache first
-        cached_data = self._read_cache(pdf_path)
-        if cached_data:
+        cache_key = self._get_cache_key(pdf_path, content_hash)
+        cached = self._read_cache(cache_key)
+        if cached:
+            # The cached copy may describe the same book at another path
+            cached.file_path = pdf_path
             # Update title if provided
             if title:
-                cached_data['title'] = title
-            print(f"\n[TEXTBOOK PARSER] ✓ Loaded from cache: {cached_data['title']}")
-            print(f"[TEXTBOOK PARSER]   Pages: {cached_data['total_pages']}")
-            print(f"[TEXTBOOK PARSER]   Sections: {len(cached_data['sections'])}")
-            print(f"[TEXTBOOK PARSER]   Method: {cached_data['parsing_method']}")
-            return cached_data
+                cached.title = title
+            print(f"\n[TEXTBOOK PARSER] ✓ Loaded from cache: {cached.title}")
+            print(f"[TEXTBOOK PARSER]   Pages: {cached.total_pages}")
+            print(f"[TEXTBOOK PARSER]   Sections: {len(cached.sections)}")
+            print(f"[TEXTBOOK PARSER]   Method: {cached.parsing_method}")
+            return cached
 
         # Not in cache - parse the textbook
+        structure = await self._parse_structure(pdf_path, title, cache_key)
+
+        # Store per-page text so later features never reopen the PDF
+        try:
+            await self.build_page_store(pdf_path, cache_key)
+        except Exception as e:
+            print(f"[TEXTBOOK PARSER] Page text store failed (continuing): {e}")
+
+        # Build the section search index once, over titles and page text
+        self.get_section_index(structure)
+
+        print(f"\n[TEXTBOOK PARSER] ✓ Registered: {structure.title}")
+        print(f"[TEXTBOOK PARSER]   Pages: {structure.total_pages}")
+        print(f"[TEXTBOOK PARSER]   Sections: {len(structure.sections)}")
+        print(f"[TEXTBOOK PARSER]   Method: {structure.parsing_method}")
+
+        return structure
+
+    async def load_structure(
+        self,
+        pdf_path: str,
+        title: Optional[str] = None,
+        content_hash: Optional[str] = None
+    ) -> TextbookStructure:
+        """
+        Textbook structure only: from cache, or parsed and cached
+
+        Unlike register_textbook this does not build the page text store or
+        section index, so ingestion can run those as separate stages.
+
+        Args:
+            pdf_path: Path to textbook PDF
+            title: Optional title (defaults to PDF title/filename)
+            content_hash: SHA-256 of the PDF if already known
+
+        Returns:
+            Textbook info and parsed structure
+        """
+        cache_key = self._get_cache_key(pdf_path, content_hash)
+        cached = self._read_cache(cache_key)
+        if cached:
+            cached.file_path = pdf_path
+            if title:
+                cached.title = title
+            return cached
+
+        return await self._parse_structure(pdf_path, title, cache_key)
+
+    async def _parse_structure(
+        self,
+        pdf_path: str,
+        title: Optional[str],
+        cache_key: Optional[str]
+    ) -> TextbookStructure:
+        """Parse metadata and structure in the PDF pool, then cache them"""
         print(f"[TEXTBOOK PARSER] Cache miss - parsing textbook structure...")
 
+        # PDF work runs in the worker pool so the event loop stays free
+        pdf_pool = get_pdf_pool()
+
         # Extract metadata
-        metadata = get_pdf_metadata(pdf_path)
+        metadata = await pdf_pool.run(get_pdf_metadata, pdf_path)
 
         # Use provided title or fallback to PDF title/filename
         final_title = title or metadata['title']
 
         # Parse structure (this is the slow part - 716 sections)
-        structure = parse_textbook_structure(pdf_path)
-
-        # Prepare textbook data
-        textbook_data = {
-            'id': str(uuid4()),
-            'title': final_title,
-            'file_path': pdf_path,
-            'total_pages': metadata['total_pages'],
-            'file_size_mb': metadata['file_size_mb'],
-            'parsed': True,
-            'parsing_method': structure['parsing_method'],
-            'sections': structure['sections']
-        }
+        structure = await pdf_pool.run(parse_textbook_structure, pdf_path)
+
+        # Prepare textbook data (the chapter tree is built from the flat sections)
+        textbook = TextbookStructure(
+            id=str(uuid4()),
+            title=final_title,
+            file_path=pdf_path,
+            total_pages=metadata['total_pages'],
+            file_size_mb=metadata['file_size_mb'],
+            content_sha256=cache_key,
+            parsing_method=structure['parsing_method'],
+            sections=[Section.from_dict(s) for s in structure['sections']]
+        )
 
         # Cache the structure
-        self._write_cache(pdf_path, textbook_data)
+        self._write_cache(cache_key, textbook)
+        return textbook
+
+    async def build_page_store(self, pdf_path: str, content_hash: Optional[str] = None) -> Optional[PageTextStore]:
+        """
+        Extract every page once into the textbook's page text store
+
+        Pages are extracted in parallel by the PDF pool and streamed into
+        the store in order. No-op if the store already exists.
+
+        Args:
+            pdf_path: Path to textbook PDF
+            content_hash: SHA-256 of the PDF if already known
+
+        Returns:
+            The opened store
+        """
+        cache_key = self._get_cache_key(pdf_path, content_hash)
+        if not cache_key:
+            return None
+
+        store_path = CACHE_DIR / f"{cache_key}.pages"
+        if not store_path.exists():
+            print(f"[TEXTBOOK PARSER] Building page text store...")
+            with PageStoreWriter(store_path) as writer:
+                async for _, text in iter_pdf_page_texts(pdf_path):
+                    writer.add(text)
+
+        return self.get_page_store(cache_key)
+
+    def get_page_store(self, content_hash: str) -> Optional[PageTextStore]:
+        """Open (once per process) the page text store for a textbook, if built"""
+        store = self._page_stores.get(content_hash)
+        if store is None:
+            store_path = CACHE_DIR / f"{content_hash}.pages"
+            if not store_path.exists():
+                return None
+            store = PageTextStore(store_path)
+            self._page_stores[content_hash] = store
+        return store
+
+    def get_page_text(self, textbook: TextbookStructure, page_start: int, page_end: int) -> str:
+        """
+        Text of pages page_start..page_end of a registered textbook
+
+        Args:
+            textbook: Registered textbook (with content_sha256)
+            page_start: First page (1-based)
+            page_end: Last page (inclusive)
+
+        Returns:
+            Joined page text, or "" if the textbook has no page store
+        """
+        content_hash = textbook.content_sha256
+        store = self.get_page_store(content_hash) if content_hash else None
+        if store is None:
+            return ""
+        return store.text(page_start, page_end)
+
+    async def get_textbook_text(self, pdf_path: str, content_hash: Optional[str] = None) -> str:
+        """
+        Full text of a textbook, served from its page text store
+
+        Args:
+            pdf_path: Path to textbook PDF
+            content_hash: SHA-256 of the PDF if already known
 
-        print(f"\n[TEXTBOOK PARSER] ✓ Registered: {final_title}")
-        print(f"[TEXTBOOK PARSER]   Pages: {metadata['total_pages']}")
-        print(f"[TEXTBOOK PARSER]   Sections: {len(structure['sections'])}")
-        print(f"[TEXTBOOK PARSER]   Method: {structure['parsing_method']}")
+        Returns:
+            Extracted text
+        """
+        store = await self.build_page_store(pdf_path, content_hash)
+        if store is None:
+            return await extract_pdf_text(pdf_path)
+        return store.text()
+
+    def get_section_index(self, textbook: TextbookStructure) -> SectionIndex:
+        """
+        BM25 index over a textbook's sections
+
+        Indexes titles and (when the page store exists) section page text.
+        Persisted next to the structure cache and kept in memory per book;
+        textbooks without a content hash get a title-only index.
+        """
+        content_hash = textbook.content_sha256
+        sections = textbook.sections
+
+        if not content_hash:
+            return SectionIndex.build(sections)
+
+        index = self._section_indexes.get(content_hash)
+        if index is not None:
+            return index
+
+        index_file = CACHE_DIR / f"{content_hash}.index.json"
+        index = SectionIndex.load(index_file)
 
-        return textbook_data
+        store = self.get_page_store(content_hash)
+        if index is None or index.fingerprint != section_fingerprint(sections, store is not None):
+            section_text = None
+            if store is not None:
+                section_text = lambda section: _section_page_text(store, section)
+
+            index = SectionIndex.build(sections, section_text)
+            try:
+                index.save(index_file)
+                print(f"[TEXTBOOK CACHE WRITE] Indexed {len(sections)} sections ({len(index.postings)} terms)")
+            except Exception as e:
+                print(f"[TEXTBOOK CACHE ERROR] Failed to write section index: {e}")
+
+        self._section_indexes[content_hash] = index
+        return index
 
     def get_section_by_keywords(
         self,
-        textbook: Dict,
+        textbook: TextbookStructure,
         keywords: List[str],
         top_k: int = 3
     ) -> List[Dict]:
@@ -150,36 +337,27 @@ class TextbookParser:
         Find sections matching keywords
 
         Args:
-            textbook: Textbook dict with sections
+            textbook: Registered textbook
             keywords: List of keywords to search
             top_k: Return top K matches
 
         Returns:
             List of matching sections with scores
         """
-        sections = textbook.get('sections', [])
-        scored_sections = []
-
-        keywords_lower = [k.lower() for k in keywords]
-
-        for section in sections:
-            section_keywords = section.get('keywords', [])
-
-            # Count keyword matches
-            match_count = sum(1 for k in keywords_lower if k in section_keywords)
-
-            if match_count > 0:
-                confidence = match_count / len(keywords_lower)
-                scored_sections.append({
-                    **section,
-                    'match_count': match_count,
-                    'confidence': round(confidence, 2)
-                })
-
-        # Sort by match count (descending)
-        scored_sections.sort(key=lambda x: x['match_count'], reverse=True)
-
-        return scored_sections[:top_k]
+        sections = textbook.sections
+        index = self.get_section_index(textbook)
+        query = " ".join(keywords)
+        query_terms = index.query_terms(query) or 1
+
+        return [
+            {
+                **sections[doc_id].to_dict(),
+                'match_count': matched,
+                'score': round(score, 3),
+                'confidence': round(matched / query_terms, 2)
+            }
+            for doc_id, score, matched in index.search(query, top_k)
+        ]
 
 
 # Global instance
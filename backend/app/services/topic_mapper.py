@@ -7,7 +7,11 @@ from typing import List, Dict, Optional
 
 from app.models.topic import Topic
 from app.services.llm_service import get_llm_service
-from app.utils.pdf_utils import _extract_keywords
+from app.services.textbook_parser import get_textbook_parser
+from app.utils.line_classifier import extract_keywords
+from app.utils.section_index import SectionIndex
+from app.utils.textbook_structure import Section, TextbookStructure
+from app.utils.title_matcher import TitleMatcher, get_mapping_metrics
 
 
 class TopicMapper:
@@ -19,35 +23,56 @@ class TopicMapper:
     async def auto_map_topics(
         self,
         topics: List[Topic],
-        textbook: Dict
+        textbook: TextbookStructure
     ) -> Dict[str, List[Dict]]:
         """
         Automatically map topics to textbook sections
 
         Args:
             topics: List of course topics
-            textbook: Textbook with parsed sections
+            textbook: Registered textbook
 
         Returns:
             Dict mapping topic_id to list of matched sections
         """
         print(f"\n[TOPIC MAPPER] Mapping {len(topics)} topics to textbook sections...")
 
+        # Shared, persisted index for this textbook
+        section_index = get_textbook_parser().get_section_index(textbook)
+
+        # Local gate: obvious title matches don't need Claude
+        matcher = TitleMatcher(textbook.sections)
+        metrics = get_mapping_metrics()
+
         mappings = {}
 
         for topic in topics:
             print(f"  → Mapping: {topic.name}")
 
+            decision = matcher.decide(topic.name)
+            if decision is not None:
+                index, similarity = decision
+                metrics.record(local=True)
+                mappings[topic.id] = [{
+                    **textbook.sections[index].to_dict(),
+                    'match_score': round(similarity, 3),
+                    'confidence': round(similarity, 2)
+                }]
+                print(f"    ✓ Matched locally (cosine {similarity:.2f}), skipped LLM refinement")
+                continue
+
             # Extract keywords from topic name
-            topic_keywords = _extract_keywords(topic.name)
+            topic_keywords = extract_keywords(topic.name)
 
             # Find matching sections
             matches = self._find_matching_sections(
                 topic_keywords=topic_keywords,
-                sections=textbook['sections']
+                sections=textbook.sections,
+                section_index=section_index
             )
 
             if matches:
+                metrics.record(local=False)
                 # Use Claude to pick the best match(es)
                 best_matches = await self._refine_matches_with_llm(
                     topic=topic,
@@ -64,33 +89,29 @@ class TopicMapper:
     def _find_matching_sections(
         self,
         topic_keywords: List[str],
-        sections: List[Dict]
+        sections: List[Section],
+        section_index: Optional[SectionIndex] = None,
+        top_k: int = 10
     ) -> List[Dict]:
         """
         Find sections matching topic keywords
 
-        Uses simple keyword overlap
+        BM25 retrieval over the textbook's section index
         """
-        scored_sections = []
-
-        for section in sections:
-            section_keywords = section.get('keywords', [])
-
-            # Count keyword overlaps
-            overlap = sum(1 for kw in topic_keywords if kw in section_keywords)
-
-            if overlap > 0:
-                confidence = overlap / len(topic_keywords)
-                scored_sections.append({
-                    **section,
-                    'match_score': overlap,
-                    'confidence': round(confidence, 2)
-                })
-
-        # Sort by match score
-        scored_sections.sort(key=lambda x: x['match_score'], reverse=True)
-
-        return scored_sections
+        if section_index is None:
+            section_index = SectionIndex.build(sections)
+
+        query = " ".join(topic_keywords)
+        query_terms = section_index.query_terms(query) or 1
+
+        return [
+            {
+                **sections[doc_id].to_dict(),
+                'match_score': round(score, 3),
+                'confidence': round(matched / query_terms, 2)
+            }
+            for doc_id, score, matched in section_index.search(query, top_k)
+        ]
 
     async def _refine_matches_with_llm(
         self,
@@ -3,15 +3,102 @@ Topic Parser Service
 Extracts topics from course syllabi using LLM
 """
 
-from typing import List, Optional
-from uuid import UUID, uuid4
+from typing import List, Dict, Optional
+from uuid import UUID
+import asyncio
 import re
 
-from app.models.topic import Topic, ParseTopicsRequest, ParseTopicsResponse
+from app.models.topic import Topic
 from app.models.course import CourseLevel
 from app.services.llm_service import get_llm_service
-from app.utils.prompts import topic_extraction_prompt, fallback_topics_from_headings
-from app.database import db
+from app.services.topic_store import upsert_topics
+from app.utils.prompts import (
+    topic_extraction_prompt,
+    topic_candidates_prompt,
+    topic_merge_prompt,
+)
+from app.utils.section_index import tokenize
+
+# The single prompt reads this much input; longer inputs are chunked to it
+CHUNK_CHARS = 4000
+
+# Map prompts in flight at once, and candidates per part / sent to reduce
+MAX_PARALLEL_CHUNKS = 4
+CANDIDATES_PER_CHUNK = 10
+MAX_MERGED_CANDIDATES = 40
+
+
+def split_into_chunks(text: str, chunk_chars: int = CHUNK_CHARS) -> List[str]:
+    """
+    Split text on line boundaries into chunks of at most chunk_chars
+
+    A single line longer than a chunk is cut at the limit.
+    """
+    chunks = []
+    current: List[str] = []
+    size = 0
+    for line in text.split('\n'):
+        while len(line) > chunk_chars:
+            head, line = line[:chunk_chars], line[chunk_chars:]
+            if current:
+                chunks.append('\n'.join(current))
+                current, size = [], 0
+            chunks.append(head)
+        if current and size + len(line) + 1 > chunk_chars:
+            chunks.append('\n'.join(current))
+            current, size = [], 0
+        current.append(line)
+        size += len(line) + 1
+
+    if current and '\n'.join(current).strip():
+        chunks.append('\n'.join(current))
+    return [chunk for chunk in chunks if chunk.strip()]
+
+
+def normalize_topic_name(name: str) -> str:
+    """
+    Dedup key for a topic name: stemmed content words, order-free
+
+    "Linear Equations", "linear equation" and "Equations, linear" share a key.
+    Names with no indexable words ("C", "R", "C++") key on the lowercased
+    name itself.
+    """
+    return ' '.join(sorted(set(tokenize(name)))) or name.lower()
+
+
+def merge_candidates(candidate_lists: List[List[Dict]], limit: int = MAX_MERGED_CANDIDATES) -> List[Dict]:
+    """
+    Deduplicate candidates from all chunks
+
+    Args:
+        candidate_lists: Per-chunk lists of {"name", "weight"}
+        limit: Most candidates to keep
+
+    Returns:
+        Merged candidates ({"name", "weight", "count"}), most frequent
+        first, then in order of first mention; weight is the highest seen
+    """
+    merged: Dict[str, Dict] = {}
+    for candidates in candidate_lists:
+        for candidate in candidates:
+            name = re.sub(r'\s+', ' ', str(candidate.get('name') or '')).strip()
+            key = normalize_topic_name(name)
+            if not key:
+                continue
+            try:
+                weight = max(0.0, float(candidate.get('weight') or 1.0))
+            except (TypeError, ValueError):
+                weight = 1.0
+
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = {"name": name, "weight": weight, "count": 1}
+            else:
+                entry["count"] += 1
+                entry["weight"] = max(entry["weight"], weight)
+
+    # Stable sort keeps first-mention order among equally frequent candidates
+    return sorted(merged.values(), key=lambda c: -c["count"])[:limit]
 
 
 class TopicParserService:
@@ -23,7 +110,8 @@ class TopicParserService:
     async def parse_topics(
         self,
         syllabus_text: str,
-        course_level: Optional[CourseLevel] = None
+        course_level: Optional[CourseLevel] = None,
+        chunked: Optional[bool] = None
     ) -> tuple[List[Topic], List[str]]:
         """
         Extract PREREQUISITE topics from syllabus text using Claude LLM
@@ -34,6 +122,8 @@ class TopicParserService:
         Args:
             syllabus_text: The course syllabus text
             course_level: Educational level (hs, ug, grad)
+            chunked: Map-reduce over chunks of the text (default: only when
+                     the text is longer than one prompt reads)
 
         Returns:
             Tuple of (List of prerequisite Topic objects, List of prerequisite names)
@@ -43,6 +133,11 @@ class TopicParserService:
         """
         print(f"\n[TOPIC PARSER] Extracting prerequisite topics from syllabus ({len(syllabus_text)} chars)...")
 
+        if chunked is None:
+            chunked = len(syllabus_text) > CHUNK_CHARS
+        if chunked:
+            return await self._parse_topics_chunked(syllabus_text, course_level)
+
         # Create prompt focused ONLY on prerequisites
         prompt = topic_extraction_prompt(
             syllabus_text=syllabus_text,
@@ -54,36 +149,110 @@ class TopicParserService:
         try:
             # Call Claude LLM for structured JSON response
             topics_data = await self.llm.generate_json(prompt, max_tokens=2048)
+            return self._topics_result(self._validate_topics(topics_data))
 
-            # Validate and convert to Topic objects
-            if not isinstance(topics_data, list):
-                raise ValueError("LLM response is not a list")
+        except Exception as e:
+            print(f"[TOPIC PARSER ERROR] Failed to extract prerequisites: {e}")
+            raise ValueError(f"Could not parse prerequisite topics from syllabus: {str(e)}")
 
-            topics = []
-            for item in topics_data:
-                try:
-                    topic = Topic(**item)
-                    topics.append(topic)
-                except Exception as e:
-                    print(f"[TOPIC PARSER WARNING] Skipping invalid topic: {e}")
-                    continue
+    async def _parse_topics_chunked(
+        self,
+        syllabus_text: str,
+        course_level: Optional[CourseLevel]
+    ) -> tuple[List[Topic], List[str]]:
+        """
+        Map-reduce extraction for long syllabi and textbook outlines
 
-            if not topics:
-                raise ValueError("No valid prerequisite topics extracted")
+        Map: each chunk gets a small prompt for candidate prerequisites, up
+        to MAX_PARALLEL_CHUNKS at a time. The candidates are merged and
+        deduplicated locally (normalize_topic_name). Reduce: one prompt over
+        the merged names picks, orders and links the final topics. If the
+        reduce call fails, the merged candidates are used in order, unlinked.
+        """
+        level = course_level.value if course_level else None
+        chunks = split_into_chunks(syllabus_text)
+        print(f"[TOPIC PARSER] Chunked extraction: {len(chunks)} part(s)")
+
+        semaphore = asyncio.Semaphore(MAX_PARALLEL_CHUNKS)
+
+        async def extract_candidates(part: int, chunk: str) -> List[Dict]:
+            prompt = topic_candidates_prompt(
+                chunk_text=chunk,
+                part=part,
+                parts=len(chunks),
+                course_level=level,
+                max_candidates=CANDIDATES_PER_CHUNK
+            )
+            async with semaphore:
+                candidates = await self.llm.generate_json(prompt, max_tokens=1024)
+            if not isinstance(candidates, list):
+                raise ValueError("LLM response is not a list")
+            return [c for c in candidates if isinstance(c, dict)]
 
-            # Extract prerequisite names for legacy compatibility
-            prerequisites = [t.name for t in topics[:5]]  # First 5 are most fundamental
+        results = await asyncio.gather(
+            *(extract_candidates(part, chunk) for part, chunk in enumerate(chunks, 1)),
+            return_exceptions=True
+        )
 
-            print(f"[TOPIC PARSER] Successfully extracted {len(topics)} prerequisite topics:")
-            for topic in topics:
-                prereq_ids = f" (requires: {', '.join(topic.prereqs)})" if topic.prereqs else ""
-                print(f"  - {topic.name} (weight: {topic.weight}){prereq_ids}")
+        candidate_lists = []
+        for part, result in enumerate(results, 1):
+            if isinstance(result, Exception):
+                print(f"[TOPIC PARSER WARNING] Part {part} failed: {result}")
+            else:
+                candidate_lists.append(result)
 
-            return topics, prerequisites
+        candidates = merge_candidates(candidate_lists)
+        if not candidates:
+            raise ValueError("Could not parse prerequisite topics from syllabus: no candidates extracted")
+        print(f"[TOPIC PARSER] {sum(len(c) for c in candidate_lists)} candidates merged into {len(candidates)}")
 
+        try:
+            prompt = topic_merge_prompt([c["name"] for c in candidates], course_level=level)
+            topics = self._validate_topics(await self.llm.generate_json(prompt, max_tokens=2048))
         except Exception as e:
-            print(f"[TOPIC PARSER ERROR] Failed to extract prerequisites: {e}")
-            raise ValueError(f"Could not parse prerequisite topics from syllabus: {str(e)}")
+            print(f"[TOPIC PARSER WARNING] Merge step failed, using merged candidates: {e}")
+            topics = [
+                Topic(id=f"t_{i:03d}", name=c["name"], weight=c["weight"])
+                for i, c in enumerate(candidates, 1)
+            ]
+
+        return self._topics_result(topics)
+
+    def _validate_topics(self, topics_data) -> List[Topic]:
+        """Topic objects from an LLM topic array, dropping invalid entries and unknown prereqs"""
+        # Validate and convert to Topic objects
+        if not isinstance(topics_data, list):
+            raise ValueError("LLM response is not a list")
+
+        topics = []
+        for item in topics_data:
+            try:
+                topic = Topic(**item)
+                topics.append(topic)
+            except Exception as e:
+                print(f"[TOPIC PARSER WARNING] Skipping invalid topic: {e}")
+                continue
+
+        if not topics:
+            raise ValueError("No valid prerequisite topics extracted")
+
+        known_ids = {topic.id for topic in topics}
+        for topic in topics:
+            topic.prereqs = [p for p in topic.prereqs if p in known_ids and p != topic.id]
+
+        return topics
+
+    def _topics_result(self, topics: List[Topic]) -> tuple[List[Topic], List[str]]:
+        """Log the extracted topics and pair them with their names"""
+        # Extract prerequisite names for legacy compatibility
+        prerequisites = [t.name for t in topics[:5]]  # First 5 are most fundamental
+
+        print(f"[TOPIC PARSER] Successfully extracted {len(topics)} prerequisite topics:")
+        for topic in topics:
+            prereq_ids = f" (requires: {', '.join(topic.prereqs)})" if topic.prereqs else ""
+            print(f"  - {topic.name} (weight: {topic.weight}){prereq_ids}")
+
+        return topics, prerequisites
 
     async def save_topics_to_db(
         self,
@@ -102,28 +271,10 @@ class TopicParserService:
         """
         print(f"\n[TOPIC PARSER] Saving {len(topics)} topics to database...")
 
-        # Prepare topic records
-        topic_records = []
-        for idx, topic in enumerate(topics):
-            topic_records.append({
-                "course_id": str(course_id),
-                "topic_id": topic.id,
-                "name": topic.name,
-                "weight": topic.weight,
-                "order_index": idx + 1,
-            })
-
         try:
-            # Insert topics
-            result = db.client.table("topics").insert(topic_records).execute()
-            inserted_topics = result.data
-
+            # Topics and their prerequisites, one batch each
+            inserted_topics = upsert_topics(str(course_id), topics)
             print(f"[TOPIC PARSER] Saved {len(inserted_topics)} topics")
-
-            # Save prerequisites
-            if inserted_topics:
-                await self._save_prerequisites(topics, inserted_topics)
-
             return inserted_topics
 
         except Exception as e:
@@ -131,52 +282,6 @@ class TopicParserService:
             raise
 
 
-    async def _save_prerequisites(
-        self,
-        topics: List[Topic],
-        inserted_topics: List[dict]
-    ) -> None:
-        """
-        Save topic prerequisite relationships
-
-        Args:
-            topics: Original Topic objects with prereqs
-            inserted_topics: Inserted topic records from DB
-        """
-        # Map topic_id to UUID
-        topic_id_to_uuid = {
-            t["topic_id"]: t["id"]
-            for t in inserted_topics
-        }
-
-        prereq_records = []
-        for topic in topics:
-            if not topic.prereqs:
-                continue
-
-            topic_uuid = topic_id_to_uuid.get(topic.id)
-            if not topic_uuid:
-                continue
-
-            for prereq_id in topic.prereqs:
-                prereq_uuid = topic_id_to_uuid.get(prereq_id)
-                if not prereq_uuid:
-                    print(f"[TOPIC PARSER WARNING] Prereq {prereq_id} not found")
-                    continue
-
-                prereq_records.append({
-                    "topic_id": topic_uuid,
-                    "prerequisite_topic_id": prereq_uuid,
-                })
-
-        if prereq_records:
-            try:
-                db.client.table("topic_prerequisites").insert(prereq_records).execute()
-                print(f"[TOPIC PARSER] Saved {len(prereq_records)} prerequisites")
-            except Exception as e:
-                print(f"[TOPIC PARSER WARNING] Failed to save prerequisites: {e}")
-
-
 # Global instance
 _topic_parser: Optional[TopicParserService] = None
 
@@ -0,0 +1,93 @@
+"""
+Topic Store
+Bulk topic persistence shared by textbook ingestion, form publishing and syllabus parsing
+"""
+
+from typing import List, Dict, Optional
+
+from app.database import db
+from app.models.topic import Topic
+
+
+def upsert_topics(
+    course_id: str,
+    topics: List[Topic],
+    order_start: Optional[int] = 1,
+    source_id: Optional[str] = None
+) -> List[Dict]:
+    """
+    Save a course's topics and their prerequisites in one batch each
+
+    Topic ids from the LLM ("t_001", ...) repeat across textbooks in the
+    same course, so topics are only upserted within their source: with a
+    source_id (e.g. the ingestion job), re-saving that source's topics (a
+    resumed job) updates them in place. Without one they are inserted as
+    new rows.
+
+    Args:
+        course_id: Course UUID
+        topics: Topics to save, in order
+        order_start: order_index of the first topic (None leaves order unset)
+        source_id: What produced the topics; scopes the upsert key
+
+    Returns:
+        Saved topic rows (with their UUIDs)
+    """
+    if not topics:
+        return []
+
+    records = []
+    for position, topic in enumerate(topics):
+        record = {
+            "course_id": str(course_id),
+            "topic_id": topic.id,
+            "name": topic.name,
+            "weight": topic.weight,
+        }
+        if order_start is not None:
+            record["order_index"] = order_start + position
+        if source_id is not None:
+            record["source_id"] = str(source_id)
+        records.append(record)
+
+    if source_id is not None:
+        result = db.client.table("topics")\
+            .upsert(records, on_conflict="course_id,source_id,topic_id")\
+            .execute()
+    else:
+        result = db.client.table("topics").insert(records).execute()
+    saved = result.data or []
+
+    _upsert_prerequisites(topics, saved)
+    return saved
+
+
+def _upsert_prerequisites(topics: List[Topic], saved: List[Dict]) -> None:
+    """Link prerequisites by topic_id within the saved batch"""
+    topic_id_to_uuid = {row["topic_id"]: row["id"] for row in saved}
+
+    prereq_records = []
+    for topic in topics:
+        topic_uuid = topic_id_to_uuid.get(topic.id)
+        if not topic_uuid:
+            continue
+
+        for prereq_id in topic.prereqs:
+            prereq_uuid = topic_id_to_uuid.get(prereq_id)
+            if not prereq_uuid:
+                print(f"[TOPIC STORE WARNING] Prereq {prereq_id} not found")
+                continue
+
+            prereq_records.append({
+                "topic_id": topic_uuid,
+                "prerequisite_topic_id": prereq_uuid,
+            })
+
+    if prereq_records:
+        try:
+            db.client.table("topic_prerequisites")\
+                .upsert(prereq_records, on_conflict="topic_id,prerequisite_topic_id")\
+                .execute()
+            print(f"[TOPIC STORE] Saved {len(prereq_records)} prerequisites")
+        except Exception as e:
+            print(f"[TOPIC STORE WARNING] Failed to save prerequisites: {e}")
@@ -0,0 +1,165 @@
+"""
+Header Detection
+Layout-aware heading detection from per-character font size and weight
+
+Each page's characters are reduced to per-line statistics with NumPy
+(median font size, fraction of bold characters). Across the scanned pages
+the font sizes are clustered: the size carrying the most text is the body
+size, and the largest recurring sizes above it become heading levels.
+Only lines set in a heading size (or bold, numbered lines at body size)
+are headings, so title-case body text, captions and running footers no
+longer turn into sections.
+"""
+
+import re
+from typing import List, Dict, NamedTuple, Tuple
+
+import numpy as np
+
+# Heading levels kept (largest sizes first)
+MAX_HEADING_LEVELS = 3
+
+# A heading size must exceed the body size by this much (points)
+MIN_SIZE_DELTA = 1.0
+
+# Sizes are compared at this resolution (points)
+SIZE_RESOLUTION = 0.5
+
+# A size must be used by this many lines to be a heading level (the book
+# title on the cover is set large exactly once)
+MIN_LEVEL_LINES = 2
+
+# Bold-character fraction for a line to count as bold
+BOLD_FRACTION = 0.8
+
+# Heading text length bounds
+MIN_HEADING_CHARS = 3
+MAX_HEADING_CHARS = 120
+
+# Wrapped heading lines: same level, this many line heights apart at most
+WRAP_GAP_LINES = 1.6
+
+_BOLD_FONT = re.compile(r'bold|black|heavy|semibold|demi', re.IGNORECASE)
+_NUMBERED = re.compile(r'^(?:(?i:chapter|section|part)\s+)?\d+(?:\.\d+)*[\.\:\s]')
+_LETTER = re.compile(r'[^\W\d_]')
+
+
+class LayoutLine(NamedTuple):
+    page: int
+    text: str
+    top: float
+    size: float
+    bold: bool
+    chars: int
+
+
+def page_lines(page, page_num: int) -> List[LayoutLine]:
+    """
+    Lines of a pdfplumber page with their font statistics
+
+    Args:
+        page: pdfplumber page
+        page_num: 1-based page number
+
+    Returns:
+        One LayoutLine per text line (median char size, bold flag)
+    """
+    lines = page.extract_text_lines(strip=True, return_chars=True)
+    lines = [line for line in lines if line['chars'] and line['text']]
+    if not lines:
+        return []
+
+    counts = np.array([len(line['chars']) for line in lines])
+    line_ids = np.repeat(np.arange(len(lines)), counts)
+    sizes = np.fromiter((c['size'] for line in lines for c in line['chars']), dtype=np.float64, count=counts.sum())
+    bold = np.fromiter(
+        (bool(_BOLD_FONT.search(c.get('fontname') or '')) for line in lines for c in line['chars']),
+        dtype=np.bool_,
+        count=counts.sum()
+    )
+
+    # Median size per line: sort by (line, size), pick each line's middle element
+    order = np.lexsort((sizes, line_ids))
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    median_sizes = sizes[order][starts + counts // 2]
+    bold_fraction = np.add.reduceat(bold.astype(np.float64), starts) / counts
+
+    return [
+        LayoutLine(
+            page=page_num,
+            text=line['text'],
+            top=float(line['top']),
+            size=float(np.round(median_sizes[i] / SIZE_RESOLUTION) * SIZE_RESOLUTION),
+            bold=bool(bold_fraction[i] >= BOLD_FRACTION),
+            chars=int(counts[i])
+        )
+        for i, line in enumerate(lines)
+    ]
+
+
+def heading_levels(lines: List[LayoutLine]) -> Tuple[float, Dict[float, int]]:
+    """
+    Cluster font sizes into body text and heading levels
+
+    Args:
+        lines: Lines from page_lines over the scanned pages
+
+    Returns:
+        (body size, {heading size: level}) with level 1 the largest size
+    """
+    if not lines:
+        return 0.0, {}
+
+    sizes = np.array([line.size for line in lines])
+    chars = np.array([line.chars for line in lines])
+
+    unique_sizes, inverse = np.unique(sizes, return_inverse=True)
+    chars_per_size = np.bincount(inverse, weights=chars)
+    lines_per_size = np.bincount(inverse)
+    body_size = float(unique_sizes[np.argmax(chars_per_size)])
+
+    candidates = (unique_sizes >= body_size + MIN_SIZE_DELTA) & (lines_per_size >= MIN_LEVEL_LINES)
+    heading_sizes = np.sort(unique_sizes[candidates])[::-1][:MAX_HEADING_LEVELS]
+
+    return body_size, {float(size): level for level, size in enumerate(heading_sizes, 1)}
+
+
+def find_headings(lines: List[LayoutLine]) -> List[Tuple[LayoutLine, int]]:
+    """
+    Heading lines and their levels, in reading order
+
+    Lines in a heading size get that size's level. Bold lines at body size
+    that start with a section number form one more level below those.
+    Consecutive lines of the same level close together (a wrapped title)
+    are merged.
+
+    Returns:
+        List of (line, level); empty if the pages have no font hierarchy
+    """
+    body_size, levels = heading_levels(lines)
+    bold_level = len(levels) + 1
+
+    headings: List[Tuple[LayoutLine, int]] = []
+    for line in lines:
+        level = levels.get(line.size)
+        if level is None and line.bold and line.size >= body_size and _NUMBERED.match(line.text):
+            level = bold_level
+        if level is None:
+            continue
+
+        text_length = len(line.text)
+        if not MIN_HEADING_CHARS <= text_length <= MAX_HEADING_CHARS or not _LETTER.search(line.text):
+            continue
+
+        if headings:
+            previous, previous_level = headings[-1]
+            gap = line.top - previous.top
+            if (previous_level == level and previous.page == line.page
+                    and 0 < gap <= line.size * WRAP_GAP_LINES
+                    and len(previous.text) + text_length <= MAX_HEADING_CHARS):
+                headings[-1] = (previous._replace(text=f"{previous.text} {line.text}", top=line.top), level)
+                continue
+
+        headings.append((line, level))
+
+    return headings
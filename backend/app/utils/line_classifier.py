@@ -0,0 +1,194 @@
+"""
+Line Classifier
+Labels lines of page text as ToC entry, header or body in one pass
+
+All patterns are compiled once. The three ToC entry patterns are folded
+into a single alternation searched at most once per line (lines without
+digits never reach it), with the original priority between patterns
+preserved, and keywords are only extracted for lines that get a ToC or
+header label.
+"""
+
+import re
+from typing import List, NamedTuple, Optional, Iterator
+
+TOC = "toc"
+HEADER = "header"
+BODY = "body"
+
+# Shortest line considered as a ToC entry / as a header
+MIN_TOC_LINE = 10
+MIN_HEADER_LINE = 5
+
+_TOC_PATTERNS = [
+    # "Chapter 1: Title .... 10" or "1. Title .... 10"
+    r'(?:Chapter\s+)?(\d+(?:\.\d+)*)[:\.\s]+([^\.]{3,}?)[\s\.]{2,}(\d+)',
+    # "1.1 Title    page 10" or "1.1 Title (10)"
+    r'(\d+\.\d+)\s+([^(\n]{3,}?)[\s\(]*(?:page\s+)?(\d+)',
+    # Simpler: "Chapter 1    10"
+    r'(?:Chapter\s+)?(\d+)\s+([^0-9\n]{5,}?)\s+(\d+)$',
+]
+
+# One search finds the leftmost position where any pattern matches. Every
+# entry starts with a digit or "Chapter"; the lookahead lets the search
+# skip other positions without trying the alternatives there.
+_TOC_ENTRY = re.compile(
+    "(?=[\\dc])(?:" + "|".join(f"(?P<toc{i}>{pattern})" for i, pattern in enumerate(_TOC_PATTERNS)) + ")",
+    re.IGNORECASE
+)
+_GROUPS_PER_PATTERN = 4
+_TOC_PATTERNS_COMPILED = [re.compile(pattern, re.IGNORECASE) for pattern in _TOC_PATTERNS]
+
+# "Chapter 3..." (any case) or "3.", "3.2 ", "Section 3:" at the start
+_NUMBERED_HEADER = re.compile(r'^(?:(?i:chapter)\s+\d+|(?:Section\s+)?\d+(?:\.\d+)*[\.\:\s])')
+
+_DIGIT = re.compile(r'\d')
+_TITLE_FILLER = re.compile(r'[\s\.]{3,}')
+_PUNCTUATION = re.compile(r'[^\w\s]')
+
+STOP_WORDS = frozenset({'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'})
+
+
+class TocEntry(NamedTuple):
+    section_number: str
+    title: str
+    page: int
+
+
+class LineLabel(NamedTuple):
+    line: str
+    kind: str
+    is_header: bool
+    toc: Optional[TocEntry]
+    keywords: List[str]
+
+
+def extract_keywords(title: str) -> List[str]:
+    """
+    Extract keywords from a section title
+
+    Simple approach: lowercase, split by spaces, remove short and stop words
+    """
+    words = _PUNCTUATION.sub(' ', title.lower()).split()
+    return [w for w in words if len(w) > 2 and w not in STOP_WORDS][:10]
+
+
+def match_toc_entry(line: str) -> Optional[TocEntry]:
+    """ToC entry in a stripped line, trying the patterns in priority order"""
+    if len(line) < MIN_TOC_LINE or not _DIGIT.search(line):
+        return None
+    match = _TOC_ENTRY.search(line)
+    return _resolve_toc(line, match) if match else None
+
+
+def _resolve_toc(line: str, match: re.Match) -> Optional[TocEntry]:
+    """
+    Turn a combined-pattern match into the entry the patterns' priority gives
+
+    Same result as searching each pattern in turn and taking the first
+    valid match: the combined search returns the leftmost match, so a
+    higher-priority pattern can then only match further right.
+    """
+    # The alternative's own group encloses (so closes after) its three groups
+    first = (match.lastindex - 1) // _GROUPS_PER_PATTERN
+    for index, pattern in enumerate(_TOC_PATTERNS_COMPILED[:first]):
+        earlier = pattern.search(line, match.start() + 1)
+        if earlier:
+            match, first = earlier, index
+            break
+
+    entry = _toc_entry(match, match.lastindex + 1 if match.re is _TOC_ENTRY else 1)
+    if entry:
+        return entry
+
+    # A match whose title cleans down to nothing falls through to the next pattern
+    for pattern in _TOC_PATTERNS_COMPILED[first + 1:]:
+        fallback = pattern.search(line)
+        if fallback:
+            entry = _toc_entry(fallback, 1)
+            if entry:
+                return entry
+    return None
+
+
+def _toc_entry(match: re.Match, first_group: int) -> Optional[TocEntry]:
+    """Section number, cleaned title and page from a ToC pattern match"""
+    section_number, title, page = match.group(first_group, first_group + 1, first_group + 2)
+
+    # Clean title (remove excessive dots/spaces)
+    title = _TITLE_FILLER.sub(' ', title.strip()).strip()
+    if len(title) > 2 and page.isdigit():
+        return TocEntry(section_number, title, int(page))
+    return None
+
+
+def is_likely_header(line: str) -> bool:
+    """
+    Heuristics to detect if a stripped line is likely a chapter/section header
+    """
+    length = len(line)
+
+    # All caps (but not too long)
+    if 5 < length < 60 and line.isupper():
+        return True
+
+    # "Chapter N", or a section number like "1.", "1.1", "Section 1"
+    if _NUMBERED_HEADER.match(line):
+        return True
+
+    # Short line with uppercase letters (likely title case)
+    return 10 < length < 80 and line.lower() != line
+
+
+def classify_lines(text: str, find_toc: bool = True) -> Iterator[LineLabel]:
+    """
+    Label every non-empty line of a page as ToC entry, header or body
+
+    A line can be both (a numbered ToC entry also looks like a header), so
+    is_header is reported separately; kind is the ToC label if there is one.
+    Keywords come from the ToC title, or the header line itself.
+
+    This is the hot loop of structure parsing, so the checks are inlined
+    (a digit check and at most one regex search per line for ToC entries,
+    one anchored match for headers).
+
+    Args:
+        text: Page text
+        find_toc: Also look for ToC entries (header scans skip it)
+    """
+    toc_search = _TOC_ENTRY.search
+    has_digit = _DIGIT.search
+    numbered_header = _NUMBERED_HEADER.match
+
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line:
+            continue
+        length = len(line)
+
+        toc = None
+        # Entries need a section number and a page, so lines without digits are skipped
+        if find_toc and length >= MIN_TOC_LINE and has_digit(line):
+            match = toc_search(line)
+            if match:
+                toc = _resolve_toc(line, match)
+
+        is_header = length >= MIN_HEADER_LINE and (
+            (5 < length < 60 and line.isupper())
+            or numbered_header(line) is not None
+            or (10 < length < 80 and line.lower() != line)
+        )
+
+        if toc:
+            yield LineLabel(line, TOC, is_header, toc, extract_keywords(toc.title))
+        elif is_header:
+            yield LineLabel(line, HEADER, True, None, extract_keywords(line))
+        else:
+            yield LineLabel(line, BODY, False, None, [])
+
+
+def classify_line(line: str, find_toc: bool = True) -> LineLabel:
+    """Label a single line (see classify_lines)"""
+    for label in classify_lines(line.replace('\n', ' '), find_toc):
+        return label
+    return LineLabel("", BODY, False, None, [])
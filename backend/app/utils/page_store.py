@@ -0,0 +1,108 @@
+"""
+Page Text Store
+Per-page compressed text in one file with an offset index, read via mmap
+
+Layout:
+    [page 1 zlib][page 2 zlib]...[page N zlib]
+    [N + 1 little-endian uint64 offsets]
+    [footer: magic, version, N]
+
+Any page range is two offset lookups and a decompress per page; the PDF
+is never touched again once the store exists.
+"""
+
+import mmap
+import os
+import struct
+import sys
+import zlib
+from array import array
+from pathlib import Path
+from typing import List, Optional
+
+_MAGIC = b"PGTX"
+_VERSION = 1
+_FOOTER = struct.Struct("<4sBI")
+
+
+class PageStoreWriter:
+    """Append pages in order, then close to write the index"""
+
+    def __init__(self, path: Path, level: int = 6):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._partial = self.path.with_name(self.path.name + ".part")
+        self._file = open(self._partial, "wb")
+        self._offsets = array("Q", [0])
+        self._level = level
+
+    def add(self, text: str) -> None:
+        """Append the next page's text"""
+        self._file.write(zlib.compress(text.encode("utf-8"), self._level))
+        self._offsets.append(self._file.tell())
+
+    def close(self) -> None:
+        """Write the offset index and footer, then move the store into place"""
+        if self._file.closed:
+            return
+        if array("Q").itemsize != 8 or sys.byteorder != "little":
+            raise RuntimeError("Page store requires 64-bit little-endian offsets")
+        self._offsets.tofile(self._file)
+        self._file.write(_FOOTER.pack(_MAGIC, _VERSION, len(self._offsets) - 1))
+        self._file.close()
+        os.replace(self._partial, self.path)
+
+    def abort(self) -> None:
+        """Discard a partially written store"""
+        if not self._file.closed:
+            self._file.close()
+        self._partial.unlink(missing_ok=True)
+
+    def __enter__(self) -> "PageStoreWriter":
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+class PageTextStore:
+    """Read-only, memory-mapped page text store"""
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, version, count = _FOOTER.unpack_from(self._mmap, len(self._mmap) - _FOOTER.size)
+        if magic != _MAGIC or version != _VERSION:
+            self._mmap.close()
+            raise ValueError(f"Not a page text store: {self.path}")
+
+        self.page_count = count
+        index_start = len(self._mmap) - _FOOTER.size - 8 * (count + 1)
+        self._offsets = memoryview(self._mmap)[index_start:index_start + 8 * (count + 1)].cast("Q")
+
+    def page(self, page_num: int) -> str:
+        """Text of one page (1-based)"""
+        if not 1 <= page_num <= self.page_count:
+            raise IndexError(f"Page {page_num} out of range 1-{self.page_count}")
+        start, end = self._offsets[page_num - 1], self._offsets[page_num]
+        return zlib.decompress(self._mmap[start:end]).decode("utf-8")
+
+    def pages(self, start: int, end: int) -> List[str]:
+        """Texts of pages start..end inclusive (1-based, clamped to the book)"""
+        start = max(start, 1)
+        end = min(end, self.page_count)
+        return [self.page(n) for n in range(start, end + 1)]
+
+    def text(self, start: Optional[int] = None, end: Optional[int] = None) -> str:
+        """Joined text of a page range (default: whole book), empty pages skipped"""
+        pages = self.pages(start or 1, end or self.page_count)
+        return "\n\n".join(text for text in pages if text)
+
+    def close(self) -> None:
+        self._offsets.release()
+        self._mmap.close()
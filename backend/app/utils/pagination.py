@@ -0,0 +1,55 @@
+"""
+Pagination Utilities
+Opaque keyset cursors for paging through large tables
+"""
+
+import base64
+import json
+from typing import Any, Dict, Optional
+
+
+def encode_cursor(values: Dict[str, Any]) -> str:
+    """
+    Encode the sort-key values of the last row on a page as an opaque cursor
+
+    Args:
+        values: Column -> value for every column in the keyset ordering
+
+    Returns:
+        URL-safe cursor string
+    """
+    raw = json.dumps(values, separators=(",", ":"), default=str).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Decode a cursor produced by encode_cursor
+
+    Args:
+        cursor: Cursor string from a previous page (or None for the first page)
+
+    Returns:
+        Column -> value dict, or None if no cursor was given
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    if not cursor:
+        return None
+
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {e}")
+
+    if not isinstance(values, dict):
+        raise ValueError("Invalid cursor: expected an object")
+
+    return values
+
+
+def escape_like(value: str) -> str:
+    """Escape LIKE wildcards so user input is matched literally as a prefix"""
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
@@ -3,14 +3,29 @@ PDF Utilities
 Functions for extracting text and structure from PDF files
 """
 
+from itertools import groupby
+from operator import attrgetter
 from pathlib import Path
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Tuple, Iterator, Any
 import re
 
+from app.utils.header_detection import LayoutLine, find_headings, page_lines
+from app.utils.line_classifier import TOC, classify_lines, extract_keywords as _extract_keywords
+
+
+# Pages per extraction shard handed to one worker process
+TEXT_SHARD_PAGES = 50
+
+# Pages loaded per pdfplumber document before iter_pdf_pages reopens it
+PAGE_WINDOW = 200
+
 
 def extract_text_from_pdf(pdf_path: str) -> str:
     """
-    Extract all text from a PDF file
+    Extract all text from a PDF file, in this process
+
+    Async callers should use pdf_pool.extract_pdf_text, which extracts
+    page-range shards in parallel on the shared PDF worker pool.
 
     Args:
         pdf_path: Path to PDF file
@@ -22,36 +37,114 @@ def extract_text_from_pdf(pdf_path: str) -> str:
         FileNotFoundError: If PDF doesn't exist
         Exception: If extraction fails
     """
+    try:
+        full_text = "\n\n".join(text for _, text in iter_page_texts(pdf_path) if text)
+    except (ImportError, FileNotFoundError):
+        raise
+    except Exception as e:
+        raise Exception(f"Failed to extract text from PDF: {e}")
+
+    print(f"[PDF] ✓ Extracted {len(full_text)} characters from PDF")
+
+    return full_text
+
+
+def iter_page_texts(pdf_path: str, shard_pages: int = TEXT_SHARD_PAGES) -> Iterator[Tuple[int, str]]:
+    """
+    Stream (page_number, text) pairs in page order, in this process
+
+    Pages are read one shard at a time, so memory stays bounded for very
+    long books. The page-parallel version is pdf_pool.iter_pdf_page_texts,
+    which runs the same shards on the shared (bounded) PDF worker pool.
+
+    Args:
+        pdf_path: Path to PDF file
+        shard_pages: Pages per shard
+
+    Yields:
+        (1-based page number, page text or "")
+    """
+    total_pages = get_page_count(pdf_path)
+    shards = page_ranges(total_pages, shard_pages)
+
+    print(f"[PDF] Extracting text from {total_pages} pages ({len(shards)} shard(s))...")
+
+    for start, end in shards:
+        for offset, text in enumerate(extract_page_range_text(pdf_path, start, end)):
+            yield start + offset + 1, text
+
+
+def extract_page_range_text(pdf_path: str, start: int, end: int) -> List[str]:
+    """
+    Extract the text of pages [start, end) (0-based), opening the PDF here
+
+    Runs inside worker processes, so it must stay a module-level function.
+    """
+    return [page.extract_text() or "" for _, page in iter_pdf_pages(pdf_path, start, end)]
+
+
+def iter_pdf_pages(
+    pdf_path: str,
+    start: int = 0,
+    end: Optional[int] = None,
+    window_pages: int = PAGE_WINDOW
+) -> Iterator[Tuple[int, Any]]:
+    """
+    Stream pdfplumber pages [start, end) (0-based) with bounded memory
+
+    pdfplumber keeps every page's parsed objects (chars, layout) cached on
+    the page, and pdfminer keeps parsed PDF objects on the document, so a
+    scan holding one PDF open grows RSS with every page read. Here each
+    page's caches are released as soon as the caller moves on, and the
+    document is reopened (loading only the next window of pages) every
+    window_pages pages. Callers must not keep page objects between
+    iterations.
+
+    Args:
+        pdf_path: Path to PDF file
+        start: First page (0-based)
+        end: Stop before this page (default: last page)
+        window_pages: Pages per opened document
+
+    Yields:
+        (1-based page number, pdfplumber page)
+    """
     try:
         import pdfplumber
     except ImportError:
         raise ImportError("pdfplumber not installed. Run: pip install pdfplumber")
 
-    pdf_file = Path(pdf_path)
-    if not pdf_file.exists():
-        raise FileNotFoundError(f"PDF not found: {pdf_path}")
+    if end is None:
+        end = get_page_count(pdf_path)
 
-    text_parts = []
+    for window_start in range(start, end, window_pages):
+        window_end = min(window_start + window_pages, end)
+        with pdfplumber.open(pdf_path, pages=list(range(window_start + 1, window_end + 1))) as pdf:
+            for offset, page in enumerate(pdf.pages):
+                try:
+                    yield window_start + offset + 1, page
+                finally:
+                    # Drop parsed layout objects as we go
+                    page.close()
 
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            print(f"[PDF] Extracting text from {len(pdf.pages)} pages...")
 
-            for page_num, page in enumerate(pdf.pages, 1):
-                text = page.extract_text()
-                if text:
-                    text_parts.append(text)
+def page_ranges(total_pages: int, shard_pages: int = TEXT_SHARD_PAGES) -> List[Tuple[int, int]]:
+    """Split [0, total_pages) into consecutive (start, end) shards"""
+    return [(start, min(start + shard_pages, total_pages)) for start in range(0, total_pages, shard_pages)]
 
-                if page_num % 50 == 0:
-                    print(f"[PDF] Processed {page_num}/{len(pdf.pages)} pages...")
 
-    except Exception as e:
-        raise Exception(f"Failed to extract text from PDF: {e}")
+def get_page_count(pdf_path: str) -> int:
+    """Number of pages in a PDF"""
+    try:
+        import pdfplumber
+    except ImportError:
+        raise ImportError("pdfplumber not installed. Run: pip install pdfplumber")
 
-    full_text = "\n\n".join(text_parts)
-    print(f"[PDF] ✓ Extracted {len(full_text)} characters from PDF")
+    if not Path(pdf_path).exists():
+        raise FileNotFoundError(f"PDF not found: {pdf_path}")
 
-    return full_text
+    with pdfplumber.open(pdf_path) as pdf:
+        return len(pdf.pages)
 
 
 def parse_textbook_structure(pdf_path: str, max_pages_to_scan: int = 50) -> Dict:
@@ -59,9 +152,10 @@ def parse_textbook_structure(pdf_path: str, max_pages_to_scan: int = 50) -> Dict
     Parse textbook structure by extracting headers from pages
 
     Strategy:
-    1. Look for ToC (Table of Contents) in first 20 pages
-    2. If found, parse ToC for chapter/section structure
-    3. If not found, scan pages for large text (headers)
+    1. Use the embedded PDF outline (bookmarks) if there is one
+    2. Otherwise look for ToC (Table of Contents) in first 20 pages
+    3. If found, parse ToC for chapter/section structure
+    4. If not found, scan pages for large text (headers)
 
     Args:
         pdf_path: Path to textbook PDF
@@ -70,11 +164,6 @@ def parse_textbook_structure(pdf_path: str, max_pages_to_scan: int = 50) -> Dict
     Returns:
         Dict with textbook structure
     """
-    try:
-        import pdfplumber
-    except ImportError:
-        raise ImportError("pdfplumber not installed. Run: pip install pdfplumber")
-
     pdf_file = Path(pdf_path)
     if not pdf_file.exists():
         raise FileNotFoundError(f"PDF not found: {pdf_path}")
@@ -82,40 +171,144 @@ def parse_textbook_structure(pdf_path: str, max_pages_to_scan: int = 50) -> Dict
     print(f"\n[TEXTBOOK PARSER] Analyzing textbook structure...")
     print(f"[TEXTBOOK PARSER] File: {pdf_file.name}")
 
+    # Fast path: the PDF's own bookmarks, no text extraction needed
+    outline = _extract_outline(pdf_path)
+    if outline:
+        sections, total_pages = outline
+        print(f"[TEXTBOOK PARSER] ✓ Found embedded outline with {len(sections)} entries")
+        return {
+            'title': pdf_file.stem,
+            'total_pages': total_pages,
+            'parsing_method': 'outline',
+            'sections': sections
+        }
+
     try:
-        with pdfplumber.open(pdf_path) as pdf:
-            total_pages = len(pdf.pages)
-            print(f"[TEXTBOOK PARSER] Total pages: {total_pages}")
-
-            # Try to find and parse ToC first
-            toc_data = _extract_toc(pdf)
-
-            if toc_data:
-                print(f"[TEXTBOOK PARSER] ✓ Found Table of Contents with {len(toc_data)} entries")
-                return {
-                    'title': pdf_file.stem,
-                    'total_pages': total_pages,
-                    'parsing_method': 'toc',
-                    'sections': toc_data
-                }
-
-            # Fallback: Scan pages for headers
-            print(f"[TEXTBOOK PARSER] ToC not found, scanning pages for headers...")
-            header_data = _scan_for_headers(pdf, max_pages_to_scan)
-
-            print(f"[TEXTBOOK PARSER] ✓ Found {len(header_data)} sections via header scanning")
+        total_pages = get_page_count(pdf_path)
+        print(f"[TEXTBOOK PARSER] Total pages: {total_pages}")
+
+        # Try to find and parse ToC first
+        toc_data = _extract_toc(pdf_path, total_pages)
+
+        if toc_data:
+            print(f"[TEXTBOOK PARSER] ✓ Found Table of Contents with {len(toc_data)} entries")
             return {
                 'title': pdf_file.stem,
                 'total_pages': total_pages,
-                'parsing_method': 'headers',
-                'sections': header_data
+                'parsing_method': 'toc',
+                'sections': toc_data
             }
 
+        # Fallback: Scan pages for headers
+        print(f"[TEXTBOOK PARSER] ToC not found, scanning pages for headers...")
+        header_data = _scan_for_headers(pdf_path, max_pages_to_scan, total_pages)
+
+        print(f"[TEXTBOOK PARSER] ✓ Found {len(header_data)} sections via header scanning")
+        return {
+            'title': pdf_file.stem,
+            'total_pages': total_pages,
+            'parsing_method': 'headers',
+            'sections': header_data
+        }
+
     except Exception as e:
         raise Exception(f"Failed to parse textbook structure: {e}")
 
 
-def _extract_toc(pdf) -> Optional[List[Dict]]:
+def _extract_outline(pdf_path: str, min_entries: int = 3) -> Optional[Tuple[List[Dict], int]]:
+    """
+    Build the section list from the PDF outline (bookmarks) with pypdf
+
+    Page numbers are exact 1-based page indexes; the printed page label
+    (e.g. "xii" or "47") is kept alongside. A section ends where the next
+    entry at the same or a higher level starts.
+
+    Returns:
+        (sections, total_pages), or None if the PDF has no usable outline
+    """
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        return None
+
+    try:
+        reader = PdfReader(pdf_path)
+        outline = reader.outline
+    except Exception as e:
+        print(f"[TEXTBOOK PARSER] Could not read outline: {e}")
+        return None
+
+    if not outline:
+        return None
+
+    total_pages = len(reader.pages)
+    try:
+        page_labels = reader.page_labels
+    except Exception:
+        page_labels = []
+
+    entries = []
+
+    def walk(items, level: int, prefix: str):
+        position = 0
+        for item in items:
+            if isinstance(item, list):
+                # Children of the preceding entry
+                if entries:
+                    walk(item, level + 1, entries[-1]['section_number'])
+                continue
+
+            try:
+                page_index = reader.get_destination_page_number(item)
+            except Exception:
+                page_index = None
+            title = (item.title or '').strip()
+            if page_index is None or page_index < 0 or not title:
+                continue
+
+            position += 1
+            number_match = _SECTION_NUMBER.match(title)
+            if number_match:
+                section_number = number_match.group(1)
+            else:
+                section_number = f"{prefix}.{position}" if prefix else str(position)
+
+            entries.append({
+                'section_number': section_number,
+                'title': title[:100],
+                'page_start': page_index + 1,
+                'page_end': None,
+                'page_label': page_labels[page_index] if page_index < len(page_labels) else str(page_index + 1),
+                'level': level,
+                'keywords': _extract_keywords(title)
+            })
+
+    walk(outline, 1, '')
+
+    if len(entries) < min_entries:
+        return None
+
+    _close_sections(entries, total_pages)
+    return entries, total_pages
+
+
+def _close_sections(entries: List[Dict], last_page: int) -> None:
+    """End each entry where the next entry at the same or a higher level starts"""
+    open_entries: List[Dict] = []
+    for entry in entries:
+        while open_entries and open_entries[-1]['level'] >= entry['level']:
+            closed = open_entries.pop()
+            closed['page_end'] = max(closed['page_start'], entry['page_start'] - 1)
+        open_entries.append(entry)
+    for entry in open_entries:
+        entry['page_end'] = max(entry['page_start'], last_page)
+
+
+# "Chapter 3", "3.2", "Section 4.1.2" at the start of an outline title
+_SECTION_NUMBER = re.compile(r'^(?:Chapter|Section|Part)?\s*(\d+(?:\.\d+)*)\b', re.IGNORECASE)
+
+
+def _extract_toc(pdf_path: str, total_pages: int) -> Optional[List[Dict]]:
     """
     Try to extract Table of Contents from first 20 pages
 
@@ -132,7 +325,7 @@ def _extract_toc(pdf) -> Optional[List[Dict]]:
     toc_keywords = ['table of contents', 'contents', 'overview']
 
     # Scan first 20 pages
-    for page_num, page in enumerate(pdf.pages[:20], 1):
+    for page_num, page in iter_pdf_pages(pdf_path, 0, min(20, total_pages)):
         text = page.extract_text()
         if not text:
             continue
@@ -173,47 +366,19 @@ def _parse_toc_text(text: str, page_num: int) -> List[Dict]:
     """
     entries = []
 
-    # Pattern: Captures section number, title, and page
-    patterns = [
-        # "Chapter 1: Title .... 10" or "1. Title .... 10"
-        r'(?:Chapter\s+)?(\d+(?:\.\d+)*)[:\.\s]+([^\.]{3,}?)[\s\.]{2,}(\d+)',
-        # "1.1 Title    page 10" or "1.1 Title (10)"
-        r'(\d+\.\d+)\s+([^(\n]{3,}?)[\s\(]*(?:page\s+)?(\d+)',
-        # Simpler: "Chapter 1    10"
-        r'(?:Chapter\s+)?(\d+)\s+([^0-9\n]{5,}?)\s+(\d+)$',
-    ]
-
-    lines = text.split('\n')
-
-    for line in lines:
-        line = line.strip()
-        if not line or len(line) < 10:
+    for label in classify_lines(text):
+        if label.kind != TOC:
             continue
 
-        for pattern in patterns:
-            match = re.search(pattern, line, re.IGNORECASE)
-            if match:
-                section_number = match.group(1)
-                title = match.group(2).strip()
-                page = match.group(3)
-
-                # Clean title (remove excessive dots/spaces)
-                title = re.sub(r'[\s\.]{3,}', ' ', title).strip()
-
-                # Validate
-                if len(title) > 2 and page.isdigit():
-                    # Determine level (0=book, 1=chapter, 2=section, etc.)
-                    level = section_number.count('.') + 1
-
-                    entries.append({
-                        'section_number': section_number,
-                        'title': title,
-                        'page_start': int(page),
-                        'page_end': None,  # Will be filled later
-                        'level': level,
-                        'keywords': _extract_keywords(title)
-                    })
-                    break
+        # Determine level (0=book, 1=chapter, 2=section, etc.)
+        entries.append({
+            'section_number': label.toc.section_number,
+            'title': label.toc.title,
+            'page_start': label.toc.page,
+            'page_end': None,  # Will be filled later
+            'level': label.toc.section_number.count('.') + 1,
+            'keywords': label.keywords
+        })
 
     # Fill in page_end values
     for i in range(len(entries) - 1):
@@ -226,108 +391,74 @@ def _parse_toc_text(text: str, page_num: int) -> List[Dict]:
     return entries
 
 
-def _scan_for_headers(pdf, max_pages: int) -> List[Dict]:
+def _scan_for_headers(pdf_path: str, max_pages: int, total_pages: int) -> List[Dict]:
     """
     Scan pages for headers by detecting large/bold text
 
-    Fallback when ToC is not available
+    Fallback when ToC is not available. Font sizes are clustered across the
+    scanned pages (see header_detection): the sizes above the body text
+    become heading levels, and each heading opens a section nested under
+    the last heading of a higher level. PDFs without a font hierarchy
+    (uniform size, scanned text layers) fall back to the text heuristics.
     """
     print(f"[TEXTBOOK PARSER] Scanning first {max_pages} pages for headers...")
 
-    sections = []
-    current_section = None
-    section_counter = 1
+    pages_to_scan = min(max_pages, total_pages)
 
-    pages_to_scan = min(max_pages, len(pdf.pages))
+    lines = []
+    for page_num, page in iter_pdf_pages(pdf_path, 0, pages_to_scan):
+        lines.extend(page_lines(page, page_num))
 
-    for page_num, page in enumerate(pdf.pages[:pages_to_scan], 1):
-        # Extract text with layout info
-        text = page.extract_text()
-        if not text:
-            continue
+    headings = find_headings(lines)
+    if not headings:
+        print("[TEXTBOOK PARSER] No font hierarchy found, using text heuristics")
+        return _scan_text_for_headers(lines, pages_to_scan)
 
-        # Look for chapter/section patterns
-        lines = text.split('\n')
+    sections = []
+    counters: List[int] = []
+    for line, level in headings:
+        # Hierarchical number for titles that don't carry one ("Preface", "Limits")
+        del counters[level:]
+        counters.extend([0] * (level - len(counters)))
+        counters[level - 1] += 1
+
+        number_match = _SECTION_NUMBER.match(line.text)
+        sections.append({
+            'section_number': number_match.group(1) if number_match else '.'.join(map(str, counters)),
+            'title': line.text[:100],
+            'page_start': line.page,
+            'page_end': None,
+            'level': level,
+            'keywords': _extract_keywords(line.text)
+        })
+
+    _close_sections(sections, pages_to_scan)
+    return sections
 
-        for line in lines:
-            line = line.strip()
 
-            # Skip short lines
-            if len(line) < 5:
+def _scan_text_for_headers(lines: List[LayoutLine], pages_to_scan: int) -> List[Dict]:
+    """Header scan from line text alone (caps, numbering, title case)"""
+    sections = []
+    for page_num, page_group in groupby(lines, key=attrgetter('page')):
+        text = '\n'.join(line.text for line in page_group)
+        for label in classify_lines(text, find_toc=False):
+            # Body text (and lines too short to be headers)
+            if not label.is_header:
                 continue
 
-            # Check if line looks like a header
-            is_header = _is_likely_header(line)
-
-            if is_header:
-                # Save previous section
-                if current_section:
-                    current_section['page_end'] = page_num - 1
-                    sections.append(current_section)
-
-                # Start new section
-                current_section = {
-                    'section_number': str(section_counter),
-                    'title': line[:100],  # Limit title length
-                    'page_start': page_num,
-                    'page_end': None,
-                    'level': 1,  # Assume chapter level
-                    'keywords': _extract_keywords(line)
-                }
-                section_counter += 1
-
-    # Save last section
-    if current_section:
-        current_section['page_end'] = pages_to_scan
-        sections.append(current_section)
+            sections.append({
+                'section_number': str(len(sections) + 1),
+                'title': label.line[:100],  # Limit title length
+                'page_start': page_num,
+                'page_end': None,
+                'level': 1,  # Assume chapter level
+                'keywords': label.keywords
+            })
 
+    _close_sections(sections, pages_to_scan)
     return sections
 
 
-def _is_likely_header(line: str) -> bool:
-    """
-    Heuristics to detect if a line is likely a chapter/section header
-    """
-    # All caps (but not too long)
-    if line.isupper() and 5 < len(line) < 60:
-        return True
-
-    # Starts with "Chapter"
-    if re.match(r'^Chapter\s+\d+', line, re.IGNORECASE):
-        return True
-
-    # Starts with section number like "1.", "1.1", "Section 1"
-    if re.match(r'^(?:Section\s+)?\d+(?:\.\d+)*[\.\:\s]', line):
-        return True
-
-    # Short line that's not all lowercase (likely title case)
-    if 10 < len(line) < 80 and not line.islower():
-        # Check if it looks like a title (has uppercase letters)
-        if any(c.isupper() for c in line):
-            return True
-
-    return False
-
-
-def _extract_keywords(title: str) -> List[str]:
-    """
-    Extract keywords from a section title
-
-    Simple approach: lowercase, split by spaces, remove short words
-    """
-    # Lowercase and clean
-    clean_title = re.sub(r'[^\w\s]', ' ', title.lower())
-
-    # Split and filter
-    words = clean_title.split()
-
-    # Remove common stop words and short words
-    stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
-    keywords = [w for w in words if len(w) > 2 and w not in stop_words]
-
-    return keywords[:10]  # Limit to 10 keywords
-
-
 def get_pdf_metadata(pdf_path: str) -> Dict:
     """
     Extract metadata from PDF
@@ -92,22 +92,123 @@ SYLLABUS:
 {syllabus_text[:4000]}"""
 
 
+def topic_candidates_prompt(
+    chunk_text: str,
+    part: int,
+    parts: int,
+    course_level: Optional[str] = None,
+    max_candidates: int = 10
+) -> str:
+    """
+    Map step of chunked topic extraction: candidate prerequisites in one part
+
+    Args:
+        chunk_text: One part of the syllabus or textbook outline
+        part: 1-based part number
+        parts: Total number of parts
+        course_level: Educational level (hs, ug, grad)
+        max_candidates: Most candidates to return for this part
+
+    Returns:
+        Formatted prompt string for LLM
+    """
+    level_context = f"Course level: {course_level.upper()} (high school/undergraduate/graduate). " if course_level else ""
+
+    return f"""You are reading part {part} of {parts} of a course syllabus or textbook outline to identify PREREQUISITE knowledge that students must have BEFORE taking this course.
+
+{level_context}
+
+Your task: List up to {max_candidates} specific prerequisite topics that this part of the course assumes students already know.
+
+RULES:
+1. Only prerequisites (prior knowledge required) - NOT topics taught in the course
+2. Use an explicit "Prerequisites:" section if this part has one
+3. Infer foundational skills the content relies on (e.g., content using derivatives needs calculus)
+4. Use specific, testable skill names (not vague like "math basics")
+5. If this part implies no prerequisites, return an empty array
+
+Return ONLY a JSON array with this EXACT structure:
+[
+  {{"name": "Linear equations and inequalities", "weight": 1.0}},
+  {{"name": "Derivatives and differentiation", "weight": 2.0}}
+]
+
+"weight": Importance 0.8-2.0 (higher = more critical for success)
+
+Output ONLY the JSON array. No markdown, no explanations, no extra text.
+
+PART {part} OF {parts}:
+{chunk_text}"""
+
+
+def topic_merge_prompt(
+    candidates: List[str],
+    course_level: Optional[str] = None
+) -> str:
+    """
+    Reduce step of chunked topic extraction: pick, order and link prerequisites
+
+    Args:
+        candidates: Deduplicated candidate topic names, most frequent first
+        course_level: Educational level (hs, ug, grad)
+
+    Returns:
+        Formatted prompt string for LLM
+    """
+    level_context = f"Course level: {course_level.upper()} (high school/undergraduate/graduate). " if course_level else ""
+    candidate_lines = "\n".join(f"- {name}" for name in candidates)
+
+    return f"""These candidate PREREQUISITE topics were extracted from different parts of one course's syllabus or textbook outline (most frequently mentioned first).
+
+{level_context}
+
+Your task: Produce the final list of 6-12 prerequisite topics for the course.
+
+RULES:
+1. Choose from the candidates; merge near-duplicates into one topic
+2. Order topics from most fundamental to most advanced
+3. Link each topic to the topics that must be learned first
+
+Return ONLY a JSON array with this EXACT structure:
+[
+  {{"id": "t_001", "name": "Linear equations and inequalities", "weight": 1.0, "prereqs": []}},
+  {{"id": "t_002", "name": "Quadratic equations and graphing", "weight": 1.2, "prereqs": ["t_001"]}}
+]
+
+Field requirements:
+- "id": Sequential like "t_001", "t_002", etc.
+- "weight": Importance 0.8-2.0 (higher = more critical for success)
+- "prereqs": Array of earlier topic IDs (can be empty for foundational topics)
+
+Output ONLY the JSON array. No markdown, no explanations, no extra text.
+
+CANDIDATES:
+{candidate_lines}"""
+
+
 def question_generation_prompt(
     topic: str,
     count: int,
     course_level: Optional[str] = None,
     difficulty: Optional[str] = None,
     context: Optional[str] = None,
+    source_text: Optional[str] = None,
 ) -> str:
     """
     Prompt for generating self-assessment survey items for a topic.
+
+    source_text: optional textbook excerpts to ground the items in.
     """
     level_context = f"Audience: {course_level}. " if course_level else ""
     context_note = f"\nContext: {context}\n" if context else ""
+    source_note = (
+        f"\nTextbook excerpts for this topic (base the items on the skills covered here):\n\"\"\"\n{source_text}\n\"\"\"\n"
+        if source_text else ""
+    )
 
     return f"""Create {count} brief self-assessment survey items for the topic "{topic}".
 
-{level_context}{context_note}
+{level_context}{context_note}{source_note}
 
 Each item should be phrased as a learner-facing statement beginning with "I can...", "I know how to...", or "I understand...".
 Focus on concrete skills for this topic. Avoid generic phrasing.
@@ -0,0 +1,207 @@
+"""
+Section Index
+BM25 inverted index over textbook sections (titles + page text) with light stemming
+"""
+
+import hashlib
+import heapq
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+from typing import List, Dict, Optional, Callable, Tuple
+
+from app.utils.textbook_structure import Section
+
+# Title terms count this many times (titles are short but decisive)
+TITLE_WEIGHT = 3
+
+# BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+INDEX_VERSION = 2
+
+_WORD = re.compile(r"[a-z0-9]+")
+
+STOP_WORDS = {
+    'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by',
+    'is', 'are', 'was', 'be', 'as', 'from', 'that', 'this', 'it', 'its', 'into', 'we', 'you',
+}
+
+# Derivational suffixes, longest first: (suffix, replacement, minimum stem length)
+_SUFFIXES = [
+    ('ational', 'ate', 3), ('ization', 'ize', 3), ('fulness', 'ful', 3), ('iveness', 'ive', 3),
+    ('ation', 'ate', 3), ('ities', 'ity', 3), ('ment', '', 4), ('ness', '', 3),
+    ('ing', '', 3), ('ied', 'y', 2), ('ed', '', 3), ('ly', '', 3),
+]
+
+
+def stem(word: str) -> str:
+    """
+    Light suffix-stripping stemmer
+
+    Plurals, then one derivational suffix, then a trailing "e", so that
+    "derivative"/"derivatives" and "integrate"/"integrating"/"integration"
+    share a stem.
+    """
+    if len(word) <= 3 or word.isdigit():
+        return word
+
+    # Plurals
+    if word.endswith('sses'):
+        word = word[:-2]
+    elif word.endswith('ies') and len(word) > 4:
+        word = word[:-3] + 'y'
+    elif word.endswith(('ches', 'shes', 'xes', 'zes')):
+        word = word[:-2]
+    elif word.endswith('s') and not word.endswith(('ss', 'us', 'is')):
+        word = word[:-1]
+
+    for suffix, replacement, min_stem in _SUFFIXES:
+        if word.endswith(suffix) and len(word) - len(suffix) >= min_stem:
+            word = word[:-len(suffix)] + replacement
+            break
+
+    if word.endswith('e') and len(word) > 4:
+        word = word[:-1]
+    return word
+
+
+def section_fingerprint(sections: List[Section], with_text: bool) -> str:
+    """
+    Digest of what an index was built from
+
+    Section titles and page ranges (in order), and whether page text was
+    indexed, so a cached index is rebuilt when the structure is re-parsed
+    or the page store becomes available.
+    """
+    digest = hashlib.sha256(b"text" if with_text else b"titles")
+    for section in sections:
+        digest.update(f"\0{section.title}\0{section.page_start}\0{section.page_end}".encode("utf-8"))
+    return digest.hexdigest()
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase, split, drop stop words and stem"""
+    return [stem(w) for w in _WORD.findall(text.lower()) if w not in STOP_WORDS and len(w) > 1]
+
+
+class SectionIndex:
+    """Inverted index: term -> [(section index, weighted term frequency)]"""
+
+    def __init__(self):
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}
+        self.doc_lengths: List[int] = []
+        self.avg_length = 0.0
+        self.fingerprint = ""
+        self._norms: List[float] = []
+
+    @classmethod
+    def build(
+        cls,
+        sections: List[Section],
+        section_text: Optional[Callable[[Section], str]] = None
+    ) -> "SectionIndex":
+        """
+        Index sections by title (weighted) and optionally their page text
+
+        Args:
+            sections: Textbook sections (TextbookStructure.sections)
+            section_text: Optional callable returning a section's body text
+
+        Returns:
+            Built index
+        """
+        index = cls()
+        index.fingerprint = section_fingerprint(sections, section_text is not None)
+        postings: Dict[str, List[Tuple[int, int]]] = {}
+
+        for doc_id, section in enumerate(sections):
+            counts = Counter()
+            for term in tokenize(section.title):
+                counts[term] += TITLE_WEIGHT
+            if section_text:
+                counts.update(tokenize(section_text(section)))
+
+            index.doc_lengths.append(sum(counts.values()))
+            for term, tf in counts.items():
+                postings.setdefault(term, []).append((doc_id, tf))
+
+        index.postings = postings
+        index._prepare()
+        return index
+
+    def search(self, query: str, top_k: int = 10) -> List[Tuple[int, float, int]]:
+        """
+        BM25 top-k sections for a query
+
+        Args:
+            query: Free text (topic name, keywords)
+            top_k: Number of results
+
+        Returns:
+            List of (section index, score, number of distinct query terms matched), best first
+        """
+        terms = set(tokenize(query))
+        n = len(self.doc_lengths)
+        if not terms or not n:
+            return []
+
+        scores: Dict[int, float] = {}
+        matched: Counter = Counter()
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (n - len(postings) + 0.5) / (len(postings) + 0.5))
+            norms = self._norms
+            for doc_id, tf in postings:
+                scores[doc_id] = scores.get(doc_id, 0.0) + idf * tf * (BM25_K1 + 1) / (tf + norms[doc_id])
+                matched[doc_id] += 1
+
+        best = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], -item[0]))
+        return [(doc_id, score, matched[doc_id]) for doc_id, score in best]
+
+    def query_terms(self, query: str) -> int:
+        """Number of distinct indexable terms in a query"""
+        return len(set(tokenize(query)))
+
+    def save(self, path: Path) -> None:
+        """Persist as JSON next to the structure cache"""
+        data = {
+            'version': INDEX_VERSION,
+            'fingerprint': self.fingerprint,
+            'doc_lengths': self.doc_lengths,
+            'postings': self.postings,
+        }
+        with open(path, 'w') as f:
+            json.dump(data, f, separators=(',', ':'))
+
+    @classmethod
+    def load(cls, path: Path) -> Optional["SectionIndex"]:
+        """Load a persisted index (None if missing or from another version)"""
+        try:
+            with open(path, 'r') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return None
+
+        if data.get('version') != INDEX_VERSION:
+            return None
+
+        index = cls()
+        index.fingerprint = data.get('fingerprint', '')
+        index.doc_lengths = data['doc_lengths']
+        index.postings = {term: [tuple(p) for p in postings] for term, postings in data['postings'].items()}
+        index._prepare()
+        return index
+
+    def _prepare(self) -> None:
+        """Precompute each section's BM25 length normalization"""
+        self.avg_length = (sum(self.doc_lengths) / len(self.doc_lengths)) if self.doc_lengths else 0.0
+        self._norms = [
+            BM25_K1 * (1 - BM25_B + BM25_B * length / (self.avg_length or 1))
+            for length in self.doc_lengths
+        ]
@@ -0,0 +1,185 @@
+"""
+T-Digest
+Mergeable streaming quantile sketch with a compact binary encoding
+"""
+
+import base64
+import math
+import struct
+from typing import List, Optional, Iterable
+
+# Encoding: version, compression, centroid count, total weight, min, max,
+# then the centroid means and weights as float32 arrays
+_HEADER = struct.Struct("<BHIddd")
+_VERSION = 1
+
+
+class TDigest:
+    """
+    Merging t-digest (Dunning & Ertl) using the k1 (arcsine) scale function
+
+    Keeps at most ~compression centroids regardless of how many values are
+    added. Accuracy is best in the tails, which is where p10/p90 live.
+    """
+
+    __slots__ = ("compression", "means", "weights", "total", "min", "max", "_buffer")
+
+    def __init__(self, compression: int = 100):
+        self.compression = compression
+        self.means: List[float] = []
+        self.weights: List[float] = []
+        self.total = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+        self._buffer: List[tuple] = []
+
+    def add(self, value: float, weight: float = 1.0) -> None:
+        """Add one observation"""
+        value = float(value)
+        self._buffer.append((value, weight))
+        self.total += weight
+        self.min = min(self.min, value)
+        self.max = max(self.max, value)
+        if len(self._buffer) >= self.compression * 5:
+            self._compress()
+
+    def merge(self, other: "TDigest") -> "TDigest":
+        """Fold another digest into this one (in place) and return self"""
+        other._compress()
+        self._buffer.extend(zip(other.means, other.weights))
+        self.total += other.total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+        self._compress()
+        return self
+
+    def quantile(self, q: float) -> Optional[float]:
+        """
+        Estimate the q-th quantile (0 <= q <= 1)
+
+        Returns:
+            Estimated value, or None if the digest is empty
+        """
+        self._compress()
+        if not self.means:
+            return None
+        if q <= 0:
+            return self.min
+        if q >= 1:
+            return self.max
+        if len(self.means) == 1:
+            return self.means[0]
+
+        target = q * self.total
+
+        # Left tail: between the minimum and the first centroid's center
+        first_half = self.weights[0] / 2
+        if target < first_half:
+            return self.min + (self.means[0] - self.min) * (target / first_half)
+
+        cumulative = 0.0
+        for i in range(len(self.means) - 1):
+            center = cumulative + self.weights[i] / 2
+            next_center = cumulative + self.weights[i] + self.weights[i + 1] / 2
+            if target < next_center:
+                fraction = (target - center) / (next_center - center)
+                return self.means[i] + (self.means[i + 1] - self.means[i]) * fraction
+            cumulative += self.weights[i]
+
+        # Right tail: between the last centroid's center and the maximum
+        last_half = self.weights[-1] / 2
+        fraction = (target - (self.total - last_half)) / last_half
+        return self.means[-1] + (self.max - self.means[-1]) * min(max(fraction, 0.0), 1.0)
+
+    def mean(self) -> Optional[float]:
+        """Mean of all added values, or None if the digest is empty"""
+        self._compress()
+        if not self.total:
+            return None
+        return sum(m * w for m, w in zip(self.means, self.weights)) / self.total
+
+    def to_bytes(self) -> bytes:
+        """Serialize to a compact binary blob"""
+        self._compress()
+        count = len(self.means)
+        return (
+            _HEADER.pack(_VERSION, self.compression, count, self.total,
+                         self.min if count else 0.0, self.max if count else 0.0)
+            + struct.pack(f"<{count}f", *self.means)
+            + struct.pack(f"<{count}f", *self.weights)
+        )
+
+    @classmethod
+    def from_bytes(cls, blob: bytes) -> "TDigest":
+        """Deserialize a blob produced by to_bytes"""
+        version, compression, count, total, minimum, maximum = _HEADER.unpack_from(blob)
+        if version != _VERSION:
+            raise ValueError(f"Unsupported t-digest version: {version}")
+
+        offset = _HEADER.size
+        digest = cls(compression)
+        digest.means = list(struct.unpack_from(f"<{count}f", blob, offset))
+        digest.weights = list(struct.unpack_from(f"<{count}f", blob, offset + 4 * count))
+        digest.total = total
+        if count:
+            digest.min, digest.max = minimum, maximum
+        return digest
+
+    def to_base64(self) -> str:
+        """Serialize for storage in a text column"""
+        return base64.b64encode(self.to_bytes()).decode()
+
+    @classmethod
+    def from_base64(cls, encoded: Optional[str], compression: int = 100) -> "TDigest":
+        """Deserialize from to_base64 output (empty digest for None)"""
+        if not encoded:
+            return cls(compression)
+        return cls.from_bytes(base64.b64decode(encoded))
+
+    @classmethod
+    def merge_all(cls, digests: Iterable["TDigest"], compression: int = 100) -> "TDigest":
+        """Merge many digests into a new one"""
+        merged = cls(compression)
+        for digest in digests:
+            merged.merge(digest)
+        return merged
+
+    def _compress(self) -> None:
+        """Merge buffered points into the centroid list"""
+        if not self._buffer:
+            return
+
+        points = sorted(list(zip(self.means, self.weights)) + self._buffer)
+        self._buffer = []
+
+        total = sum(weight for _, weight in points)
+        means: List[float] = []
+        weights: List[float] = []
+
+        cumulative = 0.0
+        k_limit = self._k(0.0) + 1.0
+        current_mean, current_weight = points[0]
+
+        for mean, weight in points[1:]:
+            proposed = cumulative + current_weight + weight
+            if self._k(proposed / total) <= k_limit:
+                # Absorb into the current centroid
+                current_weight += weight
+                current_mean += (mean - current_mean) * weight / current_weight
+            else:
+                means.append(current_mean)
+                weights.append(current_weight)
+                cumulative += current_weight
+                k_limit = self._k(cumulative / total) + 1.0
+                current_mean, current_weight = mean, weight
+
+        means.append(current_mean)
+        weights.append(current_weight)
+
+        self.means = means
+        self.weights = weights
+
+    def _k(self, q: float) -> float:
+        """k1 scale function: small centroids near q=0 and q=1"""
+        q = min(max(q, 0.0), 1.0)
+        return self.compression / (2 * math.pi) * math.asin(2 * q - 1)
@@ -0,0 +1,164 @@
+"""
+Textbook Structure
+Typed textbook structure: the flat section list plus its chapter tree
+
+The parser produces sections as a flat list in reading order, each with a
+level (1 = chapter). The tree is rebuilt from that list in one pass on
+load, so the cache stores only the flat list and stays compatible.
+"""
+
+from typing import List, Dict, Optional, Any
+
+_SECTION_FIELDS = ("section_number", "title", "page_start", "page_end", "level", "keywords", "page_label")
+
+
+class Section:
+    """One outline / ToC / header entry and the entries nested under it"""
+
+    __slots__ = _SECTION_FIELDS + ("children",)
+
+    def __init__(
+        self,
+        section_number: str,
+        title: str,
+        page_start: int,
+        page_end: Optional[int] = None,
+        level: int = 1,
+        keywords: Optional[List[str]] = None,
+        page_label: Optional[str] = None
+    ):
+        self.section_number = section_number
+        self.title = title
+        self.page_start = page_start
+        self.page_end = page_end if page_end is not None else page_start
+        self.level = level
+        self.keywords = keywords or []
+        self.page_label = page_label
+        self.children: List["Section"] = []
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "Section":
+        return cls(
+            section_number=str(data.get('section_number') or ''),
+            title=data.get('title', ''),
+            page_start=data.get('page_start') or 1,
+            page_end=data.get('page_end'),
+            level=data.get('level') or 1,
+            keywords=data.get('keywords'),
+            page_label=data.get('page_label')
+        )
+
+    def to_dict(self) -> Dict:
+        """Flat section dict (children not included)"""
+        data = {field: getattr(self, field) for field in _SECTION_FIELDS}
+        if data['page_label'] is None:
+            del data['page_label']
+        return data
+
+    def __repr__(self) -> str:
+        return f"Section({self.section_number!r}, {self.title!r}, pages {self.page_start}-{self.page_end})"
+
+
+def build_section_tree(sections: List[Section]) -> List[Section]:
+    """
+    Nest sections under the nearest preceding section of a lower level
+
+    One pass with a stack of open ancestors, O(n). A skipped level (a 1.1.1
+    straight after chapter 1) nests under the closest open ancestor.
+
+    Returns:
+        Top-level sections (chapters), with children filled in
+    """
+    roots: List[Section] = []
+    open_sections: List[Section] = []
+    for section in sections:
+        section.children = []
+        while open_sections and open_sections[-1].level >= section.level:
+            open_sections.pop()
+        if open_sections:
+            open_sections[-1].children.append(section)
+        else:
+            roots.append(section)
+        open_sections.append(section)
+    return roots
+
+
+class TextbookStructure:
+    """
+    A registered textbook: metadata, the flat section list (the order
+    indexes and mappers refer to by position) and the chapter tree over it
+    """
+
+    __slots__ = (
+        "id", "title", "file_path", "total_pages", "file_size_mb",
+        "content_sha256", "parsing_method", "sections", "chapters"
+    )
+
+    def __init__(
+        self,
+        title: str,
+        sections: List[Section],
+        total_pages: int = 0,
+        parsing_method: str = "",
+        id: Optional[str] = None,
+        file_path: Optional[str] = None,
+        file_size_mb: Optional[float] = None,
+        content_sha256: Optional[str] = None
+    ):
+        self.id = id
+        self.title = title
+        self.file_path = file_path
+        self.total_pages = total_pages
+        self.file_size_mb = file_size_mb
+        self.content_sha256 = content_sha256
+        self.parsing_method = parsing_method
+        self.sections = sections
+        self.chapters = build_section_tree(sections)
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "TextbookStructure":
+        """From a cached / parsed textbook dict with a flat 'sections' list"""
+        return cls(
+            id=data.get('id'),
+            title=data.get('title', ''),
+            file_path=data.get('file_path'),
+            total_pages=data.get('total_pages') or 0,
+            file_size_mb=data.get('file_size_mb'),
+            content_sha256=data.get('content_sha256'),
+            parsing_method=data.get('parsing_method', ''),
+            sections=[Section.from_dict(s) for s in data.get('sections', [])]
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Cache layout: metadata and the flat section list"""
+        return {
+            'id': self.id,
+            'title': self.title,
+            'file_path': self.file_path,
+            'total_pages': self.total_pages,
+            'file_size_mb': self.file_size_mb,
+            'content_sha256': self.content_sha256,
+            'parsed': True,
+            'parsing_method': self.parsing_method,
+            'sections': [section.to_dict() for section in self.sections]
+        }
+
+    def outline(self, depth: int = 2) -> List[Dict]:
+        """
+        Chapter tree as nested dicts, down to the given depth
+
+        Args:
+            depth: Levels of nesting to include (1 = chapters only)
+        """
+        def node(section: Section, remaining: int) -> Dict:
+            entry = {
+                'section_number': section.section_number,
+                'title': section.title,
+                'page_start': section.page_start,
+                'page_end': section.page_end,
+            }
+            if remaining > 1 and section.children:
+                entry['sections'] = [node(child, remaining - 1) for child in section.children]
+            return entry
+
+        return [node(chapter, depth) for chapter in self.chapters]
@@ -0,0 +1,133 @@
+"""
+Title Matcher
+TF-IDF cosine similarity between a topic and section titles (sparse NumPy)
+
+Used as a confidence gate in front of LLM topic-to-section mapping: when
+one section title clearly beats the runner-up, the mapping is assigned
+locally and the LLM call is skipped.
+"""
+
+from collections import Counter
+from typing import List, Dict, Optional, Tuple
+
+import numpy as np
+
+from app.utils.section_index import tokenize
+from app.utils.textbook_structure import Section
+
+# Minimum cosine for a local decision, and required lead over the runner-up
+MIN_SIMILARITY = 0.6
+MIN_MARGIN = 0.2
+
+
+class TitleMatcher:
+    """
+    L2-normalized TF-IDF vectors of section titles, stored column-wise
+
+    For each term: the rows (sections) containing it and their weights, so
+    scoring a query only touches the postings of its own terms.
+    """
+
+    def __init__(self, sections: List[Section]):
+        self.size = len(sections)
+        docs = [Counter(tokenize(section.title)) for section in sections]
+
+        doc_freq = Counter(term for doc in docs for term in doc)
+        self.idf = {term: np.log((1 + self.size) / (1 + df)) + 1.0 for term, df in doc_freq.items()}
+
+        # Row norms for L2 normalization
+        norms = np.array([
+            np.sqrt(sum((tf * self.idf[t]) ** 2 for t, tf in doc.items())) or 1.0
+            for doc in docs
+        ])
+
+        rows: Dict[str, List[int]] = {}
+        weights: Dict[str, List[float]] = {}
+        for row, doc in enumerate(docs):
+            for term, tf in doc.items():
+                rows.setdefault(term, []).append(row)
+                weights.setdefault(term, []).append(tf * self.idf[term] / norms[row])
+
+        self._columns: Dict[str, Tuple[np.ndarray, np.ndarray]] = {
+            term: (np.array(rows[term], dtype=np.int32), np.array(weights[term], dtype=np.float64))
+            for term in rows
+        }
+
+    def similarities(self, query: str) -> np.ndarray:
+        """Cosine similarity of the query to every section title"""
+        scores = np.zeros(self.size)
+        counts = Counter(tokenize(query))
+        if not any(t in self._columns for t in counts):
+            return scores
+
+        # Terms no title contains still count (as the rarest) in the norm
+        unseen_idf = np.log(1 + self.size) + 1.0
+        query_weights = {t: tf * self.idf.get(t, unseen_idf) for t, tf in counts.items()}
+        query_norm = np.sqrt(sum(w * w for w in query_weights.values()))
+
+        for term, weight in query_weights.items():
+            if term in self._columns:
+                rows, column = self._columns[term]
+                scores[rows] += column * (weight / query_norm)
+
+        return scores
+
+    def decide(
+        self,
+        query: str,
+        min_similarity: float = MIN_SIMILARITY,
+        min_margin: float = MIN_MARGIN
+    ) -> Optional[Tuple[int, float]]:
+        """
+        The clearly best section for a query, if there is one
+
+        Returns:
+            (section index, similarity) when the best title scores at least
+            min_similarity and leads the runner-up by min_margin; else None
+        """
+        if self.size == 0:
+            return None
+
+        scores = self.similarities(query)
+        if self.size == 1:
+            best, runner_up = 0, 0.0
+        else:
+            top_two = np.argpartition(-scores, 1)[:2]
+            best, second = sorted(top_two, key=lambda i: -scores[i])
+            runner_up = scores[second]
+
+        if scores[best] >= min_similarity and scores[best] - runner_up >= min_margin:
+            return int(best), float(scores[best])
+        return None
+
+
+class MappingMetrics:
+    """Process-wide counts of local decisions vs LLM calls"""
+
+    def __init__(self):
+        self.decided_locally = 0
+        self.sent_to_llm = 0
+
+    def record(self, local: bool) -> None:
+        if local:
+            self.decided_locally += 1
+        else:
+            self.sent_to_llm += 1
+
+    def snapshot(self) -> Dict:
+        total = self.decided_locally + self.sent_to_llm
+        return {
+            "topics_mapped": total,
+            "decided_locally": self.decided_locally,
+            "sent_to_llm": self.sent_to_llm,
+            "llm_skip_rate": round(self.decided_locally / total, 3) if total else 0.0,
+        }
+
+
+# Global instance
+_mapping_metrics = MappingMetrics()
+
+
+def get_mapping_metrics() -> MappingMetrics:
+    """Get the global mapping metrics"""
+    return _mapping_metrics
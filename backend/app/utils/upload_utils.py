@@ -0,0 +1,89 @@
+"""
+Upload Utilities
+Stream uploaded files to disk in bounded memory
+"""
+
+import hashlib
+import os
+from pathlib import Path
+from typing import Tuple
+
+from fastapi import UploadFile
+
+# Bytes read from the upload per iteration
+UPLOAD_CHUNK_SIZE = 1024 * 1024
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when an upload exceeds the configured size limit"""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        super().__init__(f"File size must be less than {max_bytes // (1024 * 1024)}MB")
+
+
+def hash_file(path: Path, chunk_size: int = UPLOAD_CHUNK_SIZE) -> str:
+    """SHA-256 hex digest of a file, read in chunks"""
+    sha256 = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            sha256.update(chunk)
+    return sha256.hexdigest()
+
+
+async def save_upload(
+    file: UploadFile,
+    destination: Path,
+    max_bytes: int,
+    chunk_size: int = UPLOAD_CHUNK_SIZE
+) -> Tuple[int, str]:
+    """
+    Copy an upload to disk chunk by chunk, enforcing a size limit and hashing
+
+    Only one chunk is held in memory at a time. The file is written to a
+    temporary ".part" path and renamed into place on success; on any error
+    (including the size limit) the partial file is removed.
+
+    Args:
+        file: Incoming upload
+        destination: Final path for the file
+        max_bytes: Maximum allowed size in bytes
+        chunk_size: Bytes per read
+
+    Returns:
+        Tuple of (size in bytes, SHA-256 hex digest)
+
+    Raises:
+        UploadTooLargeError: If the upload is larger than max_bytes
+    """
+    # Reject up front when the client told us the size
+    if file.size is not None and file.size > max_bytes:
+        raise UploadTooLargeError(max_bytes)
+
+    destination = Path(destination)
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    partial_path = destination.with_name(destination.name + ".part")
+
+    sha256 = hashlib.sha256()
+    size = 0
+
+    try:
+        with open(partial_path, "wb") as out:
+            while True:
+                chunk = await file.read(chunk_size)
+                if not chunk:
+                    break
+
+                size += len(chunk)
+                if size > max_bytes:
+                    raise UploadTooLargeError(max_bytes)
+
+                sha256.update(chunk)
+                out.write(chunk)
+
+        os.replace(partial_path, destination)
+    except BaseException:
+        partial_path.unlink(missing_ok=True)
+        raise
+
+    return size, sha256.hexdigest()
@@ -0,0 +1,161 @@
+"""
+Micro-benchmark: ToC parsing, header detection and keyword extraction
+
+Times the single-pass line classifier against the previous per-line regex
+implementations (kept below as references) on realistic ToC and body
+pages, and checks that both produce the same entries, headers and keywords.
+
+Usage (from backend/):
+    python -m benchmarks.line_classifier --pages 200 --repeat 5
+"""
+
+import argparse
+import random
+import re
+import timeit
+from typing import List, Dict
+
+from app.utils.line_classifier import classify_lines, extract_keywords, is_likely_header
+from app.utils.pdf_utils import _parse_toc_text
+from benchmarks.synthetic_pdf import WORDS
+
+
+def legacy_parse_toc_text(text: str, page_num: int) -> List[Dict]:
+    """_parse_toc_text before the line classifier"""
+    entries = []
+    patterns = [
+        r'(?:Chapter\s+)?(\d+(?:\.\d+)*)[:\.\s]+([^\.]{3,}?)[\s\.]{2,}(\d+)',
+        r'(\d+\.\d+)\s+([^(\n]{3,}?)[\s\(]*(?:page\s+)?(\d+)',
+        r'(?:Chapter\s+)?(\d+)\s+([^0-9\n]{5,}?)\s+(\d+)$',
+    ]
+
+    for line in text.split('\n'):
+        line = line.strip()
+        if not line or len(line) < 10:
+            continue
+
+        for pattern in patterns:
+            match = re.search(pattern, line, re.IGNORECASE)
+            if match:
+                section_number = match.group(1)
+                title = re.sub(r'[\s\.]{3,}', ' ', match.group(2).strip()).strip()
+                page = match.group(3)
+                if len(title) > 2 and page.isdigit():
+                    entries.append({
+                        'section_number': section_number,
+                        'title': title,
+                        'page_start': int(page),
+                        'page_end': None,
+                        'level': section_number.count('.') + 1,
+                        'keywords': legacy_extract_keywords(title)
+                    })
+                    break
+
+    for i in range(len(entries) - 1):
+        entries[i]['page_end'] = entries[i+1]['page_start'] - 1
+    if entries:
+        entries[-1]['page_end'] = entries[-1]['page_start'] + 10
+    return entries
+
+
+def legacy_is_likely_header(line: str) -> bool:
+    """_is_likely_header before the line classifier"""
+    if line.isupper() and 5 < len(line) < 60:
+        return True
+    if re.match(r'^Chapter\s+\d+', line, re.IGNORECASE):
+        return True
+    if re.match(r'^(?:Section\s+)?\d+(?:\.\d+)*[\.\:\s]', line):
+        return True
+    if 10 < len(line) < 80 and not line.islower():
+        if any(c.isupper() for c in line):
+            return True
+    return False
+
+
+def legacy_extract_keywords(title: str) -> List[str]:
+    """_extract_keywords before the line classifier"""
+    clean_title = re.sub(r'[^\w\s]', ' ', title.lower())
+    stop_words = {'the', 'a', 'an', 'and', 'or', 'but', 'in', 'on', 'at', 'to', 'for', 'of', 'with', 'by'}
+    return [w for w in clean_title.split() if len(w) > 2 and w not in stop_words][:10]
+
+
+def toc_page(rng: random.Random, first_chapter: int, page: int) -> str:
+    """One ToC page in the usual styles: dot leaders, spaced page numbers, front matter"""
+    lines = ["CONTENTS", ""]
+    for chapter in range(first_chapter, first_chapter + 3):
+        title = " ".join(rng.choice(WORDS).title() for _ in range(rng.randint(2, 4)))
+        lines.append(f"Chapter {chapter}: {title} {'.' * rng.randint(5, 30)} {page}")
+        for section in range(1, rng.randint(4, 8)):
+            page += rng.randint(2, 9)
+            title = " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 5))).capitalize()
+            if rng.random() < 0.5:
+                lines.append(f"  {chapter}.{section} {title} {'. ' * rng.randint(4, 15)}{page}")
+            else:
+                lines.append(f"  {chapter}.{section} {title}    page {page}")
+        lines.append(f"Exercises {'.' * 12} {page + 1}")
+        page += 10
+    lines.append("xii")
+    return "\n".join(lines)
+
+
+def body_page(rng: random.Random, chapter: int) -> str:
+    """One body page: a header, prose, an equation line and a footer"""
+    lines = [f"{chapter}.{rng.randint(1, 6)} " + " ".join(rng.choice(WORDS).title() for _ in range(3))]
+    for _ in range(35):
+        lines.append(" ".join(rng.choice(WORDS) for _ in range(rng.randint(8, 14))) + ".")
+    lines.append(f"f(x) = {rng.randint(2, 9)}x + {rng.randint(1, 99)}")
+    lines.append(f"{rng.randint(1, 900)}   CHAPTER {chapter}")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark ToC/header line classification")
+    parser.add_argument("--pages", type=int, default=200, help="Pages of each kind")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    toc_pages = [toc_page(rng, 3 * i + 1, 10 * i + 1) for i in range(args.pages)]
+    body_pages = [body_page(rng, i % 20 + 1) for i in range(args.pages)]
+    body_lines = [line.strip() for page in body_pages for line in page.split("\n") if len(line.strip()) >= 5]
+    titles = [entry['title'] for page in toc_pages for entry in legacy_parse_toc_text(page, 1)]
+
+    # Same output before timing anything
+    for page in toc_pages + body_pages:
+        assert _parse_toc_text(page, 1) == legacy_parse_toc_text(page, 1), "ToC entries differ"
+    for line in body_lines:
+        assert is_likely_header(line) == legacy_is_likely_header(line), f"header label differs: {line!r}"
+    for page in toc_pages + body_pages:
+        headers = [label.line for label in classify_lines(page, find_toc=False) if label.is_header]
+        lines = [line.strip() for line in page.split("\n")]
+        assert headers == [l for l in lines if len(l) >= 5 and legacy_is_likely_header(l)], "header scan differs"
+    for title in titles:
+        assert extract_keywords(title) == legacy_extract_keywords(title), "keywords differ"
+
+    # What _extract_toc sees per book: front matter with the ToC, then body pages
+    front_matter = [page for i in range(0, args.pages, 10) for page in toc_pages[i:i + 2] + body_pages[i:i + 18]]
+
+    cases = [
+        ("ToC search, 20-page books", lambda: [legacy_parse_toc_text(p, 1) for p in front_matter],
+         lambda: [_parse_toc_text(p, 1) for p in front_matter], len(front_matter), "page"),
+        ("ToC parse, ToC pages", lambda: [legacy_parse_toc_text(p, 1) for p in toc_pages],
+         lambda: [_parse_toc_text(p, 1) for p in toc_pages], len(toc_pages), "page"),
+        ("ToC parse, body pages", lambda: [legacy_parse_toc_text(p, 1) for p in body_pages],
+         lambda: [_parse_toc_text(p, 1) for p in body_pages], len(body_pages), "page"),
+        ("header check", lambda: [legacy_is_likely_header(l) for l in body_lines],
+         lambda: [is_likely_header(l) for l in body_lines], len(body_lines), "line"),
+        ("keywords", lambda: [legacy_extract_keywords(t) for t in titles],
+         lambda: [extract_keywords(t) for t in titles], len(titles), "title"),
+    ]
+
+    print(f"{args.pages} ToC pages ({len(titles)} entries), {args.pages} body pages ({len(body_lines)} lines)\n")
+    print(f"{'case':24s} {'before':>12s} {'after':>12s} {'speedup':>8s}")
+    for name, legacy, current, count, unit in cases:
+        before = min(timeit.repeat(legacy, number=1, repeat=args.repeat)) / count * 1e6
+        after = min(timeit.repeat(current, number=1, repeat=args.repeat)) / count * 1e6
+        print(f"{name:24s} {before:8.2f} us/{unit[0]} {after:8.2f} us/{unit[0]} {before / after:7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Benchmark: resident memory while scanning every page of a long PDF
+
+Compares reading pages from one open pdfplumber document (page caches
+kept) with iter_pdf_pages (caches released, document reopened per window).
+The baseline only reads the first --baseline-pages pages; left to run on a
+large book it grows until the process runs out of memory.
+
+Usage (from backend/):
+    python -m benchmarks.pdf_page_memory --pages 1500
+"""
+
+import argparse
+import os
+import resource
+import tempfile
+import time
+from pathlib import Path
+
+from app.utils.pdf_utils import iter_pdf_pages
+from benchmarks.synthetic_pdf import write_synthetic_textbook
+
+
+def current_rss_mb() -> float:
+    """Resident set size now (Linux), else peak RSS so far"""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmRSS:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return peak / (1024 * 1024) if os.uname().sysname == "Darwin" else peak / 1024
+
+
+def scan_one_document(pdf_path: str, pages: int, every: int) -> list:
+    """Baseline: extract text through one open document, caches kept"""
+    import pdfplumber
+
+    samples = []
+    with pdfplumber.open(pdf_path) as pdf:
+        for page_num, page in enumerate(pdf.pages[:pages], 1):
+            page.extract_text()
+            if page_num % every == 0:
+                samples.append((page_num, current_rss_mb()))
+    return samples
+
+
+def scan_bounded(pdf_path: str, every: int) -> list:
+    """iter_pdf_pages over the whole book"""
+    samples = []
+    for page_num, page in iter_pdf_pages(pdf_path):
+        page.extract_text()
+        if page_num % every == 0:
+            samples.append((page_num, current_rss_mb()))
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF page-scan memory")
+    parser.add_argument("--pages", type=int, default=1500)
+    parser.add_argument("--baseline-pages", type=int, default=100)
+    parser.add_argument("--every", type=int, default=100, help="Sample RSS every N pages")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = str(write_synthetic_textbook(Path(tmp) / "synthetic.pdf", pages=args.pages))
+        print(f"Synthetic PDF: {args.pages} pages, {os.path.getsize(pdf_path) / 1e6:.1f} MB")
+        print(f"RSS before scanning: {current_rss_mb():.0f} MB\n")
+
+        start = time.perf_counter()
+        samples = scan_bounded(pdf_path, args.every)
+        bounded_time = time.perf_counter() - start
+
+        print("iter_pdf_pages (all pages):")
+        for page_num, rss in samples:
+            print(f"  page {page_num:5d}: {rss:7.0f} MB")
+        rss_values = [rss for _, rss in samples]
+        print(f"  RSS range {min(rss_values):.0f}-{max(rss_values):.0f} MB, "
+              f"peak {peak_rss_mb():.0f} MB, {bounded_time:.1f}s\n")
+
+        baseline_every = max(1, min(args.every, args.baseline_pages // 4))
+        start = time.perf_counter()
+        baseline = scan_one_document(pdf_path, args.baseline_pages, baseline_every)
+        baseline_time = time.perf_counter() - start
+
+        print(f"one open document (first {args.baseline_pages} pages):")
+        for page_num, rss in baseline:
+            print(f"  page {page_num:5d}: {rss:7.0f} MB")
+        growth = (baseline[-1][1] - baseline[0][1]) / max(1, baseline[-1][0] - baseline[0][0])
+        print(f"  ~{growth:.1f} MB per page, {baseline_time:.1f}s "
+              f"(projected {growth * args.pages / 1024:.1f} GB for {args.pages} pages)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Benchmark: sequential vs page-parallel PDF text extraction
+
+The parallel runs use the shared PDF worker pool (pdf_pool), sized with
+--workers the way PDF_WORKERS sizes it in the app.
+
+Usage (from backend/):
+    python -m benchmarks.pdf_text_extraction --pages 1000 --workers 4
+"""
+
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+from pathlib import Path
+
+from app.config import settings
+from app.services.pdf_pool import extract_pdf_text, get_pdf_pool, iter_pdf_page_texts, shutdown_pdf_pool
+from app.utils.pdf_utils import extract_text_from_pdf, get_page_count
+from benchmarks.synthetic_pdf import write_synthetic_textbook
+
+
+async def run_parallel(pdf_path: str):
+    """Whole-text and streaming extraction on the pool: (text, seconds, stream seconds, first page seconds)"""
+    # Start the workers outside the timed runs
+    await get_pdf_pool().run(get_page_count, pdf_path)
+
+    start = time.perf_counter()
+    text = await extract_pdf_text(pdf_path)
+    parallel_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    first_page_time = None
+    async for _ in iter_pdf_page_texts(pdf_path):
+        if first_page_time is None:
+            first_page_time = time.perf_counter() - start
+    stream_time = time.perf_counter() - start
+
+    return text, parallel_time, stream_time, first_page_time
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark PDF text extraction")
+    parser.add_argument("--pages", type=int, default=1000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    settings.pdf_workers = args.workers
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = str(write_synthetic_textbook(Path(tmp) / "synthetic.pdf", pages=args.pages))
+        print(f"Synthetic PDF: {args.pages} pages, {os.path.getsize(pdf_path) / 1e6:.1f} MB\n")
+
+        start = time.perf_counter()
+        sequential = extract_text_from_pdf(pdf_path)
+        sequential_time = time.perf_counter() - start
+
+        try:
+            parallel, parallel_time, stream_time, first_page_time = asyncio.run(run_parallel(pdf_path))
+        finally:
+            shutdown_pdf_pool()
+
+        assert parallel == sequential, "parallel extraction changed the text"
+
+        print(f"\nsequential (1 process):    {sequential_time:7.2f}s")
+        print(f"pool ({args.workers} workers):         {parallel_time:7.2f}s  ({sequential_time / parallel_time:.1f}x)")
+        print(f"streaming iterator:        {stream_time:7.2f}s  (first page after {first_page_time:.2f}s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,116 @@
+"""
+Synthetic Textbook PDF
+Writes a textbook-shaped PDF (chapters, numbered sections, body text) of
+any length for benchmarks, without extra dependencies
+"""
+
+import random
+from pathlib import Path
+from typing import List
+
+WORDS = (
+    "function limit derivative integral vector matrix energy force cell enzyme "
+    "market demand equation theorem proof series convergence probability "
+    "distribution variable graph model system process structure analysis"
+).split()
+
+LINES_PER_PAGE = 40
+PAGES_PER_SECTION = 5
+SECTIONS_PER_CHAPTER = 4
+
+
+def _escape(text: str) -> str:
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def _page_stream(page_num: int, rng: random.Random, captions: bool = False) -> bytes:
+    """Content stream for one page: optional headers, then body lines"""
+    ops = ["BT"]
+    y = 750
+
+    section_index = (page_num - 1) // PAGES_PER_SECTION
+    chapter = section_index // SECTIONS_PER_CHAPTER + 1
+    section = section_index % SECTIONS_PER_CHAPTER + 1
+
+    if captions:
+        # Title-case running head, as most printed books have
+        ops.append(f"/F1 9 Tf 72 770 Td (Chapter {chapter} Running Head Text) Tj -72 -770 Td")
+
+    if (page_num - 1) % PAGES_PER_SECTION == 0:
+        if section == 1:
+            title = " ".join(rng.choice(WORDS).title() for _ in range(3))
+            ops.append(f"/F2 20 Tf 72 {y} Td (Chapter {chapter}: {_escape(title)}) Tj")
+            ops.append("0 -30 Td")
+            y -= 30
+        else:
+            ops.append(f"72 {y} Td")
+        title = " ".join(rng.choice(WORDS).title() for _ in range(3))
+        ops.append(f"/F2 14 Tf ({chapter}.{section} {_escape(title)}) Tj 0 -22 Td")
+    else:
+        ops.append(f"72 {y} Td")
+
+    ops.append("/F1 10 Tf")
+    for i in range(LINES_PER_PAGE - 4):
+        if captions and i == LINES_PER_PAGE // 2:
+            # Figure caption in body text size
+            title = " ".join(rng.choice(WORDS).title() for _ in range(4))
+            ops.append(f"(Figure {chapter}.{i % 7 + 1} {_escape(title)}) Tj 0 -16 Td")
+            continue
+        line = " ".join(rng.choice(WORDS) for _ in range(12))
+        ops.append(f"({_escape(line)}) Tj 0 -16 Td")
+
+    ops.append(f"/F1 9 Tf 230 0 Td ({page_num}) Tj")
+    ops.append("ET")
+    return "\n".join(ops).encode("latin-1")
+
+
+def write_synthetic_textbook(path: Path, pages: int = 1000, seed: int = 7, captions: bool = False) -> Path:
+    """
+    Write a synthetic textbook PDF
+
+    Args:
+        path: Output path
+        pages: Number of pages
+        seed: Random seed (same seed -> same bytes)
+        captions: Add title-case running heads and figure captions
+
+    Returns:
+        The output path
+    """
+    rng = random.Random(seed)
+    objects: List[bytes] = []
+
+    # 1: catalog, 2: page tree, 3/4: fonts; pages start at object 5
+    page_ids = [5 + 2 * i for i in range(pages)]
+    objects.append(b"<< /Type /Catalog /Pages 2 0 R >>")
+    kids = " ".join(f"{pid} 0 R" for pid in page_ids)
+    objects.append(f"<< /Type /Pages /Kids [{kids}] /Count {pages} >>".encode())
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    objects.append(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica-Bold >>")
+
+    for i, page_id in enumerate(page_ids):
+        stream = _page_stream(i + 1, rng, captions)
+        objects.append(
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R /F2 4 0 R >> >> /Contents {page_id + 1} 0 R >>".encode()
+        )
+        objects.append(f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream")
+
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "wb") as out:
+        out.write(b"%PDF-1.4\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(out.tell())
+            out.write(f"{number} 0 obj\n".encode() + body + b"\nendobj\n")
+
+        xref_offset = out.tell()
+        out.write(f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode())
+        for offset in offsets:
+            out.write(f"{offset:010d} 00000 n \n".encode())
+        out.write(
+            f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\nstartxref\n{xref_offset}\n%%EOF\n".encode()
+        )
+
+    return path
@@ -0,0 +1,8 @@
+-- Indexes for streaming result exports
+-- Exports walk completed sessions of a form by id, then fetch their responses
+
+CREATE INDEX IF NOT EXISTS idx_form_sessions_form_completed_id
+ON form_sessions(form_id, id)
+WHERE completed_at IS NOT NULL;
+
+CREATE INDEX IF NOT EXISTS idx_responses_session_id ON responses(session_id);
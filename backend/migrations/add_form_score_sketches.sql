@@ -0,0 +1,12 @@
+-- Per-form score distribution sketches, updated on every submission
+-- digest: base64 t-digest (see app/utils/tdigest.py); histogram: 10 bins of 10 points
+-- version guards concurrent read-modify-write updates
+
+CREATE TABLE IF NOT EXISTS form_score_sketches (
+    form_id UUID PRIMARY KEY REFERENCES forms(id) ON DELETE CASCADE,
+    digest TEXT NOT NULL,
+    histogram INTEGER[] NOT NULL,
+    count INTEGER NOT NULL DEFAULT 0,
+    version INTEGER NOT NULL DEFAULT 1,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
@@ -0,0 +1,25 @@
+-- Background textbook ingestion jobs (see app/services/ingestion_pipeline.py)
+-- id is the textbook (resource) ID the job will create
+-- completed_stages lets a failed or interrupted job resume where it stopped;
+-- topics holds the extracted topics between the topics and database stages
+
+CREATE TABLE IF NOT EXISTS ingestion_jobs (
+    id UUID PRIMARY KEY,
+    title TEXT,
+    file_path TEXT NOT NULL,
+    file_name TEXT NOT NULL,
+    file_size_mb REAL,
+    content_sha256 TEXT NOT NULL,
+    course_level TEXT NOT NULL DEFAULT 'ug',
+    status TEXT NOT NULL DEFAULT 'queued'
+        CHECK (status IN ('queued', 'running', 'completed', 'failed')),
+    stage TEXT,
+    completed_stages TEXT[] NOT NULL DEFAULT '{}',
+    topics JSONB,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_ingestion_jobs_status
+ON ingestion_jobs(status, updated_at);
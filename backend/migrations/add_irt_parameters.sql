@@ -0,0 +1,59 @@
+-- Store calibrated IRT item parameters alongside questions
+-- Populated by the offline job in app/services/irt_calibration.py
+
+ALTER TABLE questions
+ADD COLUMN IF NOT EXISTS irt_model TEXT,
+ADD COLUMN IF NOT EXISTS irt_a DOUBLE PRECISION,
+ADD COLUMN IF NOT EXISTS irt_b DOUBLE PRECISION,
+ADD COLUMN IF NOT EXISTS irt_b_se DOUBLE PRECISION,
+ADD COLUMN IF NOT EXISTS irt_n_responses INTEGER,
+ADD COLUMN IF NOT EXISTS irt_calibrated_at TIMESTAMPTZ;
+
+-- One row per calibration run; watermark is the newest response timestamp
+-- covered and watermark_ids the responses at it, so the next run can read
+-- from the watermark inclusively and skip only those
+CREATE TABLE IF NOT EXISTS irt_calibration_runs (
+    id UUID PRIMARY KEY DEFAULT gen_random_uuid(),
+    model TEXT NOT NULL,
+    full_refit BOOLEAN NOT NULL DEFAULT FALSE,
+    watermark TIMESTAMPTZ,
+    watermark_ids JSONB NOT NULL DEFAULT '[]'::jsonb,
+    responses_used INTEGER NOT NULL DEFAULT 0,
+    items_updated INTEGER NOT NULL DEFAULT 0,
+    started_at TIMESTAMPTZ NOT NULL,
+    finished_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+CREATE INDEX IF NOT EXISTS idx_irt_calibration_runs_model ON irt_calibration_runs(model, finished_at DESC);
+
+-- Incremental runs page through responses newer than the watermark
+CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses(created_at);
+CREATE INDEX IF NOT EXISTS idx_responses_question_id ON responses(question_id);
+
+-- Apply a batch of fitted parameters in one statement
+CREATE OR REPLACE FUNCTION apply_irt_parameters(params JSONB)
+RETURNS INTEGER
+LANGUAGE sql
+AS $$
+    WITH updated AS (
+        UPDATE questions q
+        SET irt_model = p.irt_model,
+            irt_a = p.irt_a,
+            irt_b = p.irt_b,
+            irt_b_se = p.irt_b_se,
+            irt_n_responses = p.irt_n_responses,
+            irt_calibrated_at = p.irt_calibrated_at
+        FROM jsonb_to_recordset(params) AS p(
+            id UUID,
+            irt_model TEXT,
+            irt_a DOUBLE PRECISION,
+            irt_b DOUBLE PRECISION,
+            irt_b_se DOUBLE PRECISION,
+            irt_n_responses INTEGER,
+            irt_calibrated_at TIMESTAMPTZ
+        )
+        WHERE q.id = p.id
+        RETURNING 1
+    )
+    SELECT COUNT(*)::INTEGER FROM updated;
+$$;
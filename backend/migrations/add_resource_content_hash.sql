@@ -0,0 +1,6 @@
+-- Content-addressed textbooks: SHA-256 of the uploaded PDF
+-- Parsed structure, page text and section index are cached by this hash, so a
+-- re-upload of the same file is cheap; each upload still gets its own resource
+
+ALTER TABLE resources
+ADD COLUMN IF NOT EXISTS content_sha256 TEXT;
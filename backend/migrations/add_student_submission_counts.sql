@@ -0,0 +1,25 @@
+-- Support paginated student listing with aggregated submission counts
+-- Replaces the per-student exact-count queries in GET /api/forms/students/all
+
+-- Keyset pagination order (newest first, id as tiebreaker)
+CREATE INDEX IF NOT EXISTS idx_students_created_at_id ON students(created_at DESC, id DESC);
+
+-- Email prefix search (LIKE 'abc%') on lowercased emails
+CREATE INDEX IF NOT EXISTS idx_students_email_prefix ON students(email text_pattern_ops);
+
+-- Completed sessions per student
+CREATE INDEX IF NOT EXISTS idx_form_sessions_student_completed
+ON form_sessions(student_id)
+WHERE completed_at IS NOT NULL;
+
+-- Count completed sessions for a page of students in one grouped query
+CREATE OR REPLACE FUNCTION get_student_submission_counts(student_uuids UUID[])
+RETURNS TABLE (student_id UUID, submissions_count BIGINT)
+LANGUAGE sql STABLE
+AS $$
+    SELECT fs.student_id, COUNT(*) AS submissions_count
+    FROM form_sessions fs
+    WHERE fs.student_id = ANY(student_uuids)
+      AND fs.completed_at IS NOT NULL
+    GROUP BY fs.student_id;
+$$;
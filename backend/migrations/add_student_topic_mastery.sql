@@ -0,0 +1,60 @@
+-- Per-student, per-topic mastery maintained on every submission
+-- Bayesian Knowledge Tracing state; see app/services/mastery_service.py
+
+CREATE TABLE IF NOT EXISTS student_topic_mastery (
+    student_id UUID NOT NULL REFERENCES students(id) ON DELETE CASCADE,
+    topic_id UUID NOT NULL REFERENCES topics(id) ON DELETE CASCADE,
+    p_mastery REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    correct INTEGER NOT NULL DEFAULT 0,
+    updated_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (student_id, topic_id)
+);
+
+-- Teacher views by topic
+CREATE INDEX IF NOT EXISTS idx_student_topic_mastery_topic ON student_topic_mastery(topic_id, p_mastery);
+
+-- Write mastery rows only if they are unchanged since they were read:
+-- existing rows must still have expected_updated_at, and new rows (expected
+-- NULL) must not have been inserted by another submission. Returns the
+-- topics written; the service re-reads and retries the rest.
+CREATE OR REPLACE FUNCTION apply_topic_mastery(updates JSONB)
+RETURNS TABLE (written_topic_id UUID)
+LANGUAGE sql
+AS $$
+    WITH incoming AS (
+        SELECT *
+        FROM jsonb_to_recordset(updates) AS u(
+            student_id UUID,
+            topic_id UUID,
+            p_mastery REAL,
+            attempts INTEGER,
+            correct INTEGER,
+            updated_at TIMESTAMPTZ,
+            expected_updated_at TIMESTAMPTZ
+        )
+    ),
+    updated AS (
+        UPDATE student_topic_mastery m
+        SET p_mastery = i.p_mastery,
+            attempts = i.attempts,
+            correct = i.correct,
+            updated_at = i.updated_at
+        FROM incoming i
+        WHERE m.student_id = i.student_id
+          AND m.topic_id = i.topic_id
+          AND m.updated_at = i.expected_updated_at
+        RETURNING m.topic_id
+    ),
+    inserted AS (
+        INSERT INTO student_topic_mastery (student_id, topic_id, p_mastery, attempts, correct, updated_at)
+        SELECT student_id, topic_id, p_mastery, attempts, correct, updated_at
+        FROM incoming
+        WHERE expected_updated_at IS NULL
+        ON CONFLICT (student_id, topic_id) DO NOTHING
+        RETURNING topic_id
+    )
+    SELECT topic_id FROM updated
+    UNION ALL
+    SELECT topic_id FROM inserted;
+$$;
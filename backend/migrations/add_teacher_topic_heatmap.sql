@@ -0,0 +1,31 @@
+-- Cross-form topic correctness for one teacher in a single grouped query
+-- Topics are grouped by normalized name (lowercased, whitespace collapsed)
+-- so the same prerequisite on different forms lands in one heatmap row
+
+CREATE INDEX IF NOT EXISTS idx_forms_teacher_id ON forms(teacher_id);
+CREATE INDEX IF NOT EXISTS idx_responses_form_topic ON responses(form_id, topic_id);
+
+CREATE OR REPLACE FUNCTION get_teacher_topic_heatmap(teacher_uuid UUID)
+RETURNS TABLE (
+    form_id UUID,
+    topic_key TEXT,
+    topic_name TEXT,
+    num_responses BIGINT,
+    num_correct BIGINT,
+    num_students BIGINT
+)
+LANGUAGE sql STABLE
+AS $$
+    SELECT
+        r.form_id,
+        lower(regexp_replace(trim(t.name), '\s+', ' ', 'g')) AS topic_key,
+        min(t.name) AS topic_name,
+        COUNT(*) AS num_responses,
+        COUNT(*) FILTER (WHERE r.is_correct) AS num_correct,
+        COUNT(DISTINCT r.session_id) AS num_students
+    FROM responses r
+    JOIN forms f ON f.id = r.form_id
+    JOIN topics t ON t.id = r.topic_id
+    WHERE f.teacher_id = teacher_uuid
+    GROUP BY r.form_id, topic_key;
+$$;
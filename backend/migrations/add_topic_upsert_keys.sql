@@ -0,0 +1,20 @@
+-- Conflict keys for bulk topic upserts (see app/services/topic_store.py)
+-- Topics saved by a source (an ingestion job) are keyed by (course_id, source_id, topic_id),
+-- so re-running that source updates its own topics; prerequisite links by the pair of topics
+
+-- LLM topic ids ("t_001", ...) repeat across textbooks and syllabi in the same
+-- course, so topic_id alone is not a key. Rows without a source_id (existing
+-- data, forms, syllabus parses) never conflict: NULLs are distinct in the index.
+ALTER TABLE topics ADD COLUMN IF NOT EXISTS source_id TEXT;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_topics_course_source_topic_id
+ON topics(course_id, source_id, topic_id);
+
+DELETE FROM topic_prerequisites p
+USING topic_prerequisites o
+WHERE o.topic_id = p.topic_id
+  AND o.prerequisite_topic_id = p.prerequisite_topic_id
+  AND o.ctid < p.ctid;
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_topic_prerequisites_pair
+ON topic_prerequisites(topic_id, prerequisite_topic_id);
@@ -7,7 +7,7 @@ import { Sparkles, BookOpen, ArrowLeft, Loader2, ArrowRight, HelpCircle } from '
 import DiagnosticForm from '@/components/DiagnosticForm'
 import HelpSidebar from '@/components/HelpSidebar'
 import NotificationPopup from '@/components/NotificationPopup'
-import { generateQuestions, API_BASE_URL } from '@/lib/api'
+import { generateQuestions, waitForTextbookIngestion, API_BASE_URL } from '@/lib/api'
 import { useStore } from '@/lib/store'
 import type { Topic } from '@/lib/schema'
 
@@ -119,8 +119,11 @@ export default function CreateDiagnosticPage() {
         const uploadData = await uploadResponse.json()
         textbookId = uploadData.textbook_id
 
+        // Ingestion runs in the background; wait for the extracted topics
+        const textbookTopics = await waitForTextbookIngestion(uploadData)
+
         // Use topics from textbook
-        const normalizedTopics: Topic[] = uploadData.topics.map((t: any) => ({
+        const normalizedTopics: Topic[] = textbookTopics.map((t: any) => ({
           id: t.id,
           name: t.name,
           weight: t.weight,
@@ -4,7 +4,7 @@ import { useState } from 'react'
 import { useRouter } from 'next/navigation'
 import { Upload, FileText, Loader2, BookOpen, ArrowRight, X } from 'lucide-react'
 import { motion } from 'framer-motion'
-import { API_BASE_URL } from '@/lib/api'
+import { API_BASE_URL, waitForTextbookIngestion } from '@/lib/api'
 
 export default function UploadTextbookPage() {
   const router = useRouter()
@@ -98,6 +98,9 @@ export default function UploadTextbookPage() {
 
       const data = await response.json()
 
+      // Topics are extracted in the background; wait before reviewing them
+      await waitForTextbookIngestion(data)
+
       // Navigate to assessment type selection with textbook data
       router.push(`/select-assessment-type?textbookId=${data.textbook_id}&title=${encodeURIComponent(title)}`)
 
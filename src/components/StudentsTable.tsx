@@ -1,6 +1,6 @@
 'use client'
 
-import { useState, useMemo, useEffect } from 'react'
+import { useState, useEffect } from 'react'
 import { Download, Eye, Search, Users, X, CheckCircle2, XCircle, Loader2 } from 'lucide-react'
 import { AnimatePresence, motion } from 'framer-motion'
 
@@ -14,58 +14,103 @@ interface Student {
   submissions_count: number
 }
 
+interface StudentsPage {
+  students: Student[]
+  next_cursor: string | null
+  has_more: boolean
+}
+
+// Wait this long after typing before searching on the server
+const SEARCH_DEBOUNCE_MS = 300
+
+async function fetchStudentsPage(search: string, cursor: string | null): Promise<StudentsPage> {
+  const params = new URLSearchParams()
+  if (search) params.set('search', search)
+  if (cursor) params.set('cursor', cursor)
+
+  const query = params.toString()
+  const response = await fetch(`${API_BASE}/api/forms/students/all${query ? `?${query}` : ''}`)
+
+  if (!response.ok) {
+    throw new Error('Failed to fetch students')
+  }
+
+  return response.json()
+}
+
 export default function StudentsTable() {
   const [searchQuery, setSearchQuery] = useState('')
   const [selectedIds, setSelectedIds] = useState<Set<string>>(new Set())
   const [previewStudent, setPreviewStudent] = useState<Student | null>(null)
   const [students, setStudents] = useState<Student[]>([])
   const [loading, setLoading] = useState(true)
+  const [searching, setSearching] = useState(false)
+  const [loadingMore, setLoadingMore] = useState(false)
   const [error, setError] = useState<string | null>(null)
+  // The search the loaded pages belong to, and where the next page starts
+  const [appliedSearch, setAppliedSearch] = useState('')
+  const [nextCursor, setNextCursor] = useState<string | null>(null)
 
-  // Fetch students from API
+  // Fetch the first page from the API, again (debounced) when the search changes
   useEffect(() => {
-    const fetchStudents = async () => {
-      try {
-        setLoading(true)
-        const response = await fetch(`${API_BASE}/api/forms/students/all`)
+    const search = searchQuery.trim()
+    let cancelled = false
 
-        if (!response.ok) {
-          throw new Error('Failed to fetch students')
-        }
+    const timer = setTimeout(async () => {
+      try {
+        setSearching(true)
+        const page = await fetchStudentsPage(search, null)
+        if (cancelled) return
 
-        const data = await response.json()
-        setStudents(data.students || [])
+        setStudents(page.students || [])
+        setNextCursor(page.has_more ? page.next_cursor : null)
+        setAppliedSearch(search)
+        setError(null)
       } catch (err) {
+        if (cancelled) return
         console.error('Error fetching students:', err)
         setError(err instanceof Error ? err.message : 'Failed to load students')
       } finally {
-        setLoading(false)
+        if (!cancelled) {
+          setSearching(false)
+          setLoading(false)
+        }
       }
+    }, loading ? 0 : SEARCH_DEBOUNCE_MS)
+
+    return () => {
+      cancelled = true
+      clearTimeout(timer)
     }
+    // eslint-disable-next-line react-hooks/exhaustive-deps
+  }, [searchQuery])
 
-    fetchStudents()
-  }, [])
-
-  // Filter students based on search
-  const filteredStudents = useMemo(() => {
-    if (!searchQuery.trim()) return students
-    const query = searchQuery.toLowerCase()
-    return students.filter(
-      (s) =>
-        s.name.toLowerCase().includes(query) ||
-        s.email.toLowerCase().includes(query)
-    )
-  }, [searchQuery, students])
+  // Append the next page of the current search
+  const loadMore = async () => {
+    if (!nextCursor || loadingMore) return
+
+    try {
+      setLoadingMore(true)
+      const page = await fetchStudentsPage(appliedSearch, nextCursor)
+      setStudents((prev) => [...prev, ...(page.students || [])])
+      setNextCursor(page.has_more ? page.next_cursor : null)
+    } catch (err) {
+      console.error('Error fetching students:', err)
+      setError(err instanceof Error ? err.message : 'Failed to load students')
+    } finally {
+      setLoadingMore(false)
+    }
+  }
 
   // Select all toggle
-  const allSelected = filteredStudents.length > 0 && filteredStudents.every((s) => selectedIds.has(s.id))
-  const someSelected = filteredStudents.some((s) => selectedIds.has(s.id))
+  const allSelected = students.length > 0 && students.every((s) => selectedIds.has(s.id))
+  const someSelected = students.some((s) => selectedIds.has(s.id))
 
   const toggleSelectAll = () => {
     if (allSelected) {
       setSelectedIds(new Set())
     } else {
-      setSelectedIds(new Set(filteredStudents.map((s) => s.id)))
+      setSelectedIds(new Set(students.map((s) => s.id)))
     }
   }
 
@@ -147,12 +192,15 @@ export default function StudentsTable() {
           <Search className="absolute left-3 top-1/2 -translate-y-1/2 w-4 h-4 text-gray-400" />
           <input
             type="text"
-            placeholder="Search by name or email..."
+            placeholder="Search by email..."
             value={searchQuery}
             onChange={(e) => setSearchQuery(e.target.value)}
-            className="w-full pl-10 pr-4 py-2.5 text-sm border border-gray-200 dark:border-gray-700 rounded-xl bg-white dark:bg-gray-900 focus:outline-none focus:ring-2 focus:ring-indigo-400"
+            className="w-full pl-10 pr-10 py-2.5 text-sm border border-gray-200 dark:border-gray-700 rounded-xl bg-white dark:bg-gray-900 focus:outline-none focus:ring-2 focus:ring-indigo-400"
             aria-label="Search students"
           />
+          {searching && (
+            <Loader2 className="absolute right-3 top-1/2 -translate-y-1/2 w-4 h-4 animate-spin text-gray-400" />
+          )}
         </div>
 
         {/* Bulk Actions */}
@@ -180,7 +228,7 @@ export default function StudentsTable() {
 
       {/* Table Container */}
       <div className="border border-gray-200 dark:border-gray-700 rounded-2xl bg-white dark:bg-gray-900 shadow-sm overflow-hidden">
-        {filteredStudents.length === 0 ? (
+        {students.length === 0 ? (
           <div className="flex flex-col items-center justify-center py-16 px-6">
             <Users className="w-16 h-16 text-gray-300 dark:text-gray-700 mb-4" />
             <h3 className="text-lg font-semibold text-gray-900 dark:text-white mb-2">
@@ -225,7 +273,7 @@ export default function StudentsTable() {
                 </tr>
               </thead>
               <tbody className="divide-y divide-gray-100 dark:divide-gray-800">
-                {filteredStudents.map((student) => (
+                {students.map((student) => (
                   <tr
                     key={student.id}
                     className="hover:bg-gray-50 dark:hover:bg-gray-800/50 transition-colors"
@@ -287,8 +335,23 @@ export default function StudentsTable() {
         )}
       </div>
 
+      {/* Next Page */}
+      {nextCursor && (
+        <div className="flex justify-center">
+          <button
+            type="button"
+            onClick={loadMore}
+            disabled={loadingMore}
+            className="inline-flex items-center gap-2 px-4 py-2.5 text-sm font-medium text-gray-700 dark:text-gray-200 bg-white dark:bg-gray-800 border border-gray-200 dark:border-gray-700 rounded-xl hover:bg-gray-50 dark:hover:bg-gray-700 transition-colors disabled:opacity-50 disabled:cursor-not-allowed"
+          >
+            {loadingMore && <Loader2 className="w-4 h-4 animate-spin" />}
+            Load more students
+          </button>
+        </div>
+      )}
+
       {/* Bottom Note */}
-      {filteredStudents.length > 0 && (
+      {students.length > 0 && (
         <p className="text-xs text-gray-500 dark:text-gray-400 text-center">
           All quizzes are generated drafts. Per-student exports include personalized versions.
         </p>
@@ -100,6 +100,33 @@ export async function generateQuestions(
   }
 }
 
+/**
+ * Wait for an uploaded textbook to finish ingestion (upload returns 202)
+ * and return its auto-extracted topics
+ */
+export async function waitForTextbookIngestion(
+  upload: { textbook_id: string; status: string; status_url: string; topics?: any[] },
+  pollIntervalMs: number = 2000
+): Promise<any[]> {
+  let status = upload
+
+  while (status.status !== 'completed') {
+    if (status.status === 'failed') {
+      throw new Error((status as any).error || 'Textbook ingestion failed')
+    }
+
+    await new Promise(resolve => setTimeout(resolve, pollIntervalMs))
+
+    const response = await fetch(`${API_BASE_URL}${upload.status_url}`)
+    if (!response.ok) {
+      throw new Error(`Failed to fetch ingestion status: ${response.statusText}`)
+    }
+    status = await response.json()
+  }
+
+  return status.topics || []
+}
+
 export async function createForm(
   title: string,
   questions: Question[]